@@ -0,0 +1,21 @@
+-- Materialize a pointer to the latest revision and the creation time on
+-- each review, so that listings don't need to aggregate the revision table.
+BEGIN;
+
+ALTER TABLE review ADD COLUMN last_revision_id INTEGER;
+ALTER TABLE review ADD COLUMN created TIMESTAMP;
+
+UPDATE review
+   SET last_revision_id = pointers.last_revision_id,
+       created = pointers.created
+  FROM (
+        SELECT DISTINCT ON (review_id)
+               review_id,
+               id AS last_revision_id,
+               MIN("timestamp") OVER (PARTITION BY review_id) AS created
+          FROM revision
+      ORDER BY review_id, "timestamp" DESC, id DESC
+       ) AS pointers
+ WHERE review.id = pointers.review_id;
+
+COMMIT;
@@ -0,0 +1,36 @@
+-- Keep vote counters on revisions and reviews, so that popularity doesn't
+-- need to be aggregated from the vote table on every request.
+BEGIN;
+
+ALTER TABLE revision ADD COLUMN votes_positive INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE revision ADD COLUMN votes_negative INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE review ADD COLUMN votes_positive INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE review ADD COLUMN votes_negative INTEGER NOT NULL DEFAULT 0;
+
+UPDATE revision
+   SET votes_positive = counts.votes_positive,
+       votes_negative = counts.votes_negative
+  FROM (
+        SELECT revision_id,
+               COUNT(*) FILTER (WHERE vote = 't') AS votes_positive,
+               COUNT(*) FILTER (WHERE vote = 'f') AS votes_negative
+          FROM vote
+      GROUP BY revision_id
+       ) AS counts
+ WHERE revision.id = counts.revision_id;
+
+UPDATE review
+   SET votes_positive = counts.votes_positive,
+       votes_negative = counts.votes_negative
+  FROM (
+        SELECT review_id,
+               SUM(votes_positive) AS votes_positive,
+               SUM(votes_negative) AS votes_negative
+          FROM revision
+      GROUP BY review_id
+       ) AS counts
+ WHERE review.id = counts.review_id;
+
+CREATE INDEX ix_review_popularity ON review USING btree ((votes_positive - votes_negative));
+
+COMMIT;
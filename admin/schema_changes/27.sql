@@ -0,0 +1,8 @@
+-- Indexes matching the order of review lists with cursor pagination
+BEGIN;
+
+DROP INDEX IF EXISTS ix_review_popularity;
+CREATE INDEX ix_review_popularity ON review USING btree ((votes_positive - votes_negative), id);
+CREATE INDEX ix_review_published_on ON review USING btree (published_on, id);
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- Maintained counter of published reviews per entity type
+BEGIN;
+
+CREATE TABLE published_review_count (
+    entity_type entity_types NOT NULL,
+    count       INTEGER      NOT NULL
+);
+ALTER TABLE published_review_count ADD CONSTRAINT published_review_count_pkey PRIMARY KEY (entity_type);
+
+INSERT INTO published_review_count (entity_type, count)
+     SELECT entity_type, count(*)
+       FROM review
+      WHERE is_draft = 'f'
+        AND is_hidden = 'f'
+   GROUP BY entity_type;
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Materialized karma of users
+BEGIN;
+
+ALTER TABLE "user" ADD COLUMN karma INTEGER NOT NULL DEFAULT 0;
+
+UPDATE "user"
+   SET karma = user_karma.karma
+  FROM (
+        SELECT user_id, SUM(votes_positive - votes_negative) AS karma
+          FROM review
+      GROUP BY user_id
+       ) AS user_karma
+ WHERE "user".id = user_karma.user_id;
+
+COMMIT;
@@ -0,0 +1,19 @@
+-- Sum of ratings stored with the average rating so that it can be adjusted incrementally
+BEGIN;
+
+ALTER TABLE avg_rating ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0;
+
+UPDATE avg_rating
+   SET rating_sum = ratings.rating_sum
+  FROM (
+        SELECT entity_id, entity_type, SUM(rating) AS rating_sum
+          FROM review
+          JOIN revision
+            ON revision.id = review.last_revision_id
+         WHERE is_hidden = 'f'
+      GROUP BY entity_id, entity_type
+       ) AS ratings
+ WHERE avg_rating.entity_id = ratings.entity_id
+   AND avg_rating.entity_type = ratings.entity_type;
+
+COMMIT;
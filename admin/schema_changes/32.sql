@@ -0,0 +1,24 @@
+-- Popularity of reviews during the last month, used on the home page
+BEGIN;
+
+CREATE TABLE popular_reviews_window (
+    review_id   UUID         NOT NULL,
+    popularity  INTEGER      NOT NULL
+);
+ALTER TABLE popular_reviews_window ADD CONSTRAINT popular_reviews_window_pkey PRIMARY KEY (review_id);
+ALTER TABLE popular_reviews_window
+  ADD CONSTRAINT popular_reviews_window_review_id_fkey
+  FOREIGN KEY (review_id)
+  REFERENCES review(id)
+  ON DELETE CASCADE;
+
+INSERT INTO popular_reviews_window (review_id, popularity)
+     SELECT revision.review_id,
+            COUNT(*) FILTER (WHERE vote = 't') - COUNT(*) FILTER (WHERE vote = 'f')
+       FROM vote
+       JOIN revision
+         ON revision.id = vote.revision_id
+      WHERE rated_at > NOW() - INTERVAL '4 weeks'
+   GROUP BY revision.review_id;
+
+COMMIT;
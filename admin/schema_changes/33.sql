@@ -0,0 +1,6 @@
+-- Index for counting comments written by a user
+BEGIN;
+
+CREATE INDEX ix_comment_user_id ON comment USING btree (user_id);
+
+COMMIT;
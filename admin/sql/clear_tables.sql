@@ -7,7 +7,9 @@ DELETE FROM oauth_grant;
 DELETE FROM oauth_token;
 DELETE FROM oauth_client;
 DELETE FROM moderation_log;
+DELETE FROM popular_reviews_window;
 DELETE FROM review;
 DELETE FROM "user";
 DELETE FROM license;
 DELETE FROM avg_rating;
+DELETE FROM published_review_count;
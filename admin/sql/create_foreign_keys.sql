@@ -109,4 +109,10 @@ ALTER TABLE comment_revision
   REFERENCES comment(id)
   ON DELETE CASCADE;
 
+ALTER TABLE popular_reviews_window
+  ADD CONSTRAINT popular_reviews_window_review_id_fkey
+  FOREIGN KEY (review_id)
+  REFERENCES review(id)
+  ON DELETE CASCADE;
+
 COMMIT;
@@ -1,8 +1,16 @@
 BEGIN;
 
+CREATE INDEX ix_comment_review_id ON comment USING btree (review_id);
+CREATE INDEX ix_comment_revision_comment_id ON comment_revision USING btree (comment_id, "timestamp");
+CREATE INDEX ix_comment_user_id ON comment USING btree (user_id);
 CREATE INDEX ix_oauth_grant_code ON oauth_grant USING btree (code);
 CREATE INDEX ix_review_entity_id ON review USING btree (entity_id);
+CREATE INDEX ix_review_popularity ON review USING btree ((votes_positive - votes_negative), id) WHERE is_draft = 'f' AND is_hidden = 'f';
+CREATE INDEX ix_review_published_on ON review USING btree (published_on, id) WHERE is_draft = 'f' AND is_hidden = 'f';
+CREATE INDEX ix_review_user_id ON review USING btree (user_id);
 CREATE INDEX ix_revision_review_id ON revision USING btree (review_id);
 CREATE INDEX ix_user_id ON "user" USING btree ((id::text));
+CREATE INDEX ix_vote_revision_id ON vote USING btree (revision_id);
+CREATE INDEX ix_vote_user_id_rated_at ON vote USING btree (user_id, rated_at);
 
 COMMIT;
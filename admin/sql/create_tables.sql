@@ -76,7 +76,11 @@ CREATE TABLE review (
     language        VARCHAR(3)   NOT NULL,
     published_on    TIMESTAMP,
     source          VARCHAR,
-    source_url      VARCHAR
+    source_url      VARCHAR,
+    last_revision_id INTEGER,
+    created         TIMESTAMP,
+    votes_positive  INTEGER      NOT NULL DEFAULT 0,
+    votes_negative  INTEGER      NOT NULL DEFAULT 0
 );
 ALTER TABLE review ADD CONSTRAINT review_entity_id_user_id_key UNIQUE (entity_id, user_id);
 ALTER TABLE review ADD CONSTRAINT published_on_null_for_drafts_and_not_null_for_published_reviews
@@ -87,7 +91,9 @@ CREATE TABLE revision (
     review_id   UUID,
     "timestamp" TIMESTAMP   NOT NULL,
     text        VARCHAR,     
-    rating      SMALLINT CHECK (rating >= 0 AND rating <= 100)
+    rating      SMALLINT CHECK (rating >= 0 AND rating <= 100),
+    votes_positive INTEGER  NOT NULL DEFAULT 0,
+    votes_negative INTEGER  NOT NULL DEFAULT 0
 );
 ALTER TABLE revision ADD CONSTRAINT revision_text_rating_both_not_null_together
     CHECK (rating is NOT NULL OR text is NOT NULL);
@@ -96,6 +102,17 @@ CREATE TABLE avg_rating (
     entity_id   UUID         NOT NULL,
     entity_type entity_types NOT NULL,
     rating      SMALLINT     NOT NULL CHECK (rating >= 0 AND rating <= 100),
+    count       INTEGER      NOT NULL,
+    rating_sum  INTEGER      NOT NULL DEFAULT 0
+);
+
+CREATE TABLE popular_reviews_window (
+    review_id   UUID         NOT NULL,
+    popularity  INTEGER      NOT NULL
+);
+
+CREATE TABLE published_review_count (
+    entity_type entity_types NOT NULL,
     count       INTEGER      NOT NULL
 );
 
@@ -116,7 +133,8 @@ CREATE TABLE "user" (
     musicbrainz_row_id  INTEGER,
     is_blocked          BOOLEAN     NOT NULL DEFAULT False,
     license_choice      VARCHAR,
-    last_login          TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT TIMESTAMP 'epoch'
+    last_login          TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT TIMESTAMP 'epoch',
+    karma               INTEGER     NOT NULL DEFAULT 0
 );
 ALTER TABLE "user" ADD CONSTRAINT user_musicbrainz_id_key UNIQUE (musicbrainz_id);
 ALTER TABLE "user" ADD CONSTRAINT user_musicbrainz_row_id_key UNIQUE (musicbrainz_row_id);
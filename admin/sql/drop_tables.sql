@@ -8,8 +8,10 @@ DROP TABLE IF EXISTS oauth_grant;
 DROP TABLE IF EXISTS oauth_token;
 DROP TABLE IF EXISTS oauth_client;
 DROP TABLE IF EXISTS moderation_log;
+DROP TABLE IF EXISTS popular_reviews_window;
 DROP TABLE IF EXISTS review;
 DROP TABLE IF EXISTS "user";
 DROP TABLE IF EXISTS license;
 DROP TABLE IF EXISTS avg_rating;
+DROP TABLE IF EXISTS published_review_count;
 COMMIT;
@@ -17,7 +17,11 @@ from psycopg2.sql import SQL, Identifier
 
 from critiquebrainz import db
 from critiquebrainz.data.utils import create_path, remove_old_archives, slugify, explode_db_uri, with_request_context
-from critiquebrainz.db import license as db_license, review as db_review
+from critiquebrainz.db import (avg_rating as db_avg_rating,
+                               license as db_license,
+                               review as db_review,
+                               users as db_users,
+                               vote as db_vote)
 
 cli = click.Group()
 
@@ -167,12 +171,13 @@ def json(location, rotate=False):
                     # Creating directory structure and dumping reviews
                     dir_part = os.path.join(entity[0:1], entity[0:2])
                     reviews = db_review.get_reviews_list(connection, entity_id=entity,
-                                                         license_id=license["id"], limit=None)[0]
+                                                         license_id=license["id"], limit=None,
+                                                         with_count=False)[0]
                     if reviews:
                         rg_dir = '%s/%s' % (license_dir, dir_part)
                         create_path(rg_dir)
                         f = open('%s/%s.json' % (rg_dir, entity), 'w+')
-                        f.write(jsonify(reviews=[db_review.to_dict(r, connection=connection) for r in reviews])
+                        f.write(jsonify(reviews=db_review.to_dicts(reviews, connection=connection))
                                 .data.decode("utf-8"))
                         f.close()
 
@@ -498,6 +503,15 @@ def importer(archive):
         # Reset sequence values after importing dump
         reset_sequence(['revision'])
 
+        # Derived data (revision pointers, counters, karma, ratings) isn't a part of the dump
+        with db.engine.begin() as connection:
+            db_review.update_revision_pointers(connection)
+            db_vote.update_counters(connection)
+            db_review.update_popular_reviews(connection)
+            db_review.update_published_count(connection)
+            db_users.update_karma(connection)
+            db_avg_rating.update_all(connection)
+
         shutil.rmtree(temp_dir)  # Cleanup
         print("Done!")
 
@@ -1,6 +1,14 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import ProgrammingError
-from sqlalchemy.pool import NullPool
+import contextvars
+import itertools
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from brainzutils import cache
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from critiquebrainz.db import pool, query_stats  # pylint: disable=unused-import
 
 # This value must be incremented after schema changes on exported tables!
 SCHEMA_VERSION = 15
@@ -15,11 +23,298 @@ RATING_SCALE_0_100 = {1: 20, 2: 40, 3: 60, 4: 80, 5: 100}
 RATING_SCALE_1_5 = {20: 1, 40: 2, 60: 3, 80: 4, 100: 5}
 
 engine = None
+replica_engines = []
+
+# Seconds for which a replica that couldn't be connected to is skipped
+REPLICA_RETRY_INTERVAL = 30
+
+_replica_counter = itertools.count()
+_replica_down_until = {}
 
+# Set after a write, so that following reads see it
+_use_primary = contextvars.ContextVar("critiquebrainz_db_use_primary", default=False)
+_written = contextvars.ContextVar("critiquebrainz_db_written", default=False)
+# ID of the user on whose behalf the current request is handled
+_request_user_id = contextvars.ContextVar("critiquebrainz_db_request_user_id", default=None)
 
-def init_db_engine(connect_str):
+# Redis namespace of users whose reads go to the primary database after a write
+USE_PRIMARY_CACHE_NAMESPACE = "db_use_primary"
+
+
+def init_db_engine(connect_str, **engine_options):
+    """Create the engine of the CritiqueBrainz database.
+
+    Args:
+        connect_str (str): Database URI.
+        engine_options: Connection pool options, see `pool.get_engine_options`.
+    """
     global engine
-    engine = create_engine(connect_str, poolclass=NullPool)
+    engine = pool.create_engine("critiquebrainz", connect_str, **engine_options)
+
+
+def init_replica_engines(connect_strs, **engine_options):
+    """Create engines of read-only replicas of the CritiqueBrainz database.
+
+    Args:
+        connect_strs (list): Database URIs of the replicas.
+        engine_options: Connection pool options, see `pool.get_engine_options`.
+    """
+    global replica_engines
+    replica_engines = [
+        pool.create_engine("critiquebrainz_replica_{}".format(i), connect_str, **engine_options)
+        for i, connect_str in enumerate(connect_strs or [])
+    ]
+    _replica_down_until.clear()
+
+
+@contextmanager
+def _connect_primary(read_only=False):
+    with engine.connect() as connection:
+        if read_only:
+            connection.execution_options(postgresql_readonly=True)
+        yield connection
+
+
+@contextmanager
+def _connect_replica():
+    """Connect to the next available replica, or to the primary database if there's none."""
+    for _ in range(len(replica_engines)):
+        index = next(_replica_counter) % len(replica_engines)
+        if _replica_down_until.get(index, 0) > time.monotonic():
+            continue
+        try:
+            connection = replica_engines[index].connect()
+        except OperationalError:
+            logging.warning("Can't connect to database replica %d", index, exc_info=True)
+            _replica_down_until[index] = time.monotonic() + REPLICA_RETRY_INTERVAL
+            continue
+        with connection:
+            yield connection
+        return
+    with engine.connect() as connection:
+        yield connection
+
+
+class _ScopedConnection:
+    """Connection shared by database functions called in a scope.
+
+    The connection is opened when it's first needed. Transactions which are
+    implicitly started by reads are ended as soon as the outermost function
+    using the connection returns, so that the connection doesn't stay idle in
+    a transaction.
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._exit_stack = ExitStack()
+        self._transaction = None
+        self._depth = 0
+        self.connection = None
+
+    def in_transaction(self):
+        return self._transaction is not None
+
+    @contextmanager
+    def use(self, transaction):
+        if self.connection is None:
+            self.connection = self._exit_stack.enter_context(self._connect())
+        connection = self.connection
+        outermost = self._depth == 0
+        self._depth += 1
+        try:
+            if transaction and self._transaction is None:
+                if connection.in_transaction():
+                    # Only reads have been done in the implicit transaction
+                    connection.commit()
+                self._transaction = connection.begin()
+                try:
+                    yield connection
+                except BaseException:
+                    self._transaction.rollback()
+                    raise
+                else:
+                    self._transaction.commit()
+                finally:
+                    self._transaction = None
+            else:
+                yield connection
+        finally:
+            self._depth -= 1
+            if outermost and self._transaction is None and connection.in_transaction():
+                connection.rollback()
+
+    def close(self):
+        self._exit_stack.close()
+        self.connection = None
+
+
+class _ConnectionScope:
+
+    def __init__(self, read_only):
+        self.read_only = read_only
+        self.primary = _ScopedConnection(lambda: _connect_primary(read_only))
+        self.replica = _ScopedConnection(_connect_replica)
+
+    def close(self):
+        self.primary.close()
+        self.replica.close()
+
+
+_scope = contextvars.ContextVar("critiquebrainz_db_scope", default=None)
+
+
+@contextmanager
+def scoped_connection(read_only=False):
+    """Share one connection between all database functions called in the block.
+
+    Functions which use `connect` or `begin` pick up the connection automatically.
+    Reads which can be done on a replica share another connection to a replica.
+    If a scope is already active, it is used and `read_only` is ignored.
+
+    Args:
+        read_only (bool): Use a read-only connection. Functions which write to
+            the database still open their own connection in this case.
+    """
+    if _scope.get() is not None:
+        yield
+        return
+    scope = _ConnectionScope(read_only)
+    token = _scope.set(scope)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+        scope.close()
+
+
+@contextmanager
+def connect(connection=None, *, replica=False):
+    """Get a connection for reading from the database.
+
+    Args:
+        connection: Connection which should be used. If it's None, the connection
+            of the current scope or a new connection is used.
+        replica (bool): The reads can be done on a replica of the database, if
+            replicas are configured. Reads go to the primary database anyway
+            after a write was done in the current context (request).
+    """
+    if connection is not None:
+        yield connection
+        return
+    replica = replica and bool(replica_engines) and not _use_primary.get()
+    scope = _scope.get()
+    if scope is None:
+        with (_connect_replica() if replica else engine.connect()) as connection:
+            yield connection
+        return
+    if replica and not scope.primary.in_transaction():
+        scoped = scope.replica
+    else:
+        scoped = scope.primary
+    with scoped.use(transaction=False) as connection:
+        yield connection
+
+
+@contextmanager
+def begin(connection=None):
+    """Get a connection with a transaction, which is committed at the end of the block.
+
+    If the connection is already in a transaction, that transaction is used and
+    whoever started it is responsible for committing it.
+
+    Args:
+        connection: Connection which should be used. If it's None, the connection
+            of the current scope or a new connection is used.
+    """
+    if connection is not None:
+        if connection.in_transaction():
+            yield connection
+        else:
+            with connection.begin():
+                yield connection
+        _record_write()
+        return
+    scope = _scope.get()
+    if scope is None or scope.read_only:
+        with engine.begin() as connection:
+            yield connection
+    else:
+        with scope.primary.use(transaction=True) as connection:
+            yield connection
+    _record_write()
+
+
+def _record_write():
+    _use_primary.set(True)
+    _written.set(True)
+
+
+def set_request_user(user_id):
+    """Set the user on whose behalf the current request is handled.
+
+    Reads of the request go to the primary database if the user did a write
+    during the last SQLALCHEMY_REPLICA_STICKY_SECONDS.
+
+    Args:
+        user_id (uuid): ID of the user, or None for anonymous requests.
+    """
+    _request_user_id.set(user_id)
+    if replica_engines and user_id is not None \
+            and cache.get(str(user_id), namespace=USE_PRIMARY_CACHE_NAMESPACE):
+        _use_primary.set(True)
+
+
+def _stick_user_to_primary(sticky_seconds):
+    """Send reads of the user of the current request to the primary database for `sticky_seconds`."""
+    user_id = _request_user_id.get()
+    if replica_engines and sticky_seconds and _written.get() and user_id is not None:
+        cache.set(str(user_id), 1, expirein=sticky_seconds, namespace=USE_PRIMARY_CACHE_NAMESPACE)
+
+
+def init_request_scope(app, get_user_id=None):
+    """Set up connection handling for requests.
+
+    If the SQLALCHEMY_REQUEST_SCOPED_CONNECTION option is enabled, a connection
+    is shared between all database functions called while handling a request.
+    Connections of GET, HEAD and OPTIONS requests are read-only.
+
+    If replicas are configured, reads go to the primary database for
+    SQLALCHEMY_REPLICA_STICKY_SECONDS after a user did a write, so that the
+    user sees their own changes. The user of a request is set with
+    `set_request_user`.
+
+    Args:
+        app: Flask application.
+        get_user_id (callable): Function which returns the ID of the user of the
+            current request, or None. It's called before each request. Users that
+            are only known later, like ones authenticated with a token, need to
+            be set with `set_request_user` instead.
+    """
+    from flask import g, request
+
+    sticky_seconds = app.config.get("SQLALCHEMY_REPLICA_STICKY_SECONDS", 0)
+
+    @app.before_request
+    def open_scope():
+        _use_primary.set(False)
+        _written.set(False)
+        _request_user_id.set(None)
+        if app.config.get("SQLALCHEMY_REQUEST_SCOPED_CONNECTION"):
+            g._db_scope = scoped_connection(read_only=request.method in ("GET", "HEAD", "OPTIONS"))
+            g._db_scope.__enter__()
+        if get_user_id is not None:
+            set_request_user(get_user_id())
+
+    @app.after_request
+    def stick_to_primary(response):
+        _stick_user_to_primary(sticky_seconds)
+        return response
+
+    @app.teardown_request
+    def close_scope(exception):
+        db_scope = g.pop("_db_scope", None)
+        if db_scope is not None:
+            db_scope.__exit__(None, None, None)
 
 
 def run_sql_script(sql_file_path):
@@ -4,74 +4,138 @@ from critiquebrainz import db
 from critiquebrainz.db import exceptions as db_exceptions
 
 
-def update(entity_id, entity_type):
-    """Updates the average rating of the entity
+def adjust(connection, entity_id, entity_type, *, old_rating=None, new_rating=None):
+    """Adjust the average rating of the entity after the rating of one review has changed
 
-    It is done by selecting ratings from the latest revisions of all reviews
-    for a given entity.
+    The sum and the number of ratings of the entity are stored along with the
+    average, so only the difference between the old and the new rating needs
+    to be applied. Ratings of hidden reviews must not be counted.
 
     Args:
+        connection: connection to database to update the average rating
         entity_id (uuid): ID of the entity
         entity_type (str): Type of the entity
+        old_rating (int): Previously counted rating on a scale 0-100, None if it wasn't counted
+        new_rating (int): Rating on a scale 0-100 which needs to be counted, None if there is none
     """
-    with db.engine.connect() as connection:
-        result = connection.execute(sqlalchemy.text("""
-            WITH LatestRevisions AS (
-                SELECT review_id,
-                       MAX("timestamp") created_at
-                  FROM revision
-                 WHERE review_id in (
-                           SELECT id
-                             FROM review
-                            WHERE entity_id = :entity_id
-                              AND entity_type = :entity_type
-                              AND is_hidden = 'f')
-              GROUP BY review_id
-            )
-            SELECT SUM(rating),
-                   COUNT(rating)
-              FROM revision
-        INNER JOIN LatestRevisions
-                ON revision.review_id = LatestRevisions.review_id
-               AND revision.timestamp = LatestRevisions.created_at
+    if old_rating == new_rating:
+        return
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    result = connection.execute(sqlalchemy.text("""
+        INSERT INTO avg_rating(entity_id, entity_type, rating, count, rating_sum)
+             VALUES (:entity_id, :entity_type, 0, :count_delta, :sum_delta)
+        ON CONFLICT
+      ON CONSTRAINT avg_rating_pkey
+          DO UPDATE
+                SET count = avg_rating.count + EXCLUDED.count,
+                    rating_sum = avg_rating.rating_sum + EXCLUDED.rating_sum
+          RETURNING count, rating_sum
+    """), {
+        "entity_id": entity_id,
+        "entity_type": entity_type,
+        "count_delta": count_delta,
+        "sum_delta": sum_delta,
+    })
+    count, rating_sum = result.fetchone()
+
+    if count <= 0:
+        connection.execute(sqlalchemy.text("""
+            DELETE
+              FROM avg_rating
+             WHERE entity_id = :entity_id
+               AND entity_type = :entity_type
         """), {
             "entity_id": entity_id,
             "entity_type": entity_type,
         })
-        row = result.fetchone()
+        return
+    connection.execute(sqlalchemy.text("""
+        UPDATE avg_rating
+           SET rating = :rating
+         WHERE entity_id = :entity_id
+           AND entity_type = :entity_type
+    """), {
+        "entity_id": entity_id,
+        "entity_type": entity_type,
+        "rating": int(rating_sum / count + 0.5),
+    })
 
-    # Calculate average rating and update it
-    sum, count = row[0], row[1]
 
-    if count == 0:
-        delete(entity_id, entity_type)
+def update_entities(connection, entity_ids):
+    """Recompute average ratings of the given entities
+
+    This is used when many reviews are added at once, so that the average
+    rating of every entity is computed once instead of being adjusted for
+    each review.
+
+    Args:
+        connection: connection to database to update the average ratings
+        entity_ids (iterable): IDs of the entities
+    """
+    entity_ids = tuple(str(entity_id) for entity_id in entity_ids)
+    if not entity_ids:
         return
-    avg_rating = int(sum / count + 0.5)
-    with db.engine.begin() as connection:
-        connection.execute(sqlalchemy.text("""
-            INSERT INTO avg_rating(entity_id, entity_type, rating, count)
-                 VALUES (:entity_id, :entity_type, :rating, :count)
-            ON CONFLICT
-          ON CONSTRAINT avg_rating_pkey
-              DO UPDATE
-                    SET rating = EXCLUDED.rating,
-                        count = EXCLUDED.count
-        """), {
-            "entity_id": entity_id,
-            "entity_type": entity_type,
-            "rating": avg_rating,
-            "count": count,
-        })
+    connection.execute(sqlalchemy.text("""
+        INSERT INTO avg_rating(entity_id, entity_type, rating, count, rating_sum)
+             SELECT entity_id,
+                    entity_type,
+                    FLOOR(SUM(rating)::numeric / COUNT(rating) + 0.5),
+                    COUNT(rating),
+                    SUM(rating)
+               FROM review
+               JOIN revision
+                 ON revision.id = review.last_revision_id
+              WHERE entity_id IN :entity_ids
+                AND is_hidden = 'f'
+                AND rating IS NOT NULL
+           GROUP BY entity_id, entity_type
+        ON CONFLICT
+      ON CONSTRAINT avg_rating_pkey
+          DO UPDATE
+                SET rating = EXCLUDED.rating,
+                    count = EXCLUDED.count,
+                    rating_sum = EXCLUDED.rating_sum
+    """), {
+        "entity_ids": entity_ids,
+    })
+
+
+def update_all(connection):
+    """Recompute average ratings of all entities
+
+    It is done by selecting ratings from the latest revisions of all reviews
+    which are not hidden. Average ratings are normally maintained by `adjust`,
+    so this is only needed after importing a data dump or to repair the values.
+
+    Args:
+        connection: connection to database to update the average ratings
+    """
+    connection.execute(sqlalchemy.text("DELETE FROM avg_rating"))
+    connection.execute(sqlalchemy.text("""
+        INSERT INTO avg_rating(entity_id, entity_type, rating, count, rating_sum)
+             SELECT entity_id,
+                    entity_type,
+                    FLOOR(SUM(rating)::numeric / COUNT(rating) + 0.5),
+                    COUNT(rating),
+                    SUM(rating)
+               FROM review
+               JOIN revision
+                 ON revision.id = review.last_revision_id
+              WHERE is_hidden = 'f'
+                AND rating IS NOT NULL
+           GROUP BY entity_id, entity_type
+    """))
 
 
-def delete(entity_id, entity_type):
+def delete(entity_id, entity_type, *, connection=None):
     """Deletes the avg_rating, given entity_id and entity_type
 
     Args:
         entity_id (uuid): ID of the entity
         entity_type (str): Type of the entity
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             DELETE
               FROM avg_rating
@@ -83,7 +147,7 @@ def delete(entity_id, entity_type):
         })
 
 
-def get(entity_id, entity_type):
+def get(entity_id, entity_type, *, connection=None):
     """Get average rating from entity_id
 
     Args:
@@ -98,7 +162,7 @@ def get(entity_id, entity_type):
             "count": int,
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT entity_id,
                    entity_type,
@@ -21,10 +21,11 @@ import sqlalchemy
 import critiquebrainz.db as db
 import critiquebrainz.db.comment_revision as db_comment_revision
 import critiquebrainz.db.exceptions as db_exceptions
+import critiquebrainz.db.query_cache as query_cache
 from critiquebrainz.db.user import User
 
 
-def create(*, user_id, text, review_id, is_draft=False):
+def create(*, user_id, text, review_id, is_draft=False, connection=None):
     """Create a new comment.
 
     Args:
@@ -36,7 +37,7 @@ def create(*, user_id, text, review_id, is_draft=False):
     Returns:
         the newly created comment in dict form
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             INSERT INTO comment (user_id, review_id, is_draft)
                  VALUES (:user_id, :review_id, :is_draft)
@@ -48,10 +49,10 @@ def create(*, user_id, text, review_id, is_draft=False):
                 })
         comment_id = result.fetchone().id
         db_comment_revision.create(connection, comment_id, text)
-    return get_by_id(comment_id)
+        return get_by_id(comment_id, connection=connection)
 
 
-def get_by_id(comment_id):
+def get_by_id(comment_id, *, connection=None):
     """ Get a comment by its ID.
 
     Args:
@@ -74,7 +75,7 @@ def get_by_id(comment_id):
             'user',
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT c.id,
                    c.review_id,
@@ -122,7 +123,7 @@ def get_by_id(comment_id):
         return comment
 
 
-def list_comments(*, review_id=None, user_id=None, limit=20, offset=0, inc_hidden=False):
+def list_comments(*, review_id=None, user_id=None, limit=20, offset=0, inc_hidden=False, connection=None):
     """ Returns a list of comments according the specified filters.
 
     Args:
@@ -158,8 +159,8 @@ def list_comments(*, review_id=None, user_id=None, limit=20, offset=0, inc_hidde
     query_vals['limit'] = limit
     query_vals['offset'] = offset
 
-    with db.engine.connect() as connection:
-        result = connection.execute(sqlalchemy.text("""
+    with db.connect(connection) as connection:
+        result = connection.execute(query_cache.get_query("""
             SELECT comment.id,
                    comment.review_id,
                    comment.user_id,
@@ -197,7 +198,7 @@ def list_comments(*, review_id=None, user_id=None, limit=20, offset=0, inc_hidde
           ORDER BY created
              LIMIT :limit
             OFFSET :offset
-            """.format(where_clause=filterstr)), query_vals)
+            """, where_clause=filterstr), query_vals)
 
         rows = [dict(row) for row in result.mappings()]
         for row in rows:
@@ -219,13 +220,13 @@ def list_comments(*, review_id=None, user_id=None, limit=20, offset=0, inc_hidde
     return rows, len(rows)
 
 
-def delete(comment_id):
+def delete(comment_id, *, connection=None):
     """ Delete the comment with the specified ID.
 
     Args:
         comment_id (uuid): the ID of the comment to be deleted.
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             DELETE
               FROM comment
@@ -235,7 +236,7 @@ def delete(comment_id):
                 })
 
 
-def update(comment_id, *, text=None, is_draft=None, is_hidden=None):
+def update(comment_id, *, text=None, is_draft=None, is_hidden=None, connection=None):
     """ Update the comment with the specified ID.
 
     Args:
@@ -266,7 +267,7 @@ def update(comment_id, *, text=None, is_draft=None, is_hidden=None):
 
     setstr = ', '.join(updates)
     update_data['comment_id'] = comment_id
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
                 UPDATE comment
                    SET {setstr}
@@ -277,7 +278,7 @@ def update(comment_id, *, text=None, is_draft=None, is_hidden=None):
             db_comment_revision.create(connection, comment_id, text)
 
 
-def count_comments(*, review_id=None, user_id=None, is_hidden=None, is_draft=None):
+def count_comments(*, review_id=None, user_id=None, is_hidden=None, is_draft=None, connection=None):
     """ Returns the number of comments that satisfy provided filters.
 
     Args:
@@ -311,7 +312,7 @@ def count_comments(*, review_id=None, user_id=None, is_hidden=None, is_draft=Non
     if filters:
         filterstr = 'WHERE {conditions}'.format(conditions=' AND '.join(filters))
 
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT COUNT(*)
               FROM comment
@@ -3,7 +3,7 @@ import sqlalchemy
 from critiquebrainz import db
 
 
-def create(*, id, full_name, info_url=None):
+def create(*, id, full_name, info_url=None, connection=None):
     """Create a new license.
 
     Args:
@@ -23,7 +23,7 @@ def create(*, id, full_name, info_url=None):
         "full_name": full_name,
         "info_url": info_url,
     }
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             INSERT INTO license(id, full_name, info_url)
                  VALUES (:id, :full_name, :info_url)
@@ -31,13 +31,13 @@ def create(*, id, full_name, info_url=None):
     return license
 
 
-def delete(*, id):
+def delete(*, id, connection=None):
     """Delete a license.
 
     Args:
         id (str): ID of the license.
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             DELETE
               FROM license
@@ -62,7 +62,7 @@ def get_licenses_list(connection):
     return [dict(row) for row in results.mappings()]
 
 
-def list_licenses():
+def list_licenses(*, connection=None):
     """Get a list of licenses.
 
     Returns:
@@ -73,5 +73,5 @@ def list_licenses():
             "full_name": (str),
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         return get_licenses_list(connection)
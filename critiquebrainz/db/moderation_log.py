@@ -8,6 +8,7 @@ from enum import Enum
 import sqlalchemy
 
 from critiquebrainz import db
+from critiquebrainz.db import query_cache
 
 
 class AdminActions(Enum):
@@ -24,7 +25,7 @@ class AdminActions(Enum):
 
 
 def create(*, admin_id, review_id=None, user_id=None,
-           action, reason):
+           action, reason, connection=None):
     """Make a record in the moderation log.
 
     Args:
@@ -38,7 +39,7 @@ def create(*, admin_id, review_id=None, user_id=None,
         raise ValueError("No review ID or user ID specified.")
     if action not in AdminActions.get_all_actions():
         raise ValueError("Please specify a valid action.")
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             INSERT INTO moderation_log(admin_id, user_id, review_id, action, timestamp, reason)
                  VALUES (:admin_id, :user_id, :review_id, :action, :timestamp, :reason)
@@ -52,7 +53,7 @@ def create(*, admin_id, review_id=None, user_id=None,
         })
 
 
-def list_logs(*, admin_id=None, limit=None, offset=None):
+def list_logs(*, admin_id=None, limit=None, offset=None, connection=None):
     """Get a list of log entries.
 
     Args:
@@ -74,19 +75,13 @@ def list_logs(*, admin_id=None, limit=None, offset=None):
     if filterstr:
         where_clause = "WHERE " + filterstr
 
-    query = sqlalchemy.text("""
+    count_query = query_cache.get_query("""
         SELECT COUNT(*)
           FROM moderation_log
         {where_clause}
-    """.format(where_clause=where_clause))
-    with db.engine.connect() as connection:
-        result = connection.execute(query, filter_data)
-        count = result.fetchone().count
-
-    filter_data["limit"] = limit
-    filter_data["offset"] = offset
+    """, where_clause=where_clause)
 
-    query = sqlalchemy.text("""
+    query = query_cache.get_query("""
         SELECT moderation_log.id,
                admin_id,
                review_id,
@@ -137,10 +132,13 @@ def list_logs(*, admin_id=None, limit=None, offset=None):
       ORDER BY timestamp DESC
          LIMIT :limit
         OFFSET :offset
-    """.format(where_clause=where_clause))
+    """, where_clause=where_clause)
+
+    with db.connect(connection) as connection:
+        result = connection.execute(count_query, filter_data)
+        count = result.fetchone().count
 
-    with db.engine.connect() as connection:
-        result = connection.execute(query, filter_data)
+        result = connection.execute(query, dict(filter_data, limit=limit, offset=offset))
         logs = []
         for log in result.mappings():
             log = dict(log)
@@ -8,7 +8,7 @@ CLIENT_ID_LENGTH = 20
 CLIENT_SECRET_LENGTH = 40
 
 
-def create(*, user_id, name, desc, website, redirect_uri):
+def create(*, user_id, name, desc, website, redirect_uri, connection=None):
     """Creates new OAuth client and generates secret key for it.
 
     Args:
@@ -29,7 +29,7 @@ def create(*, user_id, name, desc, website, redirect_uri):
             "redirect_uri": redirect_uri,
         }
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         row = connection.execute(sqlalchemy.text("""
             INSERT INTO oauth_client (client_id, client_secret, redirect_uri,
                         user_id, name, "desc", website)
@@ -48,7 +48,7 @@ def create(*, user_id, name, desc, website, redirect_uri):
         return dict(row.mappings().first())
 
 
-def update(*, client_id, name=None, desc=None, website=None, redirect_uri=None):
+def update(*, client_id, name=None, desc=None, website=None, redirect_uri=None, connection=None):
     """Update information related to a OAuth client
 
     Args:
@@ -83,17 +83,17 @@ def update(*, client_id, name=None, desc=None, website=None, redirect_uri=None):
     """.format(update_str=update_str))
 
     if update_str:
-        with db.engine.begin() as connection:
+        with db.begin(connection) as connection:
             connection.execute(query, update_data)
 
 
-def delete(client_id):
+def delete(client_id, *, connection=None):
     """Delete OAuth client.
 
     Args:
         client_id(str): ID of the OAuth Client.
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             DELETE
               FROM oauth_client
@@ -103,7 +103,7 @@ def delete(client_id):
         })
 
 
-def get_client(client_id):
+def get_client(client_id, *, connection=None):
     """Get info about an OAuth Client.
 
     Args:
@@ -120,7 +120,7 @@ def get_client(client_id):
             "website": str,
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT client_id,
                    client_secret,
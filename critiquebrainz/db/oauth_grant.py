@@ -4,7 +4,7 @@ from critiquebrainz import db
 from critiquebrainz.db import exceptions as db_exceptions
 
 
-def create(*, client_id, scopes, code, expires, redirect_uri, user_id):
+def create(*, client_id, scopes, code, expires, redirect_uri, user_id, connection=None):
     """Add OAuth Grant to database.
 
     Args:
@@ -35,7 +35,7 @@ def create(*, client_id, scopes, code, expires, redirect_uri, user_id):
         "user_id": user_id,
         "scopes": scopes,
     }
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             INSERT INTO oauth_grant(client_id, code, expires, redirect_uri, scopes, user_id)
                  VALUES (:client_id, :code, :expires, :redirect_uri, :scopes, :user_id)
@@ -45,7 +45,7 @@ def create(*, client_id, scopes, code, expires, redirect_uri, user_id):
     return grant
 
 
-def list_grants(*, client_id=None, code=None, limit=1, offset=None):
+def list_grants(*, client_id=None, code=None, limit=1, offset=None, connection=None):
     """Returns the list of OAuth Grants.
 
     Args:
@@ -83,7 +83,7 @@ def list_grants(*, client_id=None, code=None, limit=1, offset=None):
     filter_data["limit"] = limit
     filter_data["offset"] = offset
 
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         results = connection.execute(sqlalchemy.text("""
             SELECT id,
                    client_id,
@@ -101,14 +101,14 @@ def list_grants(*, client_id=None, code=None, limit=1, offset=None):
         return [dict(row) for row in rows]
 
 
-def delete(*, client_id, code):
+def delete(*, client_id, code, connection=None):
     """Delete an OAuth Token.
 
     Args:
         client_id (str): ID of the OAuth Client.
         code (str): The authorization code returned from authorization request.
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             DELETE
               FROM oauth_grant
@@ -120,7 +120,7 @@ def delete(*, client_id, code):
         })
 
 
-def get_scopes(grant_id):
+def get_scopes(grant_id, *, connection=None):
     """Returns the scopes of an application.
 
     Args:
@@ -128,7 +128,7 @@ def get_scopes(grant_id):
     Returns:
         scopes: (list).
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT scopes
               FROM oauth_grant
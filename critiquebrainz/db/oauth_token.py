@@ -4,7 +4,7 @@ from critiquebrainz import db
 from critiquebrainz.db import exceptions as db_exceptions
 
 
-def create(*, client_id, scopes, access_token, refresh_token, expires, user_id):
+def create(*, client_id, scopes, access_token, refresh_token, expires, user_id, connection=None):
     """Add OAuth Token to database.
 
     Args:
@@ -35,7 +35,7 @@ def create(*, client_id, scopes, access_token, refresh_token, expires, user_id):
         "user_id": user_id,
         "scopes": scopes,
     }
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             INSERT INTO oauth_token(client_id, access_token, refresh_token, expires, scopes, user_id)
                  VALUES (:client_id, :access_token, :refresh_token, :expires, :scopes, :user_id)
@@ -45,7 +45,7 @@ def create(*, client_id, scopes, access_token, refresh_token, expires, user_id):
     return token
 
 
-def list_tokens(*, client_id=None, refresh_token=None, access_token=None, limit=1, offset=None):
+def list_tokens(*, client_id=None, refresh_token=None, access_token=None, limit=1, offset=None, connection=None):
     """Returns the list of OAuth Tokens.
 
     Args:
@@ -89,7 +89,7 @@ def list_tokens(*, client_id=None, refresh_token=None, access_token=None, limit=
     filter_data["limit"] = limit
     filter_data["offset"] = offset
 
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         results = connection.execute(sqlalchemy.text("""
             SELECT oauth_token.id,
                    oauth_token.client_id,
@@ -111,7 +111,7 @@ def list_tokens(*, client_id=None, refresh_token=None, access_token=None, limit=
         return [dict(row) for row in rows]
 
 
-def delete(*, client_id=None, refresh_token=None, user_id=None):
+def delete(*, client_id=None, refresh_token=None, user_id=None, connection=None):
     """Delete an OAuth Token.
 
     Args:
@@ -128,7 +128,7 @@ def delete(*, client_id=None, refresh_token=None, user_id=None):
         filters.append("user_id = :user_id")
         filter_data["user_id"] = user_id
     filterstr = " AND ".join(filters)
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             DELETE
               FROM oauth_token
@@ -136,7 +136,7 @@ def delete(*, client_id=None, refresh_token=None, user_id=None):
         """.format(filterstr=filterstr)), filter_data)
 
 
-def get_scopes(token_id):
+def get_scopes(token_id, *, connection=None):
     """Returns the scopes of an application.
 
     Args:
@@ -144,7 +144,7 @@ def get_scopes(token_id):
     Returns:
         scopes: (list).
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT scopes
               FROM oauth_token
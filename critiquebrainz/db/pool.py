@@ -0,0 +1,194 @@
+"""Connection pooling of the database engines.
+
+Engines are created with NullPool by default, which opens a new connection
+every time one is needed. Pooling can be enabled with the following options,
+where the prefix is "SQLALCHEMY" for the CritiqueBrainz database and
+"BB_DATABASE" for the BookBrainz database:
+
+    <prefix>_POOL_CLASS: "NullPool" or "QueuePool"
+    <prefix>_POOL_SIZE: number of connections kept open by QueuePool
+    <prefix>_MAX_OVERFLOW: number of connections QueuePool can open above the pool size
+    <prefix>_POOL_TIMEOUT: seconds to wait for a connection from QueuePool before giving up
+    <prefix>_POOL_RECYCLE: seconds after which connections are replaced
+    <prefix>_POOL_PRE_PING: check that connections are alive before using them
+
+Pools are emptied in child processes after fork (e.g. in uWSGI workers), so
+that connections opened in the parent process are never shared.
+"""
+import os
+import threading
+import time
+
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+
+from critiquebrainz.db import query_stats
+
+# Engines with metrics, by name
+_engines = {}
+
+
+class PoolMetrics:
+    """Connection checkout counters of an engine in the current process.
+
+    Checkout times are also added to statement statistics of the current request.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_time = 0.0
+        self.max_checkout_time = 0.0
+        self.active = 0
+
+    def record_checkout(self, duration):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_time += duration
+            self.max_checkout_time = max(self.max_checkout_time, duration)
+        query_stats.record_checkout(self.name, duration)
+
+    def record_active(self, delta):
+        with self._lock:
+            self.active += delta
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_time": self.checkout_time,
+                "avg_checkout_time": self.checkout_time / self.checkouts if self.checkouts else 0.0,
+                "max_checkout_time": self.max_checkout_time,
+                "active": self.active,
+            }
+
+
+class _TimedCheckoutMixin:
+    """Measures how long it takes to get a connection from the pool.
+
+    This includes waiting for a connection to be returned to the pool and
+    opening new connections.
+    """
+    metrics = None
+
+    def connect(self):
+        start = time.perf_counter()
+        connection = super().connect()
+        if self.metrics is not None:
+            self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedNullPool(_TimedCheckoutMixin, NullPool):
+    pass
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+POOL_CLASSES = {
+    "NullPool": TimedNullPool,
+    "QueuePool": TimedQueuePool,
+}
+
+
+def get_engine_options(config, prefix):
+    """Get connection pool arguments of `create_engine` from the app configuration.
+
+    Args:
+        config (dict): Configuration of the app.
+        prefix (str): Prefix of the pool options of the database, like "SQLALCHEMY".
+
+    Returns:
+        Dictionary with keyword arguments for `create_engine`.
+    """
+    pool_class = config.get(prefix + "_POOL_CLASS") or "NullPool"
+    if pool_class not in POOL_CLASSES:
+        raise ValueError("Unsupported {prefix}_POOL_CLASS: {pool_class}".format(prefix=prefix, pool_class=pool_class))
+    options = {
+        "poolclass": POOL_CLASSES[pool_class],
+        "pool_pre_ping": bool(config.get(prefix + "_POOL_PRE_PING", False)),
+    }
+    if config.get(prefix + "_POOL_RECYCLE") is not None:
+        options["pool_recycle"] = config[prefix + "_POOL_RECYCLE"]
+    if pool_class == "QueuePool":
+        for option, key in (("pool_size", "_POOL_SIZE"), ("max_overflow", "_MAX_OVERFLOW"),
+                            ("pool_timeout", "_POOL_TIMEOUT")):
+            if config.get(prefix + key) is not None:
+                options[option] = config[prefix + key]
+    return options
+
+
+def create_engine(name, connect_str, **engine_options):
+    """Create an engine which pool metrics and statement statistics are collected under `name`."""
+    engine_options.setdefault("poolclass", TimedNullPool)
+    engine = sqlalchemy.create_engine(connect_str, **engine_options)
+    metrics = PoolMetrics(name)
+    if isinstance(engine.pool, _TimedCheckoutMixin):
+        engine.pool.metrics = metrics
+    event.listen(engine, "checkout", lambda *args: metrics.record_active(1))
+    event.listen(engine, "checkin", lambda *args: metrics.record_active(-1))
+    query_stats.instrument_engine(name, engine)
+
+    previous = _engines.get(name)
+    if previous is not None:
+        previous[0].dispose()
+    _engines[name] = (engine, metrics)
+    return engine
+
+
+def get_pool_metrics():
+    """Get connection pool metrics of all engines in the current process.
+
+    Returns:
+        Dictionary with engine names as keys and dictionaries with the following
+        structure as values:
+        {
+            "checkouts": (int),
+            "checkout_time": (float), total seconds spent getting connections
+            "avg_checkout_time": (float),
+            "max_checkout_time": (float),
+            "active": (int), connections currently in use
+            "pool_size": (int), only for QueuePool
+            "checked_out": (int), only for QueuePool
+            "overflow": (int), only for QueuePool
+        }
+    """
+    result = {}
+    for name, (engine, metrics) in _engines.items():
+        result[name] = metrics.to_dict()
+        if isinstance(engine.pool, QueuePool):
+            result[name].update({
+                "pool_size": engine.pool.size(),
+                "checked_out": engine.pool.checkedout(),
+                "overflow": engine.pool.overflow(),
+            })
+    return result
+
+
+def _dispose_after_fork():
+    for engine, metrics in list(_engines.values()):
+        # Connections belong to the parent process, so they must not be closed here
+        engine.dispose(close=False)
+        metrics.reset()
+
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
+try:
+    # uWSGI forks workers without running Python's fork handlers
+    import uwsgidecorators
+    uwsgidecorators.postfork(_dispose_after_fork)
+except ImportError:
+    pass
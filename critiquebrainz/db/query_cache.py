@@ -0,0 +1,45 @@
+"""Cache of statements which are built from a template and filter clauses.
+
+Listing functions put together their SQL from the filters that are set, so
+the text of the statement only depends on which filters are used and on the
+sort order, not on the filter values, which are bound as parameters. Building
+the statement once for each such shape saves formatting the template and
+parsing the bind parameters of the text on every call, and gives SQLAlchemy's
+compiled cache and pg_stat_statements one entry per shape.
+
+psycopg2 doesn't support server-side prepared statements, so the statements
+are still planned by PostgreSQL on every execution.
+"""
+import functools
+
+import sqlalchemy
+
+# Number of statements that are kept, there are few shapes of each query
+QUERY_CACHE_SIZE = 512
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def get_query(template, **clauses):
+    """Get a statement built from `template` with `clauses` inserted in it.
+
+    Clauses must not contain any values, only bind parameters, otherwise
+    every value creates its own entry in the cache.
+
+    Args:
+        template (str): SQL with replacement fields for the clauses, as used by `str.format`.
+        **clauses (str): SQL clauses to insert in the template, like the WHERE clause.
+
+    Returns:
+        `sqlalchemy.text` construct of the statement.
+    """
+    return sqlalchemy.text(template.format(**clauses))
+
+
+def cache_info():
+    """Get hit and miss counters of the statement cache, see `functools.lru_cache`."""
+    return get_query.cache_info()
+
+
+def clear():
+    """Remove all statements from the cache."""
+    get_query.cache_clear()
@@ -0,0 +1,189 @@
+"""Statistics of SQL statements executed while handling a request.
+
+Statements executed on instrumented engines are counted and timed for each
+request. After the request the numbers are written to the log, along with
+a warning for every statement that was executed more times than
+SQL_REPEATED_QUERY_THRESHOLD, which usually means that it is run in a loop
+(N+1 queries). Time spent waiting for connections from the pool is reported
+separately, and the log line includes connection pool metrics of the process
+and other metrics registered with `register_metrics`, like those of the local
+entity cache.
+In debug mode the numbers are also sent to the client in the Server-Timing
+header.
+"""
+import collections
+import contextvars
+import json
+import logging
+import re
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Statistics of the current request, None outside of requests
+_stats = contextvars.ContextVar("critiquebrainz_db_query_stats", default=None)
+
+# Functions returning metrics of the process to include in the log line, by name
+_metrics = {}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PARAMETER_LIST_RE = re.compile(r"\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)*\s*\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class QueryStats:
+    """Counters of the statements executed while handling a request."""
+
+    def __init__(self):
+        self.engines = collections.defaultdict(lambda: {"count": 0, "time": 0.0, "checkout_time": 0.0})
+        self.statements = collections.Counter()
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    @property
+    def count(self):
+        return sum(engine["count"] for engine in self.engines.values())
+
+    @property
+    def time(self):
+        return sum(engine["time"] for engine in self.engines.values())
+
+    def record(self, engine_name, statement, duration):
+        self.engines[engine_name]["count"] += 1
+        self.engines[engine_name]["time"] += duration
+        self.statements[normalize(statement)] += 1
+        if duration >= self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+    def record_checkout(self, engine_name, duration):
+        self.engines[engine_name]["checkout_time"] += duration
+
+    def repeated_statements(self, threshold):
+        """Get statements executed more than `threshold` times, with the number of executions."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count > threshold]
+
+    def server_timing(self):
+        """Get the value of the Server-Timing header, with durations in milliseconds."""
+        metrics = []
+        for name, engine in self.engines.items():
+            metrics.append('db-{name};dur={duration:.1f};desc="{count} queries"'.format(
+                name=name, duration=engine["time"] * 1000, count=engine["count"],
+            ))
+            if engine["checkout_time"]:
+                metrics.append('db-{name}-checkout;dur={duration:.1f};desc="Waiting for connections"'.format(
+                    name=name, duration=engine["checkout_time"] * 1000,
+                ))
+        return ", ".join(metrics)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "time": round(self.time * 1000, 1),
+            "engines": {
+                name: {
+                    "count": engine["count"],
+                    "time": round(engine["time"] * 1000, 1),
+                    "checkout_time": round(engine["checkout_time"] * 1000, 1),
+                }
+                for name, engine in self.engines.items()
+            },
+            "slowest_time": round(self.slowest_time * 1000, 1),
+            "slowest_statement": normalize(self.slowest_statement) if self.slowest_statement else None,
+        }
+
+
+def normalize(statement):
+    """Get the statement without values and formatting, so that repeated executions are grouped together."""
+    statement = _PARAMETER_LIST_RE.sub("(?)", statement)
+    statement = _LITERAL_RE.sub("?", statement)
+    return _WHITESPACE_RE.sub(" ", statement).strip()
+
+
+def instrument_engine(name, engine):
+    """Record statements executed on `engine` under `name` in statistics of the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_stats_start"].pop()
+        stats = _stats.get()
+        if stats is not None:
+            stats.record(name, statement, duration)
+
+    @event.listens_for(engine, "handle_error")
+    def discard_timer(exception_context):
+        if exception_context.connection is not None:
+            starts = exception_context.connection.info.get("query_stats_start")
+            if starts:
+                starts.pop()
+
+
+def record_checkout(engine_name, duration):
+    """Record time spent getting a connection of `engine_name` in statistics of the current request."""
+    stats = _stats.get()
+    if stats is not None:
+        stats.record_checkout(engine_name, duration)
+
+
+def register_metrics(name, get_metrics):
+    """Include the result of `get_metrics()` in the log line of each request under `name`."""
+    _metrics[name] = get_metrics
+
+
+def start():
+    """Start collecting statistics of statements in the current context."""
+    stats = QueryStats()
+    _stats.set(stats)
+    return stats
+
+
+def stop():
+    """Stop collecting statistics and return the collected ones."""
+    stats = _stats.get()
+    _stats.set(None)
+    return stats
+
+
+def init_app(app):
+    """Collect statistics of statements executed while handling requests of `app`.
+
+    Statistics are collected if the SQL_QUERY_STATS option is enabled. They
+    are only sent in the Server-Timing header in debug mode, since they reveal
+    details of the database to clients.
+    """
+    from flask import request
+    from critiquebrainz.db import pool
+
+    if not app.config.get("SQL_QUERY_STATS"):
+        return
+    threshold = app.config.get("SQL_REPEATED_QUERY_THRESHOLD", 10)
+
+    @app.before_request
+    def start_query_stats():
+        start()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = stop()
+        if stats is None or not stats.engines:
+            return response
+        if app.debug:
+            response.headers.add("Server-Timing", stats.server_timing())
+        logger.info("SQL statistics: %s", json.dumps(dict(
+            stats.to_dict(),
+            pools=pool.get_pool_metrics(),
+            **{name: get_metrics() for name, get_metrics in _metrics.items()},
+            method=request.method,
+            path=request.path,
+            endpoint=request.endpoint,
+        )))
+        for statement, count in stats.repeated_statements(threshold):
+            logger.warning("Statement executed %d times while handling %s %s: %s",
+                           count, request.method, request.path, statement)
+        return response
@@ -1,5 +1,8 @@
+import base64
+import json
+import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 from random import shuffle
 from typing import List
 
@@ -11,13 +14,19 @@ from flask_babel import lazy_gettext
 
 from critiquebrainz import db
 from critiquebrainz.db import (exceptions as db_exceptions,
+                               query_cache,
                                revision as db_revision,
                                users as db_users,
+                               vote as db_vote,
                                avg_rating as db_avg_rating,
-                               RATING_SCALE_1_5)
+                               RATING_SCALE_0_100,
+                               RATING_SCALE_1_5,
+                               VALID_RATING_VALUES)
 from critiquebrainz.db.user import User
 
 REVIEW_CACHE_NAMESPACE = "Review"
+REVIEW_COUNT_CACHE_TIMEOUT = 30 * 60  # 30 minutes
+WS_CACHE_GENERATION_TIMEOUT = 24 * 60 * 60  # 1 day
 DEFAULT_LICENSE_ID = "CC BY-SA 3.0"
 DEFAULT_LANG = "en"
 
@@ -42,6 +51,12 @@ BOOKBRAINZ_ENTITY_TYPES = {
 ENTITY_TYPES_MAPPING = {**MUSICBRAINZ_ENTITY_TYPES, **BOOKBRAINZ_ENTITY_TYPES}
 ENTITY_TYPES = list(ENTITY_TYPES_MAPPING.keys())
 
+#: sort expressions which can be used for keyset (cursor) pagination of review lists
+CURSOR_SORT_EXPRESSIONS = {
+    "published_on": "review.published_on",
+    "popularity": "review.votes_positive - review.votes_negative",
+}
+
 supported_languages = []
 for lang in pycountry.languages:
     if hasattr(lang, 'alpha_2'):
@@ -51,19 +66,44 @@ for lang in pycountry.languages:
 # TODO(code-master5): Rename this function. It doesn't convert a review to dictionary.
 # Review that is passed to it is already a dictionary.
 def to_dict(review, confidential=False, connection=None):
-    if connection is not None:
-        review["user"] = User(db_users.get_user_by_id(connection, review.pop("user_id")))
-    else:
-        review["user"] = User(db_users.get_by_id(review.pop("user_id")))
-    review["user"] = review["user"].to_dict(confidential=confidential)
-    review["id"] = str(review["id"])
-    review["entity_id"] = str(review["entity_id"])
-    review["last_updated"] = review["last_revision"]["timestamp"]
-    review["last_revision"]["review_id"] = str(review["last_revision"]["review_id"])
-    return review
+    return to_dicts([review], confidential=confidential, connection=connection)[0]
+
 
+def to_dicts(reviews, confidential=False, connection=None):
+    """Convert reviews into dictionaries that can be serialized.
 
-def get_by_id(review_id: uuid.UUID):
+    Authors are taken from the reviews, which carry their columns when they
+    come from get_by_ids() or get_reviews_list(). Authors of other reviews are
+    fetched in a single query.
+
+    Args:
+        reviews (list): List of reviews as returned by get_by_ids() or get_reviews_list().
+        confidential (bool): True if confidential information about authors should be included.
+        connection: connection to database to fetch the authors, a new one is opened if not specified.
+
+    Returns:
+        The same list of reviews with the "user" key set to a dictionary describing the author.
+    """
+    if not reviews:
+        return reviews
+
+    missing_user_ids = {review["user_id"] for review in reviews if not isinstance(review.get("user"), User)}
+    users = {}
+    if missing_user_ids:
+        with db.connect(connection, replica=True) as connection:
+            users = db_users.get_many_by_ids(connection, missing_user_ids)
+    for review in reviews:
+        user_id = review.pop("user_id")
+        user = review["user"] if isinstance(review.get("user"), User) else User(users[str(user_id)])
+        review["user"] = user.to_dict(confidential=confidential)
+        review["id"] = str(review["id"])
+        review["entity_id"] = str(review["entity_id"])
+        review["last_updated"] = review["last_revision"]["timestamp"]
+        review["last_revision"]["review_id"] = str(review["last_revision"]["review_id"])
+    return reviews
+
+
+def get_by_id(review_id: uuid.UUID, *, connection=None):
     """Get a review by its ID.
 
     Args:
@@ -93,13 +133,13 @@ def get_by_id(review_id: uuid.UUID):
             "published_on": datetime,
         }
     """
-    reviews = get_by_ids([review_id])
+    reviews = get_by_ids([review_id], connection=connection)
     if len(reviews) == 0:
         raise db_exceptions.NoDataFoundException(f"Can't find any reviews for the supplied IDs: {review_id}")
     return reviews[0]
 
 
-def get_by_ids(review_ids: List[uuid.UUID]):
+def get_by_ids(review_ids: List[uuid.UUID], *, connection=None):
     """Get a list of reviews by their IDs.
 
     Args:
@@ -129,7 +169,7 @@ def get_by_ids(review_ids: List[uuid.UUID]):
             "published_on": datetime,
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT review.id AS id,
                    review.entity_id,
@@ -153,10 +193,14 @@ def get_by_ids(review_ids: List[uuid.UUID]):
                    "user".musicbrainz_id,
                    COALESCE("user".musicbrainz_id, "user".id::text) as user_ref,
                    "user".is_blocked,
+                   "user".karma,
+                   "user".license_choice,
                    license.full_name,
-                   license.info_url
+                   license.info_url,
+                   revision.votes_positive,
+                   revision.votes_negative
               FROM review
-              JOIN revision ON revision.review_id = review.id
+              JOIN revision ON revision.id = review.last_revision_id
               JOIN "user" ON "user".id = review.user_id
               JOIN license ON license.id = license_id
              WHERE review.id IN :review_ids
@@ -186,31 +230,32 @@ def get_by_ids(review_ids: List[uuid.UUID]):
             "user_ref": review.pop("user_ref"),
             "email": review.pop("email"),
             "created": review.pop("user_created"),
+            "karma": review.pop("karma"),
+            "license_choice": review.pop("license_choice"),
         })
         review["license"] = {
             "id": review["license_id"],
             "info_url": review["info_url"],
             "full_name": review["full_name"],
         }
-        votes = db_revision.votes(review["last_revision"]["id"])
         review["votes"] = {
-            "positive": votes["positive"],
-            "negative": votes["negative"],
+            "positive": review.pop("votes_positive"),
+            "negative": review.pop("votes_negative"),
         }
         review["popularity"] = review["votes"]["positive"] - review["votes"]["negative"]
         results.append(review)
     return results
 
 
-def set_hidden_state(review_id, *, is_hidden):
+def set_hidden_state(review_id, *, is_hidden, connection=None):
     """Hide or reveal a review.
 
     Args:
         review_id (uuid): ID of the review the state of which needs to be changed.
         is_hidden (bool): True if review has to be hidden, False if not.
     """
-    review = get_by_id(review_id)
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
+        review = get_by_id(review_id, connection=connection)
         connection.execute(sqlalchemy.text("""
             UPDATE review
                SET is_hidden = :is_hidden
@@ -219,20 +264,26 @@ def set_hidden_state(review_id, *, is_hidden):
             "review_id": review_id,
             "is_hidden": is_hidden,
         })
-
-    # update the average rating
-    if review["rating"] is not None:
-        db_avg_rating.update(review["entity_id"], review["entity_type"])
-
-
-def get_count(*, is_draft=False, is_hidden=False):
+        if review["is_hidden"] != is_hidden:
+            if not review["is_draft"]:
+                _update_published_count(connection, review["entity_type"], -1 if is_hidden else 1)
+            # Ratings of hidden reviews are not counted in the average rating
+            rating = RATING_SCALE_0_100.get(review["rating"])
+            db_avg_rating.adjust(connection, review["entity_id"], review["entity_type"],
+                                 old_rating=None if is_hidden else rating,
+                                 new_rating=rating if not is_hidden else None)
+    invalidate_ws_entity_cache(review["entity_id"])
+    invalidate_popular_reviews_cache()
+
+
+def get_count(*, is_draft=False, is_hidden=False, connection=None):
     """Get the total number of reviews in CritiqueBrainz.
 
     Args:
         is_draft (bool): True if drafted reviews are to be counted.
         is_hidden (bool): True if hidden reviews are to be counted.
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT count(*)
               FROM review
@@ -245,7 +296,92 @@ def get_count(*, is_draft=False, is_hidden=False):
         return result.fetchone().count
 
 
-def update(review_id, *, drafted, text=None, rating=None, license_id=None, language=None, is_draft=None):
+def get_published_count(connection, entity_type=None):
+    """Get the number of published reviews which are not hidden from the maintained counter.
+
+    Args:
+        connection: connection to database to get the count
+        entity_type (str): Type of the entity that has been reviewed. Can be either one of the entities
+                           supported or "musicbrainz" or "bookbrainz". If ``None``, reviews of all entity
+                           types are counted.
+    """
+    if entity_type is None:
+        entity_types = tuple(ENTITY_TYPES)
+    elif entity_type == 'musicbrainz':
+        entity_types = tuple(MUSICBRAINZ_ENTITY_TYPES.keys())
+    elif entity_type == 'bookbrainz':
+        entity_types = tuple(BOOKBRAINZ_ENTITY_TYPES.keys())
+    else:
+        entity_types = (entity_type,)
+    result = connection.execute(sqlalchemy.text("""
+        SELECT COALESCE(SUM(count), 0)
+          FROM published_review_count
+         WHERE entity_type IN :entity_types
+    """), {
+        "entity_types": entity_types,
+    })
+    return result.fetchone()[0]
+
+
+def _update_published_count(connection, entity_type, delta):
+    connection.execute(sqlalchemy.text("""
+        INSERT INTO published_review_count (entity_type, count)
+             VALUES (:entity_type, :delta)
+        ON CONFLICT (entity_type)
+          DO UPDATE
+                SET count = published_review_count.count + EXCLUDED.count
+    """), {
+        "entity_type": entity_type,
+        "delta": delta,
+    })
+
+
+def update_published_count(connection):
+    """Recompute the maintained counter of published reviews from the review table.
+
+    Args:
+        connection: connection to database to update the counter
+    """
+    connection.execute(sqlalchemy.text("DELETE FROM published_review_count"))
+    connection.execute(sqlalchemy.text("""
+        INSERT INTO published_review_count (entity_type, count)
+             SELECT entity_type, count(*)
+               FROM review
+              WHERE is_draft = 'f'
+                AND is_hidden = 'f'
+           GROUP BY entity_type
+    """))
+
+
+def discount_user_reviews(connection, user_id):
+    """Subtract published reviews of a user from the counter of published reviews.
+
+    This needs to be done before a user is deleted, since their reviews are
+    removed together with them.
+
+    Args:
+        connection: connection to database to update the counter
+        user_id (uuid): ID of the user.
+
+    Returns:
+        Set of IDs of entities reviewed by the user.
+    """
+    result = connection.execute(sqlalchemy.text("""
+        SELECT entity_id, entity_type, is_draft, is_hidden
+          FROM review
+         WHERE user_id = :user_id
+    """), {
+        "user_id": user_id,
+    })
+    entity_ids = set()
+    for row in result.fetchall():
+        entity_ids.add(row.entity_id)
+        if not row.is_draft and not row.is_hidden:
+            _update_published_count(connection, row.entity_type, -1)
+    return entity_ids
+
+
+def update(review_id, *, drafted, text=None, rating=None, license_id=None, language=None, is_draft=None, connection=None):
     # TODO: Get rid of `drafted` argument. This information about review should be retrieved inside this function.
     """Update a review.
 
@@ -290,29 +426,21 @@ def update(review_id, *, drafted, text=None, rating=None, license_id=None, langu
          WHERE id = :review_id
     """.format(setstr=setstr))
 
-    with db.engine.begin() as connection:
+    # The new revision updates the average rating and returns the entity of the review
+    with db.begin(connection) as connection:
         if setstr:
             updated_info["review_id"] = review_id
             connection.execute(query, updated_info)
-        db_revision.create(connection, review_id, text, rating)
+        revision = db_revision.create(connection, review_id, text, rating)
+        if drafted and is_draft is False:
+            _update_published_count(connection, revision["entity_type"], 1)
 
-    db_revision.update_rating(review_id)
-
-    with db.engine.begin() as connection:
-        result = connection.execute(sqlalchemy.text("""
-                    SELECT review.entity_id
-                      FROM review
-                     WHERE review.id = :review_id
-                """), {
-            "review_id": review_id,
-        })
-        review = dict(result.mappings().first())
-        invalidate_ws_entity_cache(review["entity_id"])
+    invalidate_ws_entity_cache(revision["entity_id"])
 
 
 def create(*, entity_id, entity_type, user_id, is_draft, text=None, rating=None,
            language=DEFAULT_LANG, license_id=DEFAULT_LICENSE_ID,
-           source=None, source_url=None):
+           source=None, source_url=None, connection=None):
     """Create a new review.
 
     Optionally, if a review is being imported from external source which needs
@@ -365,7 +493,7 @@ def create(*, entity_id, entity_type, user_id, is_draft, text=None, rating=None,
     else:
         published_on = datetime.now()
 
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             INSERT INTO review (id, entity_id, entity_type, user_id, edits, is_draft, is_hidden, license_id, language, source, source_url, published_on)
             VALUES (:id, :entity_id, :entity_type, :user_id, :edits, :is_draft, :is_hidden, :license_id, :language, :source, :source_url, :published_on)
@@ -386,35 +514,269 @@ def create(*, entity_id, entity_type, user_id, is_draft, text=None, rating=None,
         })
         review_id = result.fetchone()[0]
         db_revision.create(connection, review_id, text, rating)
-    if rating:
-        db_revision.update_rating(review_id)
+        if not is_draft:
+            _update_published_count(connection, entity_type, 1)
+        review = get_by_id(review_id, connection=connection)
 
+    db_users.increment_daily_activity(user_id, "reviews")
     invalidate_ws_entity_cache(entity_id)
-    return get_by_id(review_id)
+    return review
+
+
+def create_many(reviews, *, connection=None):
+    """Create multiple published reviews at once.
+
+    This is meant for importing reviews from external sources. All reviews are
+    inserted in one transaction with a constant number of queries, average
+    ratings are recomputed once for each reviewed entity and caches are
+    invalidated once for the whole batch. Reviews of an entity which the user
+    has already reviewed are skipped.
+
+    Args:
+        reviews (list): List of dictionaries with the following keys:
+            "entity_id" (uuid), "entity_type" (str), "user_id" (uuid),
+            "text" (str), "rating" (int), "language" (str), "license_id" (str),
+            "source" (str), "source_url" (str). Only "entity_id", "entity_type",
+            "user_id" and either "text" or "rating" are required.
+
+    Returns:
+        List of IDs of the created reviews.
+    """
+    rows = []
+    for review in reviews:
+        for field in ("entity_id", "entity_type", "user_id"):
+            if review.get(field) is None:
+                raise db_exceptions.BadDataException("Review {} has no {}".format(review, field))
+        text, rating = review.get("text"), review.get("rating")
+        language = review.get("language") or DEFAULT_LANG
+        if text is None and rating is None:
+            raise db_exceptions.BadDataException("Text part and rating part of a review can not be None simultaneously")
+        if rating not in VALID_RATING_VALUES or isinstance(rating, bool):
+            raise db_exceptions.BadDataException("{} is not a valid rating value. It must be on the scale 1-5".format(rating))
+        if language not in supported_languages:
+            raise db_exceptions.BadDataException("Language: {} is not supported".format(language))
+        if review["entity_type"] not in ENTITY_TYPES:
+            raise db_exceptions.BadDataException("Entity type: {} is not supported".format(review["entity_type"]))
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "entity_id": str(review["entity_id"]),
+            "entity_type": review["entity_type"],
+            "user_id": str(review["user_id"]),
+            "language": language,
+            "license_id": review.get("license_id") or DEFAULT_LICENSE_ID,
+            "source": review.get("source"),
+            "source_url": review.get("source_url"),
+            "text": text,
+            "rating": RATING_SCALE_0_100.get(rating),
+        })
+    if not rows:
+        return []
+
+    now = datetime.now()
+    with db.begin(connection) as connection:
+        result = connection.execute(sqlalchemy.text("""
+            INSERT INTO review (id, entity_id, entity_type, user_id, edits, is_draft, is_hidden, license_id,
+                                language, source, source_url, published_on, created)
+                 SELECT id, entity_id, entity_type, user_id, 0, 'f', 'f', license_id,
+                        language, source, source_url, :now, :now
+                   FROM jsonb_to_recordset(CAST(:reviews AS jsonb))
+                     AS new_review(id uuid, entity_id uuid, entity_type entity_types, user_id uuid,
+                                   license_id varchar, language varchar, source varchar, source_url varchar)
+            ON CONFLICT ON CONSTRAINT review_entity_id_user_id_key
+             DO NOTHING
+              RETURNING id, entity_id, entity_type
+        """), {
+            "reviews": json.dumps(rows),
+            "now": now,
+        })
+        created = result.fetchall()
+        if not created:
+            return []
+        review_ids = tuple(row.id for row in created)
+
+        connection.execute(sqlalchemy.text("""
+            INSERT INTO revision (review_id, timestamp, text, rating)
+                 SELECT id, :now, text, rating
+                   FROM jsonb_to_recordset(CAST(:reviews AS jsonb))
+                     AS new_revision(id uuid, text varchar, rating smallint)
+                  WHERE id IN :review_ids
+        """), {
+            "reviews": json.dumps(rows),
+            "review_ids": review_ids,
+            "now": now,
+        })
+        connection.execute(sqlalchemy.text("""
+            UPDATE review
+               SET last_revision_id = revision.id
+              FROM revision
+             WHERE revision.review_id = review.id
+               AND review.id IN :review_ids
+        """), {
+            "review_ids": review_ids,
+        })
+
+        entity_type_counts = {}
+        for row in created:
+            entity_type_counts[row.entity_type] = entity_type_counts.get(row.entity_type, 0) + 1
+        for entity_type, count in entity_type_counts.items():
+            _update_published_count(connection, entity_type, count)
+        db_avg_rating.update_entities(connection, {row.entity_id for row in created})
+
+    db_users.invalidate_daily_activity({row["user_id"] for row in rows}, "reviews")
+    invalidate_ws_entities_cache({row.entity_id for row in created})
+    return [row.id for row in created]
 
 
 def invalidate_ws_entity_cache(entity_id):
-    cache_keys_for_entity_id_key = cache.gen_key('ws_cache', entity_id)
-    cache_keys_to_delete = cache.smembers(cache_keys_for_entity_id_key, namespace=REVIEW_CACHE_NAMESPACE)
-    if cache_keys_to_delete:
-        cache.delete_many(cache_keys_to_delete, namespace=REVIEW_CACHE_NAMESPACE)
-        cache.delete(cache_keys_for_entity_id_key, namespace=REVIEW_CACHE_NAMESPACE)
+    invalidate_ws_entities_cache([entity_id])
+
+
+def invalidate_ws_entities_cache(entity_ids):
+    """Invalidate cached review lists and counts of multiple entities at once.
+
+    Generations of the entities and the global generation are incremented, so
+    that cache keys which include them change. Old entries aren't deleted, they
+    are left to expire.
 
-    cache_keys_for_no_entity_id_key = cache.gen_key('ws_cache', 'entity_id_absent')
-    cache_keys_to_delete = cache.smembers(cache_keys_for_no_entity_id_key, namespace=REVIEW_CACHE_NAMESPACE)
-    if cache_keys_to_delete:
-        cache.delete_many(cache_keys_to_delete, namespace=REVIEW_CACHE_NAMESPACE)
-        cache.delete(cache_keys_for_no_entity_id_key, namespace=REVIEW_CACHE_NAMESPACE)
+    Args:
+        entity_ids (iterable): IDs of the entities which reviews have been changed.
+    """
+    keys = [_ws_cache_generation_key(entity_id) for entity_id in entity_ids]
+    keys.append(_ws_cache_generation_key(None))
+    # Missing generations are initialized when they are read
+    generations = cache.get_many(keys, namespace=REVIEW_CACHE_NAMESPACE, decode=False)
+    existing_keys = [key for key, generation in generations.items() if generation is not None]
+    if not existing_keys:
+        return
+    # brainzutils doesn't expose pipelines, which are needed to increment all generations in one round trip
+    with cache._r.pipeline() as pipeline:  # pylint: disable=protected-access
+        for key in existing_keys:
+            key = cache._prep_key(key, namespace=REVIEW_CACHE_NAMESPACE)  # pylint: disable=protected-access
+            pipeline.incr(key)
+            # The generation could have expired since it was read, then it's created again without expiration
+            pipeline.expire(key, WS_CACHE_GENERATION_TIMEOUT)
+        pipeline.execute()
+
+
+def _ws_cache_generation_key(entity_id):
+    return cache.gen_key('ws_cache_generation', entity_id if entity_id else 'all')
+
+
+def get_ws_cache_generation(entity_id=None):
+    """Get the generation of cached review lists and counts of an entity.
+
+    The generation changes every time a review of the entity is modified, and
+    must be included in cache keys of lists of its reviews. Without `entity_id`,
+    the global generation is returned, which changes when any review is modified.
+
+    Args:
+        entity_id (uuid): ID of the entity.
+
+    Returns:
+        Generation number (int).
+    """
+    key = _ws_cache_generation_key(entity_id)
+    generation = cache.get(key, namespace=REVIEW_CACHE_NAMESPACE, decode=False)
+    if generation is None:
+        # Generations start from the current time in microseconds, so that they are different from the ones
+        # used before the counter was evicted from the cache
+        generation = time.time_ns() // 1000
+        cache.set(key, generation, expirein=WS_CACHE_GENERATION_TIMEOUT, namespace=REVIEW_CACHE_NAMESPACE,
+                  encode=False)
+    return int(generation)
+
+
+def get_ws_feed_generation(staleness):
+    """Get the global generation of cached review lists, updated at most every `staleness` seconds.
+
+    Lists which aren't filtered by entity or user are requested often and
+    invalidated by every modification of a review. Using this generation in
+    their cache keys allows them to be served from the cache for `staleness`
+    seconds after a review is modified.
+
+    Args:
+        staleness (int): Maximum number of seconds for which modified reviews can be missing from the lists.
+
+    Returns:
+        Generation number (int).
+    """
+    if not staleness:
+        return get_ws_cache_generation()
+    key = cache.gen_key('ws_cache_feed_generation')
+    generation = cache.get(key, namespace=REVIEW_CACHE_NAMESPACE, decode=False)
+    if generation is None:
+        generation = get_ws_cache_generation()
+        cache.set(key, generation, expirein=staleness, namespace=REVIEW_CACHE_NAMESPACE, encode=False)
+    return int(generation)
+
+
+def get_next_cursor(reviews, *, sort, limit):
+    """Get a cursor pointing to the page of reviews after the given one.
+
+    Args:
+        reviews (list): Page of reviews returned by `list_reviews`.
+        sort (str): Sort order which was used to get the reviews. Only "published_on"
+                    and "popularity" support cursors.
+        limit (int): Maximum number of reviews which was requested.
+
+    Returns:
+        Opaque cursor (str) which can be passed to `list_reviews`, or ``None`` if
+        this is the last page.
+    """
+    if sort not in CURSOR_SORT_EXPRESSIONS or not reviews or len(reviews) < limit:
+        return None
+    last_review = reviews[-1]
+    value = last_review[sort]
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    data = json.dumps({"sort": sort, "value": value, "id": str(last_review["id"])})
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def _parse_cursor(cursor, sort):
+    """Decode a cursor created by `get_next_cursor`.
+
+    Returns:
+        Tuple with the value of the sort key and the ID of the last review on the previous page.
+
+    Raises:
+        BadDataException: if the cursor is malformed or doesn't match the sort order.
+    """
+    if sort not in CURSOR_SORT_EXPRESSIONS:
+        raise db_exceptions.BadDataException("Cursor can only be used when sorting by {}".format(
+            " or ".join(CURSOR_SORT_EXPRESSIONS)))
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if data["sort"] != sort:
+            raise ValueError("cursor was created for a different sort order")
+        if sort == "published_on":
+            value = datetime.fromisoformat(data["value"])
+        else:
+            value = int(data["value"])
+        review_id = str(uuid.UUID(data["id"]))
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise db_exceptions.BadDataException("Invalid cursor: {}".format(e))
+    return value, review_id
 
 
 # pylint: disable=too-many-branches
 def get_reviews_list(connection, *, inc_drafts=False, inc_hidden=False, entity_id=None,
                      entity_type=None, license_id=None, user_id=None, language=None,
-                     exclude=None, sort=None, sort_order=None, limit=20, offset=None, review_type=None):
+                     exclude=None, sort=None, sort_order=None, limit=20, offset=None, review_type=None,
+                     cursor=None, with_count=True, estimate_count=False):
     """
         helper function for list_reviews() that extends support for execution within a transaction by directly receiving the
         connection object
     """
+    if not sort_order:
+        sort_order = 'DESC'
+    if sort_order.upper() not in ('ASC', 'DESC'):
+        raise ValueError("sort_order must be ASC or DESC")
+    if cursor is not None:
+        cursor_value, cursor_id = _parse_cursor(cursor, sort)
+
     filters = []
     filter_data = {}
     if not inc_drafts:
@@ -468,50 +830,60 @@ def get_reviews_list(connection, *, inc_drafts=False, inc_hidden=False, entity_i
         filterstr = " WHERE " + filterstr
 
     latest_revision_query = """
-        JOIN (
-            revision
-            JOIN (
-                SELECT review.id AS review_uuid,
-                       MAX(timestamp) AS latest_timestamp
-                  FROM review
-                  JOIN revision ON review.id = review_id
-              GROUP BY review.id
-            ) AS latest
-              ON latest.review_uuid = revision.review_id
-             AND latest.latest_timestamp = revision.timestamp
-            ) AS latest_revision
-          ON review.id = latest_revision.review_id
+        JOIN revision AS latest_revision
+          ON latest_revision.id = review.last_revision_id
     """
 
-    query = sqlalchemy.text("""
-        SELECT COUNT(*)
-          FROM review
-            {latest_revision_query}
-            {filterstr}
-        """.format(filterstr=filterstr, latest_revision_query=latest_revision_query))
+    count = None
+    if with_count and estimate_count and not any((inc_drafts, inc_hidden, entity_id, license_id, user_id,
+                                                  review_type, exclude, language)):
+        count = get_published_count(connection, entity_type)
+    elif with_count:
+        # Counts of public reviews are cached until a review of the entity is modified
+        count_cacheable = not inc_drafts and not inc_hidden and exclude is None
+        if count_cacheable:
+            count_cache_key = cache.gen_key('list_count', f'entity_id={entity_id}', f'entity_type={entity_type}',
+                                            f'license_id={license_id}', f'user_id={user_id}',
+                                            f'language={language}', f'review_type={review_type}',
+                                            f'generation={get_ws_cache_generation(entity_id)}')
+            count = cache.get(count_cache_key, REVIEW_CACHE_NAMESPACE)
+        if count is None:
+            query = query_cache.get_query("""
+                SELECT COUNT(*)
+                  FROM review
+                    {latest_revision_query}
+                    {filterstr}
+                """, filterstr=filterstr, latest_revision_query=latest_revision_query if review_type else "")
+
+            result = connection.execute(query, filter_data)
+            count = result.fetchone()[0]
+            if count_cacheable:
+                cache.set(count_cache_key, count, expirein=REVIEW_COUNT_CACHE_TIMEOUT,
+                          namespace=REVIEW_CACHE_NAMESPACE)
+
+    # Pages after a cursor continue from the last review of the previous page. Review ID is used
+    # as a tie-breaker to make the order stable.
+    if cursor is not None:
+        filter_data["cursor_value"] = cursor_value
+        filter_data["cursor_id"] = cursor_id
+        keyset_filter = "({sort_expression}, review.id) {comparison} (:cursor_value, :cursor_id)".format(
+            sort_expression=CURSOR_SORT_EXPRESSIONS[sort],
+            comparison="<" if sort_order.upper() == "DESC" else ">",
+        )
+        filterstr = filterstr + " AND " + keyset_filter if filterstr else " WHERE " + keyset_filter
+        offset = None
 
-    result = connection.execute(query, filter_data)
-    count = result.fetchone()[0]
     order_by_clause = ""
-    if not sort_order:
-        sort_order = 'DESC'
-    if sort_order.upper() not in ('ASC', 'DESC'):
-        raise ValueError("sort_order must be ASC or DESC")
-
-    if sort == "popularity":
+    if sort in CURSOR_SORT_EXPRESSIONS:
         order_by_clause = """
-            ORDER BY popularity {sort_order}
-        """.format(sort_order=sort_order)
-    elif sort == "published_on":
-        order_by_clause = """
-            ORDER BY review.published_on {sort_order}
-        """.format(sort_order=sort_order)
+            ORDER BY {sort_expression} {sort_order}, review.id {sort_order}
+        """.format(sort_expression=CURSOR_SORT_EXPRESSIONS[sort], sort_order=sort_order)
     elif sort == "random":
         order_by_clause = """
             ORDER BY RANDOM()
         """
     # Note that all revisions' votes are considered in this popularity
-    query = sqlalchemy.text("""
+    query = query_cache.get_query("""
         SELECT review.id,
                review.entity_id,
                review.entity_type,
@@ -525,22 +897,17 @@ def get_reviews_list(connection, *, inc_drafts=False, inc_hidden=False, entity_i
                review.user_id,
                "user".display_name,
                "user".is_blocked,
+               "user".karma,
+               "user".license_choice,
                "user".email,
                "user".created as user_created,
                "user".musicbrainz_id,
                COALESCE("user".musicbrainz_id, "user".id::text) as user_ref,
                review.published_on,
-               MIN(revision.timestamp) as created,
-               SUM(
-                   CASE WHEN vote='t' THEN 1 ELSE 0 END
-               ) AS votes_positive_count,
-               SUM(
-                   CASE WHEN vote='f' THEN 1 ELSE 0 END
-               ) AS votes_negative_count,
-               SUM(
-                   CASE WHEN vote = 't' THEN 1
-                   WHEN vote = 'f' THEN -1 WHEN vote IS NULL THEN 0 END
-               ) AS popularity,
+               review.created,
+               review.votes_positive AS votes_positive_count,
+               review.votes_negative AS votes_negative_count,
+               review.votes_positive - review.votes_negative AS popularity,
                latest_revision.id as latest_revision_id,
                latest_revision.timestamp as latest_revision_timestamp,
                latest_revision.text as text,
@@ -548,17 +915,14 @@ def get_reviews_list(connection, *, inc_drafts=False, inc_hidden=False, entity_i
                license.full_name,
                license.info_url
           FROM review
-          JOIN revision ON review.id = revision.review_id
-     LEFT JOIN vote ON vote.revision_id = revision.id
           JOIN "user" ON review.user_id = "user".id
           JOIN license ON license.id = license_id
-        {latest_revision_query}   
+        {latest_revision_query}
         {where_clause}
-      GROUP BY review.id, latest_revision.id, "user".id, license.id
         {order_by_clause}
          LIMIT :limit
         OFFSET :offset
-        """.format(where_clause=filterstr, order_by_clause=order_by_clause, latest_revision_query=latest_revision_query))
+        """, where_clause=filterstr, order_by_clause=order_by_clause, latest_revision_query=latest_revision_query)
 
     filter_data["limit"] = limit
     filter_data["offset"] = offset
@@ -586,6 +950,8 @@ def get_reviews_list(connection, *, inc_drafts=False, inc_hidden=False, entity_i
                 "user_ref": row.pop("user_ref"),
                 "email": row.pop("email"),
                 "created": row.pop("user_created"),
+                "karma": row.pop("karma"),
+                "license_choice": row.pop("license_choice"),
             })
 
     return rows, count
@@ -593,7 +959,8 @@ def get_reviews_list(connection, *, inc_drafts=False, inc_hidden=False, entity_i
 
 def list_reviews(*, inc_drafts=False, inc_hidden=False, entity_id=None, entity_type=None,
                  license_id=None, user_id=None, language=None, exclude=None,
-                 sort=None, sort_order='DESC', limit=20, offset=None, review_type=None):
+                 sort=None, sort_order='DESC', limit=20, offset=None, review_type=None, cursor=None,
+                 with_count=True, estimate_count=False, connection=None):
     """Get a list of reviews.
 
     This function provides several filters that can be used to select a subset of reviews.
@@ -615,25 +982,35 @@ def list_reviews(*, inc_drafts=False, inc_hidden=False, entity_id=None, entity_t
         exclude (list): List of reviews (their IDs) to exclude from results.
         review_type (str): Return reviews of this type. Can either be "review" (to return reviews with text),
                            or "rating" (to return reviews which have a rating), or ``None`` (to return all reviews).
+        cursor (str): Cursor returned by `get_next_cursor` for the previous page. Can only be used when
+                      sorting by "popularity" or "published_on". If specified, `offset` is ignored.
+        with_count (bool): True if the total number of reviews that match the filters should be
+                           calculated, False if not.
+        estimate_count (bool): True if the maintained counter of published reviews can be used instead
+                               of counting the reviews. It is only used if no filters except
+                               `entity_type` are specified.
 
     Returns:
         Tuple with two values:
         1. list of reviews as dictionaries,
-        2. total number of reviews that match the specified filters.
+        2. total number of reviews that match the specified filters (``None`` if `with_count` is False).
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         return get_reviews_list(connection, inc_drafts=inc_drafts, inc_hidden=inc_hidden, entity_id=entity_id,
                                 entity_type=entity_type, license_id=license_id, user_id=user_id,
                                 language=language, exclude=exclude, sort=sort, sort_order=sort_order, limit=limit, 
-                                offset=offset, review_type=review_type)
+                                offset=offset, review_type=review_type, cursor=cursor,
+                                with_count=with_count, estimate_count=estimate_count)
 
 
-def get_popular_reviews_for_index():
+def get_popular_reviews_for_index(*, connection=None):
     """Get a list of popular reviews for displaying on the home page.
 
     popularity is a difference between positive votes and negative. In this
     case only votes from the last month are used to calculate popularity
-    to make results more varied.
+    to make results more varied. Popularity is kept in the popular_reviews_window
+    table (see `update_popular_reviews`). If there are not enough reviews with
+    recent votes, the most recently published reviews are used.
 
     Returns:
         Randomized list of popular reviews which are converted into
@@ -643,10 +1020,9 @@ def get_popular_reviews_for_index():
     cache_key = cache.gen_key("popular_reviews", limit)
     reviews = cache.get(cache_key, REVIEW_CACHE_NAMESPACE)
     defined_limit = 4 * limit if limit else None
-    reset_cache = any([check_review_deleted(review["id"]) for review in reviews]) if reviews else False
 
-    if not reviews or reset_cache:
-        with db.engine.connect() as connection:
+    if not reviews:
+        with db.connect(connection, replica=True) as connection:
             results = connection.execute(sqlalchemy.text("""
                 SELECT review.id,
                        review.entity_id,
@@ -659,52 +1035,52 @@ def get_popular_reviews_for_index():
                        review.language,
                        review.source,
                        review.source_url,
-                       SUM(
-                           CASE WHEN vote = 't' THEN 1
-                                WHEN vote = 'f' THEN -1
-                                WHEN vote IS NULL THEN 0 END
-                       ) AS popularity,
+                       candidates.popularity,
                        latest_revision.id AS latest_revision_id,
                        latest_revision.timestamp AS latest_revision_timestamp,
                        latest_revision.text AS text,
                        latest_revision.rating AS rating
-                  FROM review
-                  JOIN revision ON revision.review_id = review.id
-             LEFT JOIN (
-                        SELECT revision_id, vote
-                          FROM vote
-                         WHERE rated_at > :last_month
-                       ) AS votes_last_month
-                    ON votes_last_month.revision_id = revision.id
-                  JOIN (
-                        revision JOIN (
-                          SELECT review.id AS review_uuid,
-                                 MAX(timestamp) AS latest_timestamp
-                            FROM review
-                            JOIN revision ON review.id = review_id
-                        GROUP BY review.id
-                        ) AS latest ON latest.review_uuid = revision.review_id
-                        AND latest.latest_timestamp = revision.timestamp
-                       ) AS latest_revision
-                    ON review.id = latest_revision.review_id
-                 WHERE entity_id
-                    IN (
-                        SELECT DISTINCT entity_id
-                          FROM (
-                        SELECT entity_id
-                          FROM review
-                      ORDER BY RANDOM()
-                      ) AS randomized_entity_ids
-                    )
-                   AND latest_revision.text IS NOT NULL
-                   AND review.is_hidden = 'f'
-                   AND review.is_draft = 'f'
-              GROUP BY review.id, latest_revision.id
-              ORDER BY popularity
+                  FROM (
+                        (SELECT popular_reviews_window.review_id,
+                                popular_reviews_window.popularity,
+                                1 AS priority
+                           FROM popular_reviews_window
+                           JOIN review
+                             ON review.id = popular_reviews_window.review_id
+                           JOIN revision
+                             ON revision.id = review.last_revision_id
+                          WHERE popular_reviews_window.popularity > 0
+                            AND revision.text IS NOT NULL
+                            AND review.is_hidden = 'f'
+                            AND review.is_draft = 'f'
+                       ORDER BY popular_reviews_window.popularity DESC
+                          LIMIT :limit)
+                      UNION ALL
+                        (SELECT review.id,
+                                0,
+                                2 AS priority
+                           FROM review
+                           JOIN revision
+                             ON revision.id = review.last_revision_id
+                          WHERE revision.text IS NOT NULL
+                            AND review.is_hidden = 'f'
+                            AND review.is_draft = 'f'
+                            AND NOT EXISTS (
+                                SELECT true
+                                  FROM popular_reviews_window
+                                 WHERE popular_reviews_window.review_id = review.id
+                                )
+                       ORDER BY review.published_on DESC, review.id DESC
+                          LIMIT :limit)
+                       ) AS candidates
+                  JOIN review
+                    ON review.id = candidates.review_id
+                  JOIN revision AS latest_revision
+                    ON latest_revision.id = review.last_revision_id
+              ORDER BY candidates.priority, candidates.popularity DESC
                  LIMIT :limit
             """), {
                 "limit": defined_limit,
-                "last_month": datetime.now() - timedelta(weeks=4)
             })
             reviews = [dict(review) for review in results.mappings()]
 
@@ -718,47 +1094,112 @@ def get_popular_reviews_for_index():
                     "rating": review["rating"],
                     "review_id": review["id"],
                 }
-            reviews = [to_dict(review, confidential=False) for review in reviews]
+            reviews = to_dicts(reviews, confidential=False)
 
         cache.set(cache_key, reviews, 1 * 60 * 60, namespace=REVIEW_CACHE_NAMESPACE)  # 1 hour
     shuffle(reviews)
     return reviews[:limit]
 
 
-def delete(review_id):
+def invalidate_popular_reviews_cache():
+    """Invalidates the cached list of popular reviews.
+
+    This needs to be done when a review which can be in the list is hidden or deleted.
+    """
+    cache.delete(cache.gen_key("popular_reviews", current_app.config['POPULAR_REVIEWS_LIMIT']),
+                 namespace=REVIEW_CACHE_NAMESPACE)
+
+
+def update_popular_reviews(connection):
+    """Recompute popularity of reviews from votes cast during the last month.
+
+    Votes submitted since the last update are added to popularity by
+    `db_vote.submit`, but votes which become older than a month are only
+    removed by this function, so it needs to be run periodically.
+
+    Args:
+        connection: connection to database to update popularity
+
+    Returns:
+        Number of reviews which have votes from the last month.
+    """
+    connection.execute(sqlalchemy.text("DELETE FROM popular_reviews_window"))
+    result = connection.execute(sqlalchemy.text("""
+        INSERT INTO popular_reviews_window (review_id, popularity)
+             SELECT revision.review_id,
+                    COUNT(*) FILTER (WHERE vote = 't') - COUNT(*) FILTER (WHERE vote = 'f')
+               FROM vote
+               JOIN revision
+                 ON revision.id = vote.revision_id
+              WHERE rated_at > :last_month
+           GROUP BY revision.review_id
+    """), {
+        "last_month": datetime.now() - db_vote.POPULAR_REVIEWS_WINDOW,
+    })
+    return result.rowcount
+
+
+def delete(review_id, *, connection=None):
     """Delete a review.
 
     Args:
         review_id: ID of the review to be deleted.
     """
-    review = get_by_id(review_id)
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
+        review = get_by_id(review_id, connection=connection)
+        # Votes on the review are deleted with it, so they are subtracted from karma of the author
         connection.execute(sqlalchemy.text("""
-            DELETE
-              FROM review
-             WHERE id = :review_id
+            WITH deleted_review AS (
+                DELETE
+                  FROM review
+                 WHERE id = :review_id
+             RETURNING user_id, votes_positive - votes_negative AS karma
+            )
+            UPDATE "user"
+               SET karma = "user".karma - deleted_review.karma
+              FROM deleted_review
+             WHERE "user".id = deleted_review.user_id
         """), {
             "review_id": review_id,
         })
+        if not review["is_draft"] and not review["is_hidden"]:
+            _update_published_count(connection, review["entity_type"], -1)
+        if not review["is_hidden"]:
+            db_avg_rating.adjust(connection, review["entity_id"], review["entity_type"],
+                                 old_rating=RATING_SCALE_0_100.get(review["rating"]))
+    db_users.invalidate_daily_activity([review["user_id"]], "reviews")
+    invalidate_ws_entity_cache(review["entity_id"])
+    invalidate_popular_reviews_cache()
 
-    if review["rating"] is not None:
-        db_avg_rating.update(review["entity_id"], review["entity_type"])
 
+def update_revision_pointers(connection):
+    """Recompute the latest revision pointer and the creation time of all reviews.
 
-def check_review_deleted(review_id) -> bool:
-    """Check if a review exists in CB.
+    These columns are normally kept up to date by `db_revision.create`. This
+    function rebuilds them from the revision table, which is needed after
+    importing a data dump or to repair the values.
 
     Args:
-        review_id: ID of the review to be checked.
-    """
-    with db.engine.connect() as connection:
-        result = connection.execute(sqlalchemy.text("""
-            SELECT NOT EXISTS (SELECT true FROM review WHERE id = :review_id) AS exists
-        """), {
-            "review_id": review_id,
-        })
+        connection: connection to database to update the reviews
 
-        return result.first().exists
+    Returns:
+        Number of updated reviews (int).
+    """
+    result = connection.execute(sqlalchemy.text("""
+        UPDATE review
+           SET last_revision_id = pointers.last_revision_id,
+               created = pointers.created
+          FROM (
+                SELECT DISTINCT ON (review_id)
+                       review_id,
+                       id AS last_revision_id,
+                       MIN(timestamp) OVER (PARTITION BY review_id) AS created
+                  FROM revision
+              ORDER BY review_id, timestamp DESC, id DESC
+               ) AS pointers
+         WHERE review.id = pointers.review_id
+    """))
+    return result.rowcount
 
 
 def get_distinct_entities(connection):
@@ -775,7 +1216,7 @@ def get_distinct_entities(connection):
     return {row["entity_id"] for row in results.mappings()}
 
 
-def distinct_entities():
+def distinct_entities(*, connection=None):
     """Get a set of ID(s) of entities reviewed.
 
     Returns:
@@ -786,11 +1227,11 @@ def distinct_entities():
     # be better to remove that assumption before we support reviewing entities
     # from other sources (like BookBrainz).
 
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         return get_distinct_entities(connection)
 
 
-def reviewed_entities(*, entity_ids, entity_type):
+def reviewed_entities(*, entity_ids, entity_type, connection=None):
     """Check if an entity has been reviewed.
 
     Args:
@@ -799,7 +1240,7 @@ def reviewed_entities(*, entity_ids, entity_type):
     Returns:
         List of entity ID(s) that have a review in the database.
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         results = connection.execute(sqlalchemy.text("""
             SELECT entity_id
               FROM review
@@ -6,10 +6,9 @@ from critiquebrainz import db
 from critiquebrainz.db import VALID_RATING_VALUES, RATING_SCALE_1_5, RATING_SCALE_0_100
 from critiquebrainz.db import avg_rating as db_avg_rating
 from critiquebrainz.db import exceptions as db_exceptions
-from critiquebrainz.db import review as db_review
 
 
-def get(review_id, limit=1, offset=0):
+def get(review_id, limit=1, offset=0, *, connection=None):
     """Get revisions on a review ordered by the timestamp
 
     Args:
@@ -30,24 +29,17 @@ def get(review_id, limit=1, offset=0):
             "votes_negative": (int),
         }
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT id,
                    review_id,
                    timestamp,
                    text,
                    rating,
-                   SUM(
-                       CASE WHEN vote='t' THEN 1 ELSE 0 END
-                   ) AS votes_positive,
-                   SUM(
-                       CASE WHEN vote='f' THEN 1 ELSE 0 END
-                   ) AS votes_negative
+                   votes_positive,
+                   votes_negative
               FROM revision
-         LEFT JOIN vote
-                ON vote.revision_id = revision.id
              WHERE review_id = :review_id
-          GROUP BY revision.id
           ORDER BY timestamp DESC
             OFFSET :offset
              LIMIT :limit
@@ -67,7 +59,7 @@ def get(review_id, limit=1, offset=0):
     return rows
 
 
-def get_count(review_id):
+def get_count(review_id, *, connection=None):
     """Get total number of revisions of a review
 
     Args:
@@ -76,7 +68,7 @@ def get_count(review_id):
     Returns:
         count (int): Total number of revisions of a review
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT count(*)
               FROM revision
@@ -88,7 +80,7 @@ def get_count(review_id):
     return count
 
 
-def get_all_votes(review_id):
+def get_all_votes(review_id, *, connection=None):
     """Get vote count for the all revisions of a review
 
     Args:
@@ -101,14 +93,14 @@ def get_all_votes(review_id):
             "revision.id":"{"positive": (int), "negative": (int)}"
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
-            SELECT DISTINCT revision.id, user_id, vote, timestamp
-                       FROM revision
-                  LEFT JOIN vote
-                         ON vote.revision_id = revision.id
-                      WHERE review_id = :review_id
-                   ORDER BY timestamp DESC
+            SELECT id,
+                   votes_positive,
+                   votes_negative
+              FROM revision
+             WHERE review_id = :review_id
+          ORDER BY timestamp DESC
         """), {
             "review_id": review_id,
         })
@@ -118,17 +110,11 @@ def get_all_votes(review_id):
             raise db_exceptions.NoDataFoundException("Cannot find votes for review(ID: {})".format(review_id))
         votes = dict()
         for row in rows:
-            revision = row.id
-            if revision not in votes:
-                votes[revision] = {'positive': 0, 'negative': 0}
-            if row.vote:  # True = positive
-                votes[revision]['positive'] += 1
-            else:  # False = negative
-                votes[revision]['negative'] += 1
+            votes[row.id] = {'positive': row.votes_positive, 'negative': row.votes_negative}
     return votes
 
 
-def get_revision_number(review_id, revision_id):
+def get_revision_number(review_id, revision_id, *, connection=None):
     """Get revision number of the review from the revision_id.
 
     Args:
@@ -138,7 +124,7 @@ def get_revision_number(review_id, revision_id):
     Returns:
         rev_num(int): revision number of the revision.
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT row_number
               FROM (
@@ -167,6 +153,16 @@ def create(connection, review_id, text=None, rating=None):
         review_id (uuid): ID of the review.
         text (str): Updated/New text part of the review.
         rating (int): Updated/New rating part of the review
+
+    Returns:
+        Dictionary with the following structure:
+        {
+            "id": (int),
+            "timestamp": (datetime),
+            "entity_id": (uuid),
+            "entity_type": (str),
+        }
+        where "entity_id" and "entity_type" describe the entity of the review.
     """
     if text is None and rating is None:
         raise db_exceptions.BadDataException("Text part and rating part of a revision can not be None simultaneously")
@@ -176,7 +172,8 @@ def create(connection, review_id, text=None, rating=None):
     rating = RATING_SCALE_0_100.get(rating)
 
     query = sqlalchemy.text("""INSERT INTO revision(review_id, timestamp, text, rating)
-        VALUES (:review_id, :timestamp, :text, :rating)""")
+        VALUES (:review_id, :timestamp, :text, :rating)
+     RETURNING id, timestamp""")
     params = {
         "review_id": review_id,
         "timestamp": datetime.now(),
@@ -184,22 +181,45 @@ def create(connection, review_id, text=None, rating=None):
         "rating": rating,
     }
 
-    connection.execute(query, params)
-
+    revision = connection.execute(query, params).fetchone()
+
+    # Keep the latest revision pointer and the creation time on the review up to date
+    # The review is locked to read the rating of the revision which is replaced
+    review = connection.execute(sqlalchemy.text("""
+        WITH previous AS (
+            SELECT review.id,
+                   revision.rating
+              FROM review
+         LEFT JOIN revision
+                ON revision.id = review.last_revision_id
+             WHERE review.id = :review_id
+               FOR UPDATE OF review
+        )
+        UPDATE review
+           SET last_revision_id = :revision_id,
+               created = COALESCE(created, :timestamp)
+          FROM previous
+         WHERE review.id = previous.id
+     RETURNING review.entity_id, review.entity_type, review.is_hidden, previous.rating AS previous_rating
+    """), {
+        "review_id": review_id,
+        "revision_id": revision.id,
+        "timestamp": revision.timestamp,
+    }).fetchone()
 
-def update_rating(review_id):
     # Update average rating if rating part of the review has changed
-    review = db_review.get_by_id(review_id)
-    rev_num = get_revision_number(review["id"], review["last_revision"]["id"])
-    if rev_num > 1:
-        revisions = get(review["id"], limit=2, offset=0)
-        if revisions[0]["rating"] != revisions[1]["rating"]:
-            db_avg_rating.update(review["entity_id"], review["entity_type"])
-    else:
-        db_avg_rating.update(review["entity_id"], review["entity_type"])
+    if not review.is_hidden:
+        db_avg_rating.adjust(connection, review.entity_id, review.entity_type,
+                             old_rating=review.previous_rating, new_rating=rating)
+    return {
+        "id": revision.id,
+        "timestamp": revision.timestamp,
+        "entity_id": review.entity_id,
+        "entity_type": review.entity_type,
+    }
 
 
-def votes(revision_id):
+def votes(revision_id, *, connection=None):
     """Get votes of a particular revision.
 
     Args:
@@ -211,22 +231,19 @@ def votes(revision_id):
             "negative: int,
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
-            SELECT vote
+            SELECT votes_positive,
+                   votes_negative
               FROM revision
-              JOIN vote
-                ON vote.revision_id = revision.id
-             WHERE revision.id = :revision_id
+             WHERE id = :revision_id
         """), {
             "revision_id": revision_id,
         })
 
-        votes = result.fetchall()
+        row = result.fetchone()
         revision_votes = {"positive": 0, "negative": 0}
-        for vote in votes:
-            if vote.vote:  # True = positive
-                revision_votes["positive"] += 1
-            else:  # False = negative
-                revision_votes["negative"] += 1
+        if row:
+            revision_votes["positive"] = row.votes_positive
+            revision_votes["negative"] = row.votes_negative
     return revision_votes
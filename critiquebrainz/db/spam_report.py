@@ -3,10 +3,10 @@ from datetime import datetime
 import sqlalchemy
 
 from critiquebrainz import db
-from critiquebrainz.db import revision as db_revision
+from critiquebrainz.db import query_cache, revision as db_revision
 
 
-def get(user_id, revision_id):
+def get(user_id, revision_id, *, connection=None):
     """Get spam report from the user_id, revision_id.
 
     Args:
@@ -23,7 +23,7 @@ def get(user_id, revision_id):
             "is_archived": (bool)
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
            SELECT user_id,
                   reason,
@@ -42,14 +42,14 @@ def get(user_id, revision_id):
         return dict(report) if report else None
 
 
-def archive(user_id, revision_id):
+def archive(user_id, revision_id, *, connection=None):
     """Archive a Spam Report.
 
     Args:
         user_id(uuid): ID of the reporter.
         revision_id(uuid): ID of the revision of the reported review.
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             UPDATE spam_report
                SET is_archived = 'true'
@@ -61,7 +61,7 @@ def archive(user_id, revision_id):
         })
 
 
-def create(revision_id, user_id, reason):
+def create(revision_id, user_id, reason, *, connection=None):
     """Create spam report reported by a user on a review.
 
     Args:
@@ -79,7 +79,7 @@ def create(revision_id, user_id, reason):
             "is_archived": (bool)
         }
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             INSERT INTO spam_report (user_id, reason, revision_id, reported_at, is_archived)
                  VALUES (:user_id, :reason, :revision_id, :reported_at, :is_archived)
@@ -90,10 +90,10 @@ def create(revision_id, user_id, reason):
             "reported_at": datetime.now(),
             "is_archived": False,
         })
-    return get(user_id, revision_id)
+        return get(user_id, revision_id, connection=connection)
 
 
-def list_reports(**kwargs):
+def list_reports(*, connection=None, **kwargs):
     """Returns the list of reports submitted by users on reviews.
 
     Args:
@@ -145,7 +145,7 @@ def list_reports(**kwargs):
         # Use WHERE only when there is data to filter.
         filterstr = "WHERE " + filterstr
 
-    query = sqlalchemy.text("""
+    query = query_cache.get_query("""
         SELECT "user".id as reporter_id,
                "user".display_name as reporter_name,
                user_id,
@@ -177,13 +177,13 @@ def list_reports(**kwargs):
                                ON review_id = review_detail.review_uuid)
                        ON spam_report.revision_id = revision.id)
             ON spam_report.user_id = "user".id
-            {}
+            {where_clause}
       ORDER BY spam_report.reported_at desc
         OFFSET :offset
          LIMIT :limit
-    """.format(filterstr))
+    """, where_clause=filterstr)
 
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(query, filter_data)
         spam_reports = result.mappings()
         if spam_reports:
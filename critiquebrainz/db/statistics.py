@@ -49,7 +49,7 @@ def merge_rows(list_1, list_2, key):
     return list(merged.values())
 
 
-def get_users_with_review_count(from_date=date(1970, 1, 1), to_date=date.today() + timedelta(1)):
+def get_users_with_review_count(from_date=date(1970, 1, 1), to_date=date.today() + timedelta(1), *, connection=None):
     """ Gets list of users with number of reviews they've submitted
 
     Args:
@@ -65,7 +65,7 @@ def get_users_with_review_count(from_date=date(1970, 1, 1), to_date=date.today()
             "review_count": (int),
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT id,
                    display_name,
@@ -92,7 +92,7 @@ def get_users_with_review_count(from_date=date(1970, 1, 1), to_date=date.today()
         return reviewers
 
 
-def get_users_with_vote_count(from_date=date(1970, 1, 1), to_date=date.today() + timedelta(1)):
+def get_users_with_vote_count(from_date=date(1970, 1, 1), to_date=date.today() + timedelta(1), *, connection=None):
     """ Gets list of users with number of votes they've submitted
 
     Args:
@@ -108,7 +108,7 @@ def get_users_with_vote_count(from_date=date(1970, 1, 1), to_date=date.today() +
             "vote_count": (int),
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT id,
                    display_name,
@@ -133,7 +133,7 @@ def get_users_with_vote_count(from_date=date(1970, 1, 1), to_date=date.today() +
         return voters
 
 
-def get_users_with_comment_count(from_date=date(1970, 1, 1), to_date=date.today() + timedelta(1)):
+def get_users_with_comment_count(from_date=date(1970, 1, 1), to_date=date.today() + timedelta(1), *, connection=None):
     """ Gets list of users with number of comments they've submitted
 
     Args:
@@ -149,7 +149,7 @@ def get_users_with_comment_count(from_date=date(1970, 1, 1), to_date=date.today(
             "comment_count": (int),
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT id,
                    display_name,
@@ -1,8 +1,11 @@
+import sqlalchemy
+
 import critiquebrainz.db.avg_rating as db_avg_rating
 import critiquebrainz.db.exceptions as db_exceptions
 import critiquebrainz.db.license as db_license
 import critiquebrainz.db.review as db_review
 import critiquebrainz.db.users as db_users
+from critiquebrainz import db
 from critiquebrainz.data.testing import DataTestCase
 from critiquebrainz.db.user import User
 
@@ -116,3 +119,41 @@ class AvgRatingTestCase(DataTestCase):
         db_review.delete(review["id"])
         with self.assertRaises(db_exceptions.NoDataFoundException):
             db_avg_rating.get(review["entity_id"], review["entity_type"])
+
+    def test_update_all(self):
+        """Test if average ratings are rebuilt from the latest revisions of reviews"""
+
+        review = db_review.create(
+            entity_id="e7aad618-fa86-3983-9e77-405e21796eca",
+            entity_type="release_group",
+            text=u"Testing!",
+            rating=5,
+            user_id=self.user.id,
+            is_draft=False,
+            license_id=self.license["id"],
+        )
+        db_review.create(
+            entity_id="e7aad618-fa86-3983-9e77-405e21796eca",
+            entity_type="release_group",
+            rating=2,
+            user_id=self.user_2.id,
+            is_draft=False,
+            license_id=self.license["id"],
+        )
+        with db.engine.begin() as connection:
+            connection.execute(sqlalchemy.text("UPDATE avg_rating SET rating = 20, count = 7, rating_sum = 140"))
+            db_avg_rating.update_all(connection)
+        avg_rating = db_avg_rating.get(review["entity_id"], review["entity_type"])
+        self.assertEqual(avg_rating["rating"], 3.5)
+        self.assertEqual(avg_rating["count"], 2)
+
+        # Average rating keeps being adjusted after the rebuild
+        db_review.update(
+            review_id=review["id"],
+            drafted=review["is_draft"],
+            text=u"Testing rating update",
+            rating=4,
+        )
+        avg_rating = db_avg_rating.get(review["entity_id"], review["entity_type"])
+        self.assertEqual(avg_rating["rating"], 3.0)
+        self.assertEqual(avg_rating["count"], 2)
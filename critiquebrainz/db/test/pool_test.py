@@ -0,0 +1,59 @@
+import unittest
+
+import sqlalchemy
+
+from critiquebrainz.db import pool, query_stats
+
+
+class PoolTestCase(unittest.TestCase):
+
+    def test_get_engine_options(self):
+        options = pool.get_engine_options({}, "SQLALCHEMY")
+        self.assertEqual(options, {"poolclass": pool.TimedNullPool, "pool_pre_ping": False})
+
+        options = pool.get_engine_options({
+            "SQLALCHEMY_POOL_CLASS": "QueuePool",
+            "SQLALCHEMY_POOL_SIZE": 2,
+            "SQLALCHEMY_MAX_OVERFLOW": 3,
+            "SQLALCHEMY_POOL_RECYCLE": 60,
+            "SQLALCHEMY_POOL_PRE_PING": True,
+        }, "SQLALCHEMY")
+        self.assertEqual(options, {
+            "poolclass": pool.TimedQueuePool,
+            "pool_pre_ping": True,
+            "pool_recycle": 60,
+            "pool_size": 2,
+            "max_overflow": 3,
+        })
+
+        with self.assertRaises(ValueError):
+            pool.get_engine_options({"BB_DATABASE_POOL_CLASS": "StaticPool"}, "BB_DATABASE")
+
+    def test_pool_metrics(self):
+        engine = pool.create_engine("test", "sqlite://", poolclass=pool.TimedQueuePool, pool_size=1)
+        with engine.connect() as connection:
+            connection.execute(sqlalchemy.text("SELECT 1"))
+            metrics = pool.get_pool_metrics()["test"]
+            self.assertEqual(metrics["checkouts"], 1)
+            self.assertEqual(metrics["active"], 1)
+            self.assertEqual(metrics["checked_out"], 1)
+        with engine.connect() as connection:
+            connection.execute(sqlalchemy.text("SELECT 1"))
+        metrics = pool.get_pool_metrics()["test"]
+        self.assertEqual(metrics["checkouts"], 2)
+        self.assertEqual(metrics["active"], 0)
+        self.assertGreater(metrics["checkout_time"], 0)
+
+        # Checkout times are reported in statement statistics of requests
+        stats = query_stats.start()
+        with engine.connect() as connection:
+            connection.execute(sqlalchemy.text("SELECT 1"))
+        query_stats.stop()
+        self.assertGreater(stats.engines["test"]["checkout_time"], 0)
+        self.assertIn("db-test-checkout;dur=", stats.server_timing())
+
+        # Connections of the parent process aren't reused after fork
+        pool._dispose_after_fork()
+        self.assertEqual(pool.get_pool_metrics()["test"]["checkouts"], 0)
+        self.assertEqual(engine.pool.checkedout(), 0)
+        engine.dispose()
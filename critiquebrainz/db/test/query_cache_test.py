@@ -0,0 +1,27 @@
+import unittest
+
+from critiquebrainz.db import query_cache
+
+TEMPLATE = """
+    SELECT id
+      FROM review
+    {where_clause}
+"""
+
+
+class QueryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        query_cache.clear()
+
+    def test_get_query(self):
+        query = query_cache.get_query(TEMPLATE, where_clause="WHERE user_id = :user_id")
+        self.assertIn("WHERE user_id = :user_id", query.text)
+        self.assertIn("user_id", query._bindparams)
+
+        # Statements of the same shape are built once
+        self.assertIs(query_cache.get_query(TEMPLATE, where_clause="WHERE user_id = :user_id"), query)
+        self.assertIsNot(query_cache.get_query(TEMPLATE, where_clause=""), query)
+        info = query_cache.cache_info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 2)
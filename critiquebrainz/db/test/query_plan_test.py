@@ -0,0 +1,205 @@
+import hashlib
+import json
+import uuid
+from datetime import date
+
+import sqlalchemy
+from brainzutils import cache
+
+import critiquebrainz.db.avg_rating as db_avg_rating
+import critiquebrainz.db.comment as db_comment
+import critiquebrainz.db.license as db_license
+import critiquebrainz.db.review as db_review
+import critiquebrainz.db.revision as db_revision
+import critiquebrainz.db.users as db_users
+import critiquebrainz.db.vote as db_vote
+from critiquebrainz import db
+from critiquebrainz.data.testing import DataTestCase
+from critiquebrainz.data.utils import clear_tables
+from critiquebrainz.frontend.external import local_cache
+
+# Tables which are big in production, a sequential scan on them is a regression
+LARGE_TABLES = {"review", "revision", "vote", "user", "comment", "comment_revision", "oauth_token"}
+
+USER_COUNT = 2000
+REVIEW_COUNT = 10000  # must not exceed the least common multiple of USER_COUNT and ENTITY_COUNT
+ENTITY_COUNT = 5000
+
+
+class QueryPlanTestCase(DataTestCase):
+    """Checks that frequently executed queries use indexes.
+
+    A dataset big enough for the planner to prefer index scans is generated
+    once for all tests, then statements executed by the database functions are
+    recorded and explained one by one. Tests must not modify the dataset.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(QueryPlanTestCase, cls).setUpClass()
+        clear_tables()
+        cls.license = db_license.create(
+            id=u'Test',
+            full_name=u"Test License",
+        )
+        with db.engine.begin() as connection:
+            connection.execute(sqlalchemy.text("""
+                INSERT INTO "user" (id, display_name, created, musicbrainz_id)
+                     SELECT md5('user' || i)::uuid, 'User ' || i, NOW(), 'user_' || i
+                       FROM generate_series(1, :user_count) AS i
+            """), {"user_count": USER_COUNT})
+            connection.execute(sqlalchemy.text("""
+                INSERT INTO review (id, entity_id, entity_type, user_id, is_draft, is_hidden, license_id,
+                                    language, published_on)
+                     SELECT md5('review' || i)::uuid,
+                            md5('entity' || i % :entity_count)::uuid,
+                            'release_group',
+                            md5('user' || (i % :user_count + 1))::uuid,
+                            i % 10 = 0,
+                            i % 50 = 1,
+                            :license_id,
+                            'en',
+                            CASE WHEN i % 10 = 0 THEN NULL ELSE NOW() - i * INTERVAL '1 minute' END
+                       FROM generate_series(1, :review_count) AS i
+            """), {
+                "entity_count": ENTITY_COUNT,
+                "user_count": USER_COUNT,
+                "review_count": REVIEW_COUNT,
+                "license_id": cls.license["id"],
+            })
+            connection.execute(sqlalchemy.text("""
+                INSERT INTO revision (review_id, timestamp, text, rating)
+                     SELECT id, NOW() - revision_number * INTERVAL '1 day', 'Text of the review', 20 * revision_number
+                       FROM review, generate_series(1, 2) AS revision_number
+            """))
+            db_review.update_revision_pointers(connection)
+            connection.execute(sqlalchemy.text("""
+                INSERT INTO vote (user_id, revision_id, vote, rated_at)
+                     SELECT md5('user' || ((revision.id * 7 + i) % :user_count + 1))::uuid,
+                            revision.id,
+                            i % 3 != 0,
+                            NOW() - i * INTERVAL '1 day'
+                       FROM revision, generate_series(1, 3) AS i
+            """), {"user_count": USER_COUNT})
+            connection.execute(sqlalchemy.text("""
+                INSERT INTO comment (id, review_id, user_id)
+                     SELECT md5('comment' || review.id)::uuid, review.id, review.user_id
+                       FROM review
+            """))
+            connection.execute(sqlalchemy.text("""
+                INSERT INTO comment_revision (comment_id, text)
+                     SELECT id, 'Text of the comment'
+                       FROM comment
+            """))
+            db_vote.update_counters(connection)
+            db_users.update_karma(connection)
+            db_avg_rating.update_all(connection)
+            db_review.update_published_count(connection)
+            for table in LARGE_TABLES:
+                connection.execute(sqlalchemy.text('ANALYZE "{table}"'.format(table=table)))
+
+        cls.user_id = str(_md5_uuid('user1'))
+        with db.engine.connect() as connection:
+            result = connection.execute(sqlalchemy.text("""
+                SELECT id, entity_id
+                  FROM review
+                 WHERE user_id = :user_id
+                   AND is_draft = 'f'
+                   AND is_hidden = 'f'
+              ORDER BY id
+                 LIMIT 20
+            """), {"user_id": cls.user_id})
+            cls.reviews = result.mappings().all()
+
+    @classmethod
+    def tearDownClass(cls):
+        clear_tables()
+        super(QueryPlanTestCase, cls).tearDownClass()
+
+    def reset_db(self):
+        # The dataset is kept between tests, only the caches are cleared
+        cache.flush_all()
+        local_cache.clear()
+
+    def assertIndexesUsed(self, func):
+        """Run `func` and check plans of all statements that it executes."""
+        statements = []
+
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        sqlalchemy.event.listen(db.engine, "before_cursor_execute", record_statement)
+        try:
+            func()
+        finally:
+            sqlalchemy.event.remove(db.engine, "before_cursor_execute", record_statement)
+
+        self.assertTrue(statements)
+        with db.engine.connect() as connection:
+            for statement, parameters in statements:
+                plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                for node in _plan_nodes(plan[0]["Plan"]):
+                    if node["Node Type"] == "Seq Scan":
+                        self.assertNotIn(node["Relation Name"], LARGE_TABLES,
+                                         "Sequential scan on {table} in:\n{statement}".format(
+                                             table=node["Relation Name"], statement=statement))
+
+    def test_review_get_by_ids(self):
+        self.assertIndexesUsed(lambda: db_review.get_by_ids([review["id"] for review in self.reviews]))
+
+    def test_review_list_by_entity(self):
+        self.assertIndexesUsed(lambda: db_review.list_reviews(
+            entity_id=self.reviews[0]["entity_id"],
+            entity_type="release_group",
+            sort="popularity",
+        ))
+
+    def test_review_list_by_user(self):
+        self.assertIndexesUsed(lambda: db_review.list_reviews(
+            user_id=self.user_id,
+            sort="published_on",
+            inc_drafts=True,
+            inc_hidden=True,
+            with_count=False,
+        ))
+
+    def test_review_list_recent(self):
+        self.assertIndexesUsed(lambda: db_review.list_reviews(sort="published_on", limit=20, with_count=False))
+
+    def test_review_list_popular(self):
+        self.assertIndexesUsed(lambda: db_review.list_reviews(sort="popularity", limit=20, with_count=False))
+
+    def test_revision_get(self):
+        self.assertIndexesUsed(lambda: db_revision.get(self.reviews[0]["id"], limit=None))
+
+    def test_user_has_voted(self):
+        self.assertIndexesUsed(lambda: db_users.has_voted(self.user_id, self.reviews[0]["id"]))
+
+    def test_user_votes_today(self):
+        self.assertIndexesUsed(lambda: db_users.count_votes(self.user_id, from_date=date.today()))
+
+    def test_user_reviews_today(self):
+        self.assertIndexesUsed(lambda: db_users.count_reviews(self.user_id, from_date=date.today()))
+
+    def test_user_activity_stats(self):
+        self.assertIndexesUsed(lambda: db_users.get_activity_stats(self.user_id))
+
+    def test_user_by_ref(self):
+        self.assertIndexesUsed(lambda: db_users.get_user_by_ref("user_1"))
+        self.assertIndexesUsed(lambda: db_users.get_user_by_ref(self.user_id))
+
+    def test_comment_count(self):
+        self.assertIndexesUsed(lambda: db_comment.count_comments(review_id=self.reviews[0]["id"]))
+
+
+def _md5_uuid(value):
+    """Get the UUID generated from `value` in the same way as in the test dataset."""
+    return uuid.UUID(hashlib.md5(value.encode("utf-8")).hexdigest())
+
+
+def _plan_nodes(plan):
+    yield plan
+    for subplan in plan.get("Plans", []):
+        yield from _plan_nodes(subplan)
@@ -0,0 +1,77 @@
+import json
+import unittest
+
+import sqlalchemy
+from flask import Flask
+
+from critiquebrainz.db import query_stats
+
+
+class QueryStatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = sqlalchemy.create_engine("sqlite://")
+        query_stats.instrument_engine("test", self.engine)
+
+    def tearDown(self):
+        query_stats.stop()
+        self.engine.dispose()
+
+    def test_normalize(self):
+        self.assertEqual(
+            query_stats.normalize("""
+                SELECT id
+                  FROM artist
+                 WHERE gid IN (%(gid_1_1)s, %(gid_1_2)s)
+                   AND type = 1
+                   AND name = 'It''s'
+            """),
+            "SELECT id FROM artist WHERE gid IN (?) AND type = ? AND name = ?",
+        )
+
+    def test_stats(self):
+        with self.engine.connect() as connection:
+            # Statements outside of requests aren't recorded
+            connection.execute(sqlalchemy.text("SELECT 1"))
+            stats = query_stats.start()
+            for value in range(3):
+                connection.execute(sqlalchemy.text("SELECT :value"), {"value": value})
+            connection.execute(sqlalchemy.text("SELECT 1 + 1"))
+        self.assertIs(query_stats.stop(), stats)
+
+        self.assertEqual(stats.count, 4)
+        self.assertEqual(stats.engines["test"]["count"], 4)
+        self.assertGreater(stats.time, 0)
+        self.assertIsNotNone(stats.slowest_statement)
+        self.assertEqual(stats.repeated_statements(2), [("SELECT ?", 3)])
+        self.assertEqual(stats.repeated_statements(3), [])
+        self.assertRegex(stats.server_timing(), r'^db-test;dur=[\d.]+;desc="4 queries"$')
+        self.assertEqual(stats.to_dict()["count"], 4)
+
+    def test_failed_statement(self):
+        query_stats.start()
+        with self.engine.connect() as connection:
+            with self.assertRaises(sqlalchemy.exc.OperationalError):
+                connection.execute(sqlalchemy.text("SELECT * FROM missing"))
+            connection.execute(sqlalchemy.text("SELECT 1"))
+            self.assertEqual(connection.info["query_stats_start"], [])
+        self.assertEqual(query_stats.stop().count, 1)
+
+    def test_registered_metrics_are_logged(self):
+        app = Flask(__name__)
+        app.config["SQL_QUERY_STATS"] = True
+        query_stats.init_app(app)
+        query_stats.register_metrics("test_metrics", lambda: {"hits": 1})
+        self.addCleanup(query_stats._metrics.pop, "test_metrics")  # pylint: disable=protected-access
+
+        @app.route("/")
+        def index():
+            with self.engine.connect() as connection:
+                connection.execute(sqlalchemy.text("SELECT 1"))
+            return ""
+
+        with self.assertLogs(query_stats.logger, level="INFO") as logs:
+            app.test_client().get("/")
+        line = json.loads(logs.records[0].args[0])
+        self.assertEqual(line["test_metrics"], {"hits": 1})
+        self.assertEqual(line["count"], 1)
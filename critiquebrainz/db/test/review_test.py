@@ -1,10 +1,15 @@
 from unittest import mock
 
+import sqlalchemy
+
+import critiquebrainz.db.avg_rating as db_avg_rating
 import critiquebrainz.db.exceptions as db_exceptions
 import critiquebrainz.db.license as db_license
 import critiquebrainz.db.review as db_review
 import critiquebrainz.db.revision as db_revision
 import critiquebrainz.db.users as db_users
+import critiquebrainz.db.vote as db_vote
+from critiquebrainz import db
 from critiquebrainz.data.testing import DataTestCase
 from critiquebrainz.db.user import User
 
@@ -263,6 +268,34 @@ class ReviewTestCase(DataTestCase):
         reviews = db_review.get_popular_reviews_for_index()
         self.assertEqual(len(reviews), 1)
 
+    @mock.patch('critiquebrainz.db.review.cache.get')
+    def test_get_popular_by_votes(self, cache_get):
+        cache_get.return_value = None
+        reviews = []
+        for entity_id in ["e7aad618-fa86-3983-9e77-405e21796eca", "deae6fc2-a675-4f35-9565-d2aaea4872c7"]:
+            reviews.append(db_review.create(
+                user_id=self.user.id,
+                entity_id=entity_id,
+                entity_type="release_group",
+                text="Awesome",
+                is_draft=False,
+                license_id=self.license["id"],
+            ))
+        db_vote.submit(self.user_2.id, reviews[0]["last_revision"]["id"], True)
+
+        with mock.patch('critiquebrainz.db.review.shuffle'):
+            popular = db_review.get_popular_reviews_for_index()
+        self.assertEqual([r["id"] for r in popular], [str(reviews[0]["id"]), str(reviews[1]["id"])])
+        self.assertEqual(popular[0]["popularity"], 1)
+
+        # Votes older than a month are removed by the periodic update
+        with db.engine.begin() as connection:
+            connection.execute(sqlalchemy.text("UPDATE vote SET rated_at = rated_at - INTERVAL '5 weeks'"))
+            self.assertEqual(db_review.update_popular_reviews(connection), 0)
+        with mock.patch('critiquebrainz.db.review.shuffle'):
+            popular = db_review.get_popular_reviews_for_index()
+        self.assertEqual([r["popularity"] for r in popular], [0, 0])
+
     def test_set_hidden_state(self):
         review = db_review.create(
             user_id=self.user.id,
@@ -333,3 +366,279 @@ class ReviewTestCase(DataTestCase):
             entity_type="release_group",
         )
         self.assertListEqual(reviewed_entities, [])
+
+    def test_update_revision_pointers(self):
+        review = db_review.create(
+            user_id=self.user.id,
+            entity_id="e7aad618-fa86-3983-9e77-405e21796eca",
+            entity_type="release_group",
+            text="Awesome",
+            is_draft=False,
+            license_id=self.license["id"],
+        )
+        db_review.update(
+            review_id=review["id"],
+            drafted=review["is_draft"],
+            text="Beautiful!",
+        )
+        revisions = db_revision.get(review["id"], limit=None)
+        reviews, _ = db_review.list_reviews()
+        self.assertEqual(reviews[0]["last_revision"]["id"], revisions[0]["id"])
+        self.assertEqual(reviews[0]["created"], revisions[1]["timestamp"])
+
+        with db.engine.begin() as connection:
+            connection.execute(sqlalchemy.text("UPDATE review SET last_revision_id = NULL, created = NULL"))
+            self.assertEqual(db_review.update_revision_pointers(connection), 1)
+        review = db_review.get_by_id(review["id"])
+        self.assertEqual(review["last_revision"]["id"], revisions[0]["id"])
+        self.assertEqual(review["text"], "Beautiful!")
+
+    def test_get_by_ids_query_count(self):
+        review_ids = []
+        for entity_id in ["e7aad618-fa86-3983-9e77-405e21796eca", "deae6fc2-a675-4f35-9565-d2aaea4872c7",
+                          "3cfb11bb-135f-4841-a800-c056eb7465e0"]:
+            review = db_review.create(
+                user_id=self.user.id,
+                entity_id=entity_id,
+                entity_type="release_group",
+                text="Awesome",
+                is_draft=False,
+                license_id=self.license["id"],
+            )
+            db_vote.submit(self.user_2.id, review["last_revision"]["id"], True)
+            review_ids.append(review["id"])
+
+        statements = []
+
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sqlalchemy.event.listen(db.engine, "before_cursor_execute", record_statement)
+        try:
+            reviews = db_review.get_by_ids(review_ids[:1])
+            single_count = len(statements)
+            statements.clear()
+            reviews = db_review.get_by_ids(review_ids)
+            self.assertEqual(len(statements), single_count)
+        finally:
+            sqlalchemy.event.remove(db.engine, "before_cursor_execute", record_statement)
+
+        self.assertEqual(len(reviews), 3)
+        for review in reviews:
+            self.assertEqual(review["votes"], {"positive": 1, "negative": 0})
+            self.assertEqual(review["popularity"], 1)
+
+    def test_list_reviews_cursor(self):
+        for entity_id in ["e7aad618-fa86-3983-9e77-405e21796eca", "deae6fc2-a675-4f35-9565-d2aaea4872c7",
+                          "3cfb11bb-135f-4841-a800-c056eb7465e0"]:
+            db_review.create(
+                user_id=self.user.id,
+                entity_id=entity_id,
+                entity_type="release_group",
+                text="Awesome",
+                is_draft=False,
+                license_id=self.license["id"],
+            )
+        all_reviews, _ = db_review.list_reviews(sort="published_on", sort_order="ASC")
+
+        reviews, count = db_review.list_reviews(sort="published_on", sort_order="ASC", limit=2)
+        cursor = db_review.get_next_cursor(reviews, sort="published_on", limit=2)
+        self.assertEqual([r["id"] for r in reviews], [r["id"] for r in all_reviews[:2]])
+
+        reviews, count = db_review.list_reviews(sort="published_on", sort_order="ASC", limit=2, cursor=cursor)
+        self.assertEqual(count, 3)
+        self.assertEqual([r["id"] for r in reviews], [r["id"] for r in all_reviews[2:]])
+        self.assertIsNone(db_review.get_next_cursor(reviews, sort="published_on", limit=2))
+
+        # Cursor can't be used with a different sort order
+        with self.assertRaises(db_exceptions.BadDataException):
+            db_review.list_reviews(sort="popularity", cursor=cursor)
+        with self.assertRaises(db_exceptions.BadDataException):
+            db_review.list_reviews(sort="published_on", cursor="not a cursor")
+
+    def test_list_reviews_count(self):
+        review = db_review.create(
+            user_id=self.user.id,
+            entity_id="e7aad618-fa86-3983-9e77-405e21796eca",
+            entity_type="release_group",
+            text="Awesome",
+            is_draft=False,
+            license_id=self.license["id"],
+        )
+        db_review.create(
+            user_id=self.user_2.id,
+            entity_id="e7aad618-fa86-3983-9e77-405e21796eca",
+            entity_type="release_group",
+            text="Awesome",
+            is_draft=True,
+            license_id=self.license["id"],
+        )
+
+        reviews, count = db_review.list_reviews(with_count=False)
+        self.assertEqual(len(reviews), 1)
+        self.assertIsNone(count)
+
+        self.assertEqual(db_review.list_reviews(entity_id=review["entity_id"])[1], 1)
+        self.assertEqual(db_review.list_reviews(estimate_count=True)[1], 1)
+        self.assertEqual(db_review.list_reviews(entity_type="release_group", estimate_count=True)[1], 1)
+        self.assertEqual(db_review.list_reviews(entity_type="bookbrainz", estimate_count=True)[1], 0)
+
+        # Cached counts are invalidated when a review of the entity is hidden
+        db_review.set_hidden_state(review["id"], is_hidden=True)
+        self.assertEqual(db_review.list_reviews(entity_id=review["entity_id"])[1], 0)
+        self.assertEqual(db_review.list_reviews(estimate_count=True)[1], 0)
+
+        db_review.set_hidden_state(review["id"], is_hidden=False)
+        with db.engine.begin() as connection:
+            connection.execute(sqlalchemy.text("DELETE FROM published_review_count"))
+            db_review.update_published_count(connection)
+        self.assertEqual(db_review.list_reviews(estimate_count=True)[1], 1)
+
+        db_review.delete(review["id"])
+        self.assertEqual(db_review.list_reviews(entity_id=review["entity_id"])[1], 0)
+        self.assertEqual(db_review.list_reviews(estimate_count=True)[1], 0)
+
+    def test_to_dicts(self):
+        review_ids = []
+        for user in [self.user, self.user_2]:
+            review = db_review.create(
+                user_id=user.id,
+                entity_id="e7aad618-fa86-3983-9e77-405e21796eca",
+                entity_type="release_group",
+                text="Awesome",
+                is_draft=False,
+                license_id=self.license["id"],
+            )
+            review_ids.append(review["id"])
+        db_vote.submit(self.user_2.id, db_review.get_by_id(review_ids[0])["last_revision"]["id"], True)
+        reviews = db_review.get_by_ids(review_ids)
+
+        statements = []
+
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sqlalchemy.event.listen(db.engine, "before_cursor_execute", record_statement)
+        try:
+            reviews = db_review.to_dicts(reviews)
+        finally:
+            sqlalchemy.event.remove(db.engine, "before_cursor_execute", record_statement)
+
+        # Authors are taken from the rows of the reviews
+        self.assertEqual(len(statements), 0)
+        users = {review["user"]["id"]: review["user"] for review in reviews}
+        self.assertEqual(users[self.user.id]["karma"], 1)
+        self.assertEqual(users[self.user_2.id]["karma"], 0)
+        self.assertEqual(users[self.user.id]["user_type"], "Noob")
+
+        # Authors of reviews without them are fetched in one query
+        reviews = db_review.get_by_ids(review_ids)
+        for review in reviews:
+            del review["user"]
+        sqlalchemy.event.listen(db.engine, "before_cursor_execute", record_statement)
+        try:
+            reviews = db_review.to_dicts(reviews, confidential=True)
+        finally:
+            sqlalchemy.event.remove(db.engine, "before_cursor_execute", record_statement)
+        self.assertEqual(len(statements), 1)
+        users = {review["user"]["id"]: review["user"] for review in reviews}
+        self.assertEqual(users[self.user.id]["karma"], 1)
+        self.assertIn("license_choice", users[self.user.id])
+
+    def test_update_single_transaction(self):
+        review = db_review.create(
+            user_id=self.user.id,
+            entity_id="e7aad618-fa86-3983-9e77-405e21796eca",
+            entity_type="release_group",
+            text="Awesome",
+            rating=4,
+            is_draft=True,
+            license_id=self.license["id"],
+        )
+
+        transactions = []
+
+        def record_begin(conn):
+            transactions.append(conn)
+
+        sqlalchemy.event.listen(db.engine, "begin", record_begin)
+        try:
+            db_review.update(
+                review_id=review["id"],
+                drafted=True,
+                text="Even more awesome",
+                rating=5,
+                language="en",
+                is_draft=False,
+            )
+        finally:
+            sqlalchemy.event.remove(db.engine, "begin", record_begin)
+
+        self.assertEqual(len(transactions), 1)
+        review = db_review.get_by_id(review["id"])
+        self.assertEqual(review["rating"], 5)
+        self.assertEqual(review["is_draft"], False)
+        self.assertEqual(db_review.list_reviews(estimate_count=True)[1], 1)
+
+    def test_create_many(self):
+        entity_id = "e7aad618-fa86-3983-9e77-405e21796eca"
+        existing = db_review.create(
+            user_id=self.user.id,
+            entity_id=entity_id,
+            entity_type="release_group",
+            text="Already reviewed",
+            rating=1,
+            is_draft=False,
+            license_id=self.license["id"],
+        )
+        review_ids = db_review.create_many([
+            {
+                "user_id": self.user.id,
+                "entity_id": entity_id,
+                "entity_type": "release_group",
+                "rating": 5,
+                "license_id": self.license["id"],
+            },
+            {
+                "user_id": self.user_2.id,
+                "entity_id": entity_id,
+                "entity_type": "release_group",
+                "text": "Imported review",
+                "rating": 4,
+                "license_id": self.license["id"],
+                "source": "Partner",
+                "source_url": "https://example.com/review",
+            },
+            {
+                "user_id": self.user_2.id,
+                "entity_id": "3cfb11bb-135f-4841-a800-c056eb7465e0",
+                "entity_type": "release_group",
+                "text": "Imported review without rating",
+                "license_id": self.license["id"],
+            },
+        ])
+
+        # The review of an entity which the user has already reviewed is skipped
+        self.assertEqual(len(review_ids), 2)
+        self.assertEqual(db_review.get_by_id(existing["id"])["rating"], 1)
+        imported = db_review.get_by_id(review_ids[0])
+        self.assertEqual(imported["text"], "Imported review")
+        self.assertEqual(imported["rating"], 4)
+        self.assertEqual(imported["source"], "Partner")
+        self.assertFalse(imported["is_draft"])
+        self.assertIsNotNone(imported["last_revision"])
+
+        self.assertEqual(db_review.list_reviews(estimate_count=True)[1], 3)
+        avg_rating = db_avg_rating.get(entity_id, "release_group")
+        self.assertEqual(avg_rating["count"], 2)
+        self.assertEqual(avg_rating["rating"], 3)
+
+        with self.assertRaises(db_exceptions.BadDataException):
+            db_review.create_many([{"user_id": self.user.id, "entity_type": "release_group", "rating": 5}])
+
+        with self.assertRaises(db_exceptions.BadDataException):
+            db_review.create_many([{
+                "user_id": self.user.id,
+                "entity_id": entity_id,
+                "entity_type": "release_group",
+            }])
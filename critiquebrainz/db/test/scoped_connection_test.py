@@ -0,0 +1,144 @@
+import sqlalchemy
+
+import critiquebrainz.db.license as db_license
+import critiquebrainz.db.review as db_review
+import critiquebrainz.db.users as db_users
+from critiquebrainz import db
+from critiquebrainz.data.testing import DataTestCase
+from critiquebrainz.db.user import User
+
+
+class ScopedConnectionTestCase(DataTestCase):
+
+    def setUp(self):
+        super(ScopedConnectionTestCase, self).setUp()
+        self.user = User(db_users.get_or_create(1, "Tester", new_user_data={
+            "display_name": "test user",
+        }))
+        self.license = db_license.create(
+            id=u'Test',
+            full_name=u"Test License",
+        )
+        self.review = db_review.create(
+            user_id=self.user.id,
+            entity_id="e7aad618-fa86-3983-9e77-405e21796eca",
+            entity_type="release_group",
+            text="Testing",
+            rating=5,
+            is_draft=False,
+            license_id=self.license["id"],
+        )
+        self.connections = []
+        sqlalchemy.event.listen(db.engine, "engine_connect", self.record_connect)
+
+    def tearDown(self):
+        sqlalchemy.event.remove(db.engine, "engine_connect", self.record_connect)
+        super(ScopedConnectionTestCase, self).tearDown()
+
+    def record_connect(self, connection):
+        self.connections.append(connection)
+
+    def test_connection_reused(self):
+        with db.scoped_connection():
+            db_review.get_by_id(self.review["id"])
+            db_review.list_reviews(user_id=self.user.id)
+            db_users.get_by_id(self.user.id)
+            db_review.update(
+                review_id=self.review["id"],
+                drafted=False,
+                text="Testing again",
+            )
+            self.assertEqual(db_review.get_by_id(self.review["id"])["text"], "Testing again")
+        self.assertEqual(len(self.connections), 1)
+
+        # Changes are committed when the scope ends
+        self.assertEqual(db_review.get_by_id(self.review["id"])["text"], "Testing again")
+
+    def test_read_only(self):
+        with db.scoped_connection(read_only=True):
+            db_review.get_by_id(self.review["id"])
+            with db.connect() as connection:
+                with self.assertRaises(sqlalchemy.exc.InternalError):
+                    connection.execute(sqlalchemy.text("DELETE FROM review"))
+            # Functions which write use their own connection
+            db_review.update(
+                review_id=self.review["id"],
+                drafted=False,
+                text="Testing again",
+            )
+            self.assertEqual(db_review.get_by_id(self.review["id"])["text"], "Testing again")
+        self.assertEqual(len(self.connections), 2)
+
+    def test_explicit_connection(self):
+        with db.engine.connect() as connection:
+            transaction = connection.begin()
+            db_review.update(
+                review_id=self.review["id"],
+                drafted=False,
+                text="Testing again",
+                connection=connection,
+            )
+            self.assertEqual(db_review.get_by_id(self.review["id"], connection=connection)["text"], "Testing again")
+            # Nothing is committed by functions that get the connection
+            self.assertEqual(db_review.get_by_id(self.review["id"])["text"], "Testing")
+            transaction.rollback()
+        self.assertEqual(db_review.get_by_id(self.review["id"])["text"], "Testing")
+
+
+class ReplicaTestCase(DataTestCase):
+
+    def setUp(self):
+        super(ReplicaTestCase, self).setUp()
+        self.user = User(db_users.get_or_create(1, "Tester", new_user_data={
+            "display_name": "test user",
+        }))
+        # The test database acts as its own replica
+        db.init_replica_engines([db.engine.url.render_as_string(hide_password=False)])
+        db._use_primary.set(False)
+        self.replica_connections = []
+        sqlalchemy.event.listen(db.replica_engines[0], "engine_connect", self.record_connect)
+
+    def tearDown(self):
+        db.init_replica_engines([])
+        db._use_primary.set(False)
+        db._request_user_id.set(None)
+        super(ReplicaTestCase, self).tearDown()
+
+    def record_connect(self, connection):
+        self.replica_connections.append(connection)
+
+    def test_reads_go_to_replica(self):
+        db_review.list_reviews(user_id=self.user.id)
+        db_users.total_count()
+        self.assertEqual(len(self.replica_connections), 2)
+
+        # Reads which aren't allowed on a replica go to the primary database
+        db_users.get_by_id(self.user.id)
+        self.assertEqual(len(self.replica_connections), 2)
+
+    def test_reads_after_write_go_to_primary(self):
+        db_users.update(self.user.id, user_new_info={"display_name": "new name"})
+        db_users.total_count()
+        self.assertEqual(len(self.replica_connections), 0)
+
+    def test_reads_after_user_write_go_to_primary(self):
+        db.set_request_user(self.user.id)
+        db_users.update(self.user.id, user_new_info={"display_name": "new name"})
+        db._stick_user_to_primary(60)
+
+        # Following requests of the user read from the primary database
+        db._use_primary.set(False)
+        db.set_request_user(self.user.id)
+        db_users.total_count()
+        self.assertEqual(len(self.replica_connections), 0)
+
+        # Requests of other users still read from replicas
+        db._use_primary.set(False)
+        db.set_request_user(None)
+        db_users.total_count()
+        self.assertEqual(len(self.replica_connections), 1)
+
+    def test_replica_failover(self):
+        db.init_replica_engines(["postgresql://nobody@localhost:1/nothing"])
+        self.assertEqual(db_users.total_count(), 1)
+        self.assertGreater(db._replica_down_until[0], 0)
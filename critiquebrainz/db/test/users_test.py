@@ -1,6 +1,8 @@
 from datetime import datetime, date, timedelta
 from uuid import UUID
 
+import sqlalchemy
+
 import critiquebrainz.db.comment as db_comment
 import critiquebrainz.db.license as db_license
 import critiquebrainz.db.oauth_client as db_oauth_client
@@ -9,6 +11,7 @@ import critiquebrainz.db.review as db_review
 import critiquebrainz.db.spam_report as db_spam_report
 import critiquebrainz.db.users as db_users
 import critiquebrainz.db.vote as db_vote
+from critiquebrainz import db
 from critiquebrainz.data.testing import DataTestCase
 from critiquebrainz.db.user import User
 from critiquebrainz.db.users import get_many_by_mb_username
@@ -102,6 +105,38 @@ class UserTestCase(DataTestCase):
         karma = db_users.karma(self.user2.id)
         self.assertEqual(karma, 0)
 
+    def test_karma_maintained(self):
+        db_vote.submit(self.user2.id, self.revision_id, False)
+        self.assertEqual(db_users.karma(self.author.id), 0)
+        db_vote.submit(self.user2.id, self.revision_id, True)
+        self.assertEqual(db_users.karma(self.author.id), 2)
+        db_vote.delete(self.user1.id, self.revision_id)
+        self.assertEqual(db_users.karma(self.author.id), 1)
+
+        # Votes of deleted users are subtracted
+        db_users.delete(self.user2.id)
+        self.assertEqual(db_users.karma(self.author.id), 0)
+
+        db_vote.submit(self.user1.id, self.revision_id, True)
+        self.assertEqual(db_users.karma(self.author.id), 1)
+        with db.engine.begin() as connection:
+            connection.execute(sqlalchemy.text('UPDATE "user" SET karma = 10'))
+            db_users.update_karma(connection)
+        self.assertEqual(db_users.karma(self.author.id), 1)
+        self.assertEqual(db_users.karma(self.user1.id), 0)
+
+        # Votes on deleted reviews are subtracted
+        db_review.delete(self.review_id)
+        self.assertEqual(db_users.karma(self.author.id), 0)
+
+    def test_get_many_by_ids(self):
+        with db.engine.connect() as connection:
+            users = db_users.get_many_by_ids(connection, [self.author.id, self.user2.id])
+        self.assertEqual(set(users.keys()), {self.author.id, self.user2.id})
+        self.assertEqual(users[self.author.id]["display_name"], "Author1")
+        self.assertEqual(users[self.author.id]["karma"], 1)
+        self.assertEqual(users[self.user2.id]["karma"], 0)
+
     def test_reviews(self):
         review = db_users.reviews(self.author.id)[0]
         self.assertEqual(review['license_id'], 'Test')
@@ -130,6 +165,39 @@ class UserTestCase(DataTestCase):
         reviews = db_users.get_reviews(self.author.id, from_date=two_days_from_now)
         self.assertEqual(len(reviews), 0)
 
+    def test_count_votes_and_reviews(self):
+        self.assertEqual(db_users.count_votes(self.user1.id, from_date=date.today()), 1)
+        self.assertEqual(db_users.count_reviews(self.author.id, from_date=date.today()), 1)
+        two_days_from_now = date.today() + timedelta(days=2)
+        self.assertEqual(db_users.count_votes(self.user1.id, from_date=two_days_from_now), 0)
+        self.assertEqual(db_users.count_reviews(self.author.id, from_date=two_days_from_now), 0)
+
+    def test_daily_activity_count(self):
+        self.assertEqual(db_users.get_daily_activity_count(self.user1.id, "votes"), 1)
+        self.assertEqual(db_users.get_daily_activity_count(self.author.id, "reviews"), 1)
+
+        # Counters in the cache are kept up to date
+        review = db_review.create(
+            entity_id="3cfb11bb-135f-4841-a800-c056eb7465e0",
+            entity_type="release_group",
+            text="Testing again!",
+            user_id=self.author.id,
+            is_draft=False,
+            license_id="Test",
+        )
+        db_vote.submit(self.user1.id, review["last_revision"]["id"], True)
+        # Changing a vote doesn't count as another one
+        db_vote.submit(self.user1.id, review["last_revision"]["id"], False)
+        self.assertEqual(db_users.get_daily_activity_count(self.user1.id, "votes"), 2)
+        self.assertEqual(db_users.get_daily_activity_count(self.author.id, "reviews"), 2)
+
+        db_vote.delete(self.user1.id, review["last_revision"]["id"])
+        db_review.delete(review["id"])
+        # Missing counters aren't created by increments, they are initialized from the database
+        db_users.increment_daily_activity(self.user1.id, "votes")
+        self.assertEqual(db_users.get_daily_activity_count(self.user1.id, "votes"), 1)
+        self.assertEqual(db_users.get_daily_activity_count(self.author.id, "reviews"), 1)
+
     def test_get_comments(self):
         db_comment.create(
             user_id=self.user1.id,
@@ -150,6 +218,27 @@ class UserTestCase(DataTestCase):
         )
         self.assertEqual(len(result_comments), 0)
 
+    def test_get_activity_stats(self):
+        db_comment.create(
+            user_id=self.user1.id,
+            text="This is a test comment.",
+            review_id=self.review_id,
+        )
+        stats = db_users.get_activity_stats(self.user1.id)
+        self.assertEqual(stats["votes_today"], 1)
+        self.assertEqual(stats["votes_last_7_days"], 1)
+        self.assertEqual(stats["votes_this_month"], 1)
+        self.assertEqual(stats["comments_today"], 1)
+        self.assertEqual(stats["reviews_today"], 0)
+
+        stats = db_users.get_many_activity_stats([self.user1.id, self.user2.id, self.author.id])
+        self.assertEqual(set(stats.keys()), {self.user1.id, self.user2.id, self.author.id})
+        self.assertEqual(stats[self.author.id]["reviews_today"], 1)
+        self.assertEqual(stats[self.author.id]["reviews_this_month"], 1)
+        self.assertEqual(stats[self.author.id]["votes_today"], 0)
+        self.assertEqual(stats[self.user2.id], {key: 0 for key in db_users.ACTIVITY_STATS_KEYS})
+        self.assertEqual(db_users.get_many_activity_stats([]), {})
+
     def test_update(self):
         db_users.update(self.user1.id, user_new_info={
             "email": 'foo@foo.com',
@@ -1,9 +1,13 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from uuid import UUID
 
+import sqlalchemy
+
 import critiquebrainz.db.license as db_license
 import critiquebrainz.db.review as db_review
+import critiquebrainz.db.revision as db_revision
 import critiquebrainz.db.users as db_users
+from critiquebrainz import db
 from critiquebrainz.data.testing import DataTestCase
 from critiquebrainz.db import exceptions
 from critiquebrainz.db import vote
@@ -73,3 +77,69 @@ class VoteTestCase(DataTestCase):
         self.assertEqual(vote.get_count(), 1)
         vote.delete(self.user_1.id, self.review["last_revision"]["id"])
         self.assertEqual(vote.get_count(), 0)
+
+    def test_counters(self):
+        revision_id = self.review["last_revision"]["id"]
+        vote.submit(self.user_1.id, revision_id, True)
+        vote.submit(self.user_2.id, revision_id, True)
+        self.assertDictEqual(db_revision.votes(revision_id), {"positive": 2, "negative": 0})
+
+        # Submitting the same vote again doesn't change counters
+        vote.submit(self.user_1.id, revision_id, True)
+        self.assertDictEqual(db_revision.votes(revision_id), {"positive": 2, "negative": 0})
+
+        # Changing a vote moves it to the other counter
+        vote.submit(self.user_2.id, revision_id, False)
+        self.assertDictEqual(db_revision.votes(revision_id), {"positive": 1, "negative": 1})
+        reviews, _ = db_review.list_reviews(sort="popularity")
+        self.assertEqual(reviews[0]["votes_positive_count"], 1)
+        self.assertEqual(reviews[0]["votes_negative_count"], 1)
+        self.assertEqual(reviews[0]["popularity"], 0)
+
+        vote.delete(self.user_1.id, revision_id)
+        self.assertDictEqual(db_revision.votes(revision_id), {"positive": 0, "negative": 1})
+
+        # Votes of deleted users are removed from counters
+        db_users.delete(self.user_2.id)
+        self.assertDictEqual(db_revision.votes(revision_id), {"positive": 0, "negative": 0})
+        self.assertEqual(db_review.list_reviews()[0][0]["popularity"], 0)
+
+    def test_old_vote_popularity(self):
+        revision_id = self.review["last_revision"]["id"]
+        vote.submit(self.user_1.id, revision_id, True)
+        vote.submit(self.user_2.id, revision_id, True)
+        with db.engine.begin() as connection:
+            connection.execute(sqlalchemy.text("UPDATE vote SET rated_at = :rated_at WHERE user_id = :user_id"), {
+                "rated_at": datetime.now() - timedelta(weeks=5),
+                "user_id": self.user_1.id,
+            })
+            db_review.update_popular_reviews(connection)
+
+        # Votes older than the window don't change popularity when they are changed or deleted
+        vote.submit(self.user_1.id, revision_id, False)
+        self.assertEqual(self._window_popularity(), 1)
+        vote.delete(self.user_1.id, revision_id)
+        self.assertEqual(self._window_popularity(), 1)
+        self.assertDictEqual(db_revision.votes(revision_id), {"positive": 1, "negative": 0})
+
+        vote.submit(self.user_2.id, revision_id, False)
+        self.assertEqual(self._window_popularity(), -1)
+
+    def _window_popularity(self):
+        with db.engine.connect() as connection:
+            return connection.execute(sqlalchemy.text("""
+                SELECT popularity
+                  FROM popular_reviews_window
+                 WHERE review_id = :review_id
+            """), {"review_id": self.review["id"]}).scalar()
+
+    def test_update_counters(self):
+        revision_id = self.review["last_revision"]["id"]
+        vote.submit(self.user_1.id, revision_id, True)
+        vote.submit(self.user_2.id, revision_id, False)
+        with db.engine.begin() as connection:
+            connection.execute(sqlalchemy.text("UPDATE revision SET votes_positive = 0, votes_negative = 0"))
+            connection.execute(sqlalchemy.text("UPDATE review SET votes_positive = 0, votes_negative = 0"))
+            vote.update_counters(connection)
+        self.assertDictEqual(db_revision.votes(revision_id), {"positive": 1, "negative": 1})
+        self.assertDictEqual(db_review.get_by_id(self.review["id"])["votes"], {"positive": 1, "negative": 1})
@@ -1,4 +1,4 @@
-from datetime import date, timedelta
+from datetime import date
 
 from critiquebrainz.data.mixins import AdminMixin
 from critiquebrainz.data.user_types import user_types
@@ -19,6 +19,8 @@ class User(AdminMixin):
         self.is_blocked = user.get('is_blocked', False)
         self.license_choice = user.get('license_choice', None)
         self.musicbrainz_row_id = user.get('musicbrainz_row_id', None)
+        if 'karma' in user:
+            self._karma = user['karma']
     
     @property
     def is_vote_limit_exceeded(self):
@@ -46,25 +48,25 @@ class User(AdminMixin):
         return db_users.get_votes(self.id, from_date=date)
 
     def votes_since_count(self, date):
-        return len(db_users.get_votes(self.id, from_date=date))
+        return db_users.count_votes(self.id, from_date=date)
 
     def votes_today(self):
         return self.votes_since(date.today())
 
     def votes_today_count(self):
-        return self.votes_since_count(date.today())
+        return db_users.get_daily_activity_count(self.id, "votes")
 
     def reviews_since(self, date):
         return db_users.get_reviews(self.id, from_date=date)
 
     def reviews_since_count(self, date):
-        return len(db_users.get_reviews(self.id, from_date=date))
+        return db_users.count_reviews(self.id, from_date=date)
 
     def reviews_today(self):
         return self.reviews_since(date.today())
 
     def reviews_today_count(self):
-        return self.reviews_since_count(date.today())
+        return db_users.get_daily_activity_count(self.id, "reviews")
 
     def comments_since(self, date):
         return db_users.get_comments(self.id, from_date=date)
@@ -91,18 +93,9 @@ class User(AdminMixin):
 
     @property
     def stats(self):
-        today = date.today()
-        return dict(
-            reviews_today=self.reviews_today_count(),
-            reviews_last_7_days=self.reviews_since_count(today - timedelta(days=7)),
-            reviews_this_month=self.reviews_since_count(date(today.year, today.month, 1)),
-            votes_today=self.votes_today_count(),
-            votes_last_7_days=self.votes_since_count(today - timedelta(days=7)),
-            votes_this_month=self.votes_since_count(date(today.year, today.month, 1)),
-            comments_today=self.comments_today_count(),
-            comments_last_7_days=self.comments_since_count(today - timedelta(days=7)),
-            comments_this_month=self.comments_since_count(date(today.year, today.month, 1)),
-        )
+        if not hasattr(self, '_stats'):
+            self._stats = db_users.get_activity_stats(self.id)
+        return self._stats
 
     def to_dict(self, includes=None, confidential=False):
         if includes is None:
@@ -131,17 +124,6 @@ class User(AdminMixin):
             )
 
         if 'stats' in includes:
-            today = date.today()
-            response['stats'] = dict(
-                reviews_today=self.reviews_today_count(),
-                reviews_last_7_days=self.reviews_since_count(today - timedelta(days=7)),
-                reviews_this_month=self.reviews_since_count(date(today.year, today.month, 1)),
-                votes_today=self.votes_today_count(),
-                votes_last_7_days=self.votes_since_count(today - timedelta(days=7)),
-                votes_this_month=self.votes_since_count(date(today.year, today.month, 1)),
-                comments_today=self.comments_today_count(),
-                comments_last_7_days=self.comments_since_count(today - timedelta(days=7)),
-                comments_this_month=self.comments_since_count(date(today.year, today.month, 1)),
-            )
+            response['stats'] = self.stats
 
         return response
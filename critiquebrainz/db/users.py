@@ -1,10 +1,14 @@
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 
 import sqlalchemy
+from brainzutils import cache
 
 from critiquebrainz import db
 
+DAILY_ACTIVITY_CACHE_NAMESPACE = "daily_activity"
+DAILY_ACTIVITY_CACHE_TIMEOUT = 2 * 24 * 60 * 60  # counters are only read on the day they are for
+
 
 USER_GET_COLUMNS = [
     'id',
@@ -16,10 +20,11 @@ USER_GET_COLUMNS = [
     'COALESCE(musicbrainz_id, id::text) AS user_ref',
     'license_choice',
     'is_blocked',
+    'karma',
 ]
 
 
-def get_many_by_mb_username(usernames):
+def get_many_by_mb_username(usernames, *, connection=None):
     """Get information about users.
 
     Args:
@@ -32,7 +37,7 @@ def get_many_by_mb_username(usernames):
     if not usernames:
         return []
 
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT {columns}
               FROM "user"
@@ -45,13 +50,13 @@ def get_many_by_mb_username(usernames):
         return users
 
 
-def get_user_by_ref(user_ref):
+def get_user_by_ref(user_ref, *, connection=None):
     """Get user from user_ref.
 
     Args:
         user_ref(str): ID or MusicBrainz
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT {columns}
               FROM "user"
@@ -86,7 +91,32 @@ def get_user_by_id(connection, user_id):
     return None
 
 
-def get_by_id(user_id):
+def get_many_by_ids(connection, user_ids):
+    """Get information about multiple users.
+
+    Args:
+        connection: connection to database to fetch the users
+        user_ids (iterable): IDs of the users.
+
+    Returns:
+        Dictionary with string representations of user IDs as keys and
+        dictionaries with the same structure as returned by get_by_id()
+        as values.
+    """
+    user_ids = [str(user_id) for user_id in user_ids]
+    if not user_ids:
+        return {}
+    result = connection.execute(sqlalchemy.text("""
+        SELECT {columns}
+          FROM "user"
+         WHERE id IN :user_ids
+    """.format(columns=','.join(USER_GET_COLUMNS))), {
+        "user_ids": tuple(user_ids),
+    })
+    return {str(row["id"]): dict(row) for row in result.mappings()}
+
+
+def get_by_id(user_id, *, connection=None):
     """Get user from user_id (UUID).
 
     Args:
@@ -101,14 +131,15 @@ def get_by_id(user_id):
             "created": (datetime),
             "musicbrainz_username": (str),
             "is_blocked": (bool),
-            "license_choice": (str)
+            "license_choice": (str),
+            "karma": (int)
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         return get_user_by_id(connection, user_id)
 
 
-def create(**user_data):
+def create(*, connection=None, **user_data):
     """Create user using the given details.
 
     This function is idempotent - if a user with the same musicbrainz_row_id
@@ -143,7 +174,7 @@ def create(**user_data):
     if user_data:
         raise TypeError('Unexpected **user_data: %r' % user_data)
 
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             INSERT INTO "user" (id, display_name, email, created, musicbrainz_id,
                                 is_blocked, license_choice, musicbrainz_row_id)
@@ -163,13 +194,13 @@ def create(**user_data):
         })
         row = result.first()
 
-    if row is not None:
-        return get_by_id(row.id)
+        if row is not None:
+            return get_by_id(row.id, connection=connection)
 
-    return get_by_mb_row_id(musicbrainz_row_id)
+        return get_by_mb_row_id(musicbrainz_row_id, connection=connection)
 
 
-def get_by_mbid(musicbrainz_username):
+def get_by_mbid(musicbrainz_username, *, connection=None):
     """Get user by musicbrainz username.
 
     Args:
@@ -187,7 +218,7 @@ def get_by_mbid(musicbrainz_username):
             "license_choice": (str)
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT {columns}
               FROM "user"
@@ -240,7 +271,7 @@ def get_or_create(musicbrainz_row_id, musicbrainz_username, new_user_data):
     return user
 
 
-def update_username(user, new_musicbrainz_id: str):
+def update_username(user, new_musicbrainz_id: str, *, connection=None):
     """ Update the email field and MusicBrainz ID of the user specified by the lb_id
 
     Args:
@@ -260,7 +291,7 @@ def update_username(user, new_musicbrainz_id: str):
          WHERE id = :cb_id
     """.format(", ".join(updates))
 
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text(query), {
             "cb_id": user["id"],
             "new_musicbrainz_id": new_musicbrainz_id,
@@ -273,13 +304,13 @@ def update_username(user, new_musicbrainz_id: str):
     return user
 
 
-def total_count():
+def total_count(*, connection=None):
     """Returns the total number of users of CritiqueBrainz.
 
     Returns:
         count: (int)
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT count(*)
               FROM "user"
@@ -288,7 +319,7 @@ def total_count():
         return result.fetchone().count
 
 
-def list_users(limit=None, offset=0):
+def list_users(limit=None, offset=0, *, connection=None):
     """Returns the list of users of CritiqueBrainz.
 
     Args:
@@ -308,7 +339,7 @@ def list_users(limit=None, offset=0):
             "musicbrainz_row_id": (int),
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT {columns}
               FROM "user"
@@ -323,13 +354,13 @@ def list_users(limit=None, offset=0):
         return [dict(row) for row in rows]
 
 
-def unblock(user_id):
+def unblock(user_id, *, connection=None):
     """Unblock user (admin only).
 
     Args:
         user_id(uuid): ID of user to be unblocked.
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             UPDATE "user"
                SET is_blocked = 'false'
@@ -339,13 +370,13 @@ def unblock(user_id):
         })
 
 
-def block(user_id):
+def block(user_id, *, connection=None):
     """Block user (admin only).
 
     Args:
         user_id(uuid): ID of user to be blocked.
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             UPDATE "user"
                SET is_blocked = 'true'
@@ -355,7 +386,7 @@ def block(user_id):
         })
 
 
-def has_voted(user_id, review_id):
+def has_voted(user_id, review_id, *, connection=None):
     """Check if a user has already voted on the last revision of a review.
 
     Args:
@@ -367,7 +398,7 @@ def has_voted(user_id, review_id):
     """
     from critiquebrainz.db import revision as db_revision
     last_revision = db_revision.get(review_id, limit=1)[0]
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT count(*)
               FROM vote
@@ -381,7 +412,7 @@ def has_voted(user_id, review_id):
         return count > 0
 
 
-def karma(user_id):
+def karma(user_id, *, connection=None):
     """Get the karma of a user.
 
     Args:
@@ -390,32 +421,50 @@ def karma(user_id):
     Returns:
         karma_value(int): the karma of the user.
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
-            SELECT review.user_id, vote
-              FROM ((vote
-                     LEFT JOIN revision
-                            ON revision.id = revision_id)
-                     LEFT JOIN review
-                            ON review.id = review_id)
-         LEFT JOIN "user"
-                ON "user".id = review.user_id
-             WHERE "user".id = :user_id
+            SELECT karma
+              FROM "user"
+             WHERE id = :user_id
         """), {
             "user_id": user_id
         })
+        row = result.fetchone()
+    return row.karma if row else 0
+
 
-        rows = result.fetchall()
-        karma_value = 0
-        for row in rows:
-            if row.vote:  # positive
-                karma_value += 1
-            else:  # negative
-                karma_value -= 1
-    return karma_value
+def update_karma(connection):
+    """Recompute karma of all users from votes on their reviews.
 
+    Karma is normally maintained when votes are submitted or deleted and when
+    reviews are deleted. This function rebuilds it, which is needed after
+    importing a data dump or to repair the values.
 
-def reviews(user_id):
+    Args:
+        connection: connection to database to update karma
+    """
+    result = connection.execute(sqlalchemy.text("""
+        UPDATE "user"
+           SET karma = COALESCE(user_karma.karma, 0)
+          FROM "user" AS u
+     LEFT JOIN (
+                SELECT review.user_id,
+                       COUNT(*) FILTER (WHERE vote = 't') - COUNT(*) FILTER (WHERE vote = 'f') AS karma
+                  FROM vote
+                  JOIN revision
+                    ON revision.id = vote.revision_id
+                  JOIN review
+                    ON review.id = revision.review_id
+              GROUP BY review.user_id
+               ) AS user_karma
+            ON user_karma.user_id = u.id
+         WHERE "user".id = u.id
+           AND "user".karma != COALESCE(user_karma.karma, 0)
+    """))
+    return result.rowcount
+
+
+def reviews(user_id, *, connection=None):
     """Get list of reviews written by a user.
 
     Args:
@@ -436,7 +485,7 @@ def reviews(user_id):
             "source_url" (str)
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT id,
                    entity_id,
@@ -458,7 +507,7 @@ def reviews(user_id):
         return [dict(row) for row in rows]
 
 
-def get_votes(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
+def get_votes(user_id, from_date=datetime.fromtimestamp(0, timezone.utc), *, connection=None):
     """Get votes by a user from a specified time.
 
     Args:
@@ -472,7 +521,7 @@ def get_votes(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
             "rated_at": (datetime)
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT vote,
                    rated_at
@@ -488,7 +537,7 @@ def get_votes(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
         return [dict(row) for row in rows]
 
 
-def get_reviews(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
+def get_reviews(user_id, from_date=datetime.fromtimestamp(0, timezone.utc), *, connection=None):
     """Get reviews by a user from a specified time.
 
     Args:
@@ -510,7 +559,7 @@ def get_reviews(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
             "source_url":(str),
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT id,
                    entity_id,
@@ -541,7 +590,7 @@ def get_reviews(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
         return [dict(row) for row in rows]
 
 
-def get_comments(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
+def get_comments(user_id, from_date=datetime.fromtimestamp(0, timezone.utc), *, connection=None):
     """Get comments on reviews by a user from a specified time.
 
     Args:
@@ -560,7 +609,7 @@ def get_comments(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
             "creation_time": (str),
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection, replica=True) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT id,
                    review_id,
@@ -586,7 +635,221 @@ def get_comments(user_id, from_date=datetime.fromtimestamp(0, timezone.utc)):
         return [dict(row) for row in rows]
 
 
-def update(user_id, user_new_info):
+def count_votes(user_id, from_date, *, connection=None):
+    """Get the number of votes cast by a user from a specified time.
+
+    Args:
+        user_id(uuid): ID of the user.
+        from_date(datetime): Date from which votes submitted by user are counted.
+    """
+    with db.connect(connection, replica=True) as connection:
+        result = connection.execute(sqlalchemy.text("""
+            SELECT count(*)
+              FROM vote
+             WHERE user_id = :user_id
+               AND rated_at >= :from_date
+        """), {
+            "user_id": user_id,
+            "from_date": from_date,
+        })
+        return result.scalar()
+
+
+def count_reviews(user_id, from_date, *, connection=None):
+    """Get the number of reviews created by a user from a specified time.
+
+    Args:
+        user_id(uuid): ID of the user.
+        from_date(datetime): Date from which reviews submitted by user are counted.
+    """
+    with db.connect(connection, replica=True) as connection:
+        result = connection.execute(sqlalchemy.text("""
+            SELECT count(*)
+              FROM review
+             WHERE user_id = :user_id
+               AND created > :from_date
+        """), {
+            "user_id": user_id,
+            "from_date": from_date,
+        })
+        return result.scalar()
+
+
+ACTIVITY_STATS_KEYS = [
+    "reviews_today", "reviews_last_7_days", "reviews_this_month",
+    "votes_today", "votes_last_7_days", "votes_this_month",
+    "comments_today", "comments_last_7_days", "comments_this_month",
+]
+
+
+def get_activity_stats(user_id):
+    """Get the number of reviews, votes and comments submitted by a user recently.
+
+    Args:
+        user_id(uuid): ID of the user.
+
+    Returns:
+        Dictionary with the following structure:
+        {
+            "reviews_today": (int),
+            "reviews_last_7_days": (int),
+            "reviews_this_month": (int),
+            "votes_today": (int),
+            "votes_last_7_days": (int),
+            "votes_this_month": (int),
+            "comments_today": (int),
+            "comments_last_7_days": (int),
+            "comments_this_month": (int),
+        }
+    """
+    return get_many_activity_stats([user_id])[str(user_id)]
+
+
+def get_many_activity_stats(user_ids, *, connection=None):
+    """Get the number of reviews, votes and comments submitted by multiple users recently.
+
+    All numbers are computed with a single query.
+
+    Args:
+        user_ids(iterable): IDs of the users.
+
+    Returns:
+        Dictionary with string representations of user IDs as keys and
+        dictionaries with the same structure as returned by get_activity_stats()
+        as values. Users that don't exist are not included.
+    """
+    user_ids = [str(user_id) for user_id in user_ids]
+    if not user_ids:
+        return {}
+    today = date.today()
+    with db.connect(connection, replica=True) as connection:
+        result = connection.execute(sqlalchemy.text("""
+            SELECT "user".id,
+                   reviews.reviews_today,
+                   reviews.reviews_last_7_days,
+                   reviews.reviews_this_month,
+                   votes.votes_today,
+                   votes.votes_last_7_days,
+                   votes.votes_this_month,
+                   comments.comments_today,
+                   comments.comments_last_7_days,
+                   comments.comments_this_month
+              FROM "user"
+        CROSS JOIN LATERAL (
+                SELECT count(*) FILTER (WHERE created > :today) AS reviews_today,
+                       count(*) FILTER (WHERE created > :week_ago) AS reviews_last_7_days,
+                       count(*) FILTER (WHERE created > :month_start) AS reviews_this_month
+                  FROM review
+                 WHERE user_id = "user".id
+                   AND created > :since
+                   ) AS reviews
+        CROSS JOIN LATERAL (
+                SELECT count(*) FILTER (WHERE rated_at >= :today) AS votes_today,
+                       count(*) FILTER (WHERE rated_at >= :week_ago) AS votes_last_7_days,
+                       count(*) FILTER (WHERE rated_at >= :month_start) AS votes_this_month
+                  FROM vote
+                 WHERE user_id = "user".id
+                   AND rated_at >= :since
+                   ) AS votes
+        CROSS JOIN LATERAL (
+                SELECT count(*) FILTER (WHERE created > :today) AS comments_today,
+                       count(*) FILTER (WHERE created > :week_ago) AS comments_last_7_days,
+                       count(*) FILTER (WHERE created > :month_start) AS comments_this_month
+                  FROM (SELECT min(comment_revision.timestamp) AS created
+                          FROM comment
+                          JOIN comment_revision
+                            ON comment_revision.comment_id = comment.id
+                         WHERE comment.user_id = "user".id
+                      GROUP BY comment.id
+                       ) AS comment_create
+                 WHERE created > :since
+                   ) AS comments
+             WHERE "user".id IN :user_ids
+        """), {
+            "user_ids": tuple(user_ids),
+            "today": today,
+            "week_ago": today - timedelta(days=7),
+            "month_start": today.replace(day=1),
+            "since": min(today - timedelta(days=7), today.replace(day=1)),
+        })
+        return {
+            str(row["id"]): {key: row[key] for key in ACTIVITY_STATS_KEYS}
+            for row in result.mappings()
+        }
+
+
+_DAILY_ACTIVITY_COUNTS = {
+    "votes": count_votes,
+    "reviews": count_reviews,
+}
+
+
+def _daily_activity_key(user_id, activity, day):
+    return cache.gen_key(activity, str(user_id), day.isoformat())
+
+
+def get_daily_activity_count(user_id, activity):
+    """Get the number of votes or reviews submitted by a user today.
+
+    The number is kept in a per-user counter in the cache, so that checking
+    rate limits doesn't depend on how much history the user has. Missing
+    counters are initialized from the database.
+
+    Args:
+        user_id(uuid): ID of the user.
+        activity(str): "votes" or "reviews".
+    """
+    today = date.today()
+    key = _daily_activity_key(user_id, activity, today)
+    count = cache.get(key, namespace=DAILY_ACTIVITY_CACHE_NAMESPACE, decode=False)
+    if count is None:
+        count = _DAILY_ACTIVITY_COUNTS[activity](user_id, today)
+        cache.set(key, count, expirein=DAILY_ACTIVITY_CACHE_TIMEOUT, namespace=DAILY_ACTIVITY_CACHE_NAMESPACE,
+                  encode=False)
+    return int(count)
+
+
+def increment_daily_activity(user_id, activity):
+    """Count a vote or a review submitted by a user today.
+
+    Must be called after the transaction which creates the vote or the review
+    is committed. If the counter isn't in the cache it's left to be initialized
+    from the database when it's read.
+
+    Args:
+        user_id(uuid): ID of the user.
+        activity(str): "votes" or "reviews".
+    """
+    key = _daily_activity_key(user_id, activity, date.today())
+    key = cache._prep_key(key, namespace=DAILY_ACTIVITY_CACHE_NAMESPACE)  # pylint: disable=protected-access
+    # brainzutils doesn't expose pipelines, which are needed to increment the counter and keep its expiration
+    # in one round trip
+    with cache._r.pipeline() as pipeline:  # pylint: disable=protected-access
+        pipeline.incr(key)
+        pipeline.expire(key, DAILY_ACTIVITY_CACHE_TIMEOUT)
+        count, _ = pipeline.execute()
+    if count == 1:
+        # The counter was missing, it must be initialized from the database instead
+        cache._r.delete(key)  # pylint: disable=protected-access
+
+
+def invalidate_daily_activity(user_ids, activity):
+    """Reset today's counters of votes or reviews of users.
+
+    Used when votes or reviews are removed, or created in bulk. The counters are
+    initialized from the database again when they are read.
+
+    Args:
+        user_ids(iterable): IDs of the users.
+        activity(str): "votes" or "reviews".
+    """
+    today = date.today()
+    keys = [_daily_activity_key(user_id, activity, today) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys, namespace=DAILY_ACTIVITY_CACHE_NAMESPACE)
+
+
+def update(user_id, user_new_info, *, connection=None):
     """Update info of a user.
 
     Args:
@@ -613,18 +876,21 @@ def update(user_id, user_new_info):
             """.format(setstr))
     if user_new_info:
         user_new_info["user_id"] = user_id
-        with db.engine.begin() as connection:
+        with db.begin(connection) as connection:
             connection.execute(query, user_new_info)
 
 
-def delete(user_id):
+def delete(user_id, *, connection=None):
     """
     This function deletes user and all of the information associated with them.
 
     Args:
         user_id(uuid): ID of the user to be deleted.
     """
-    with db.engine.begin() as connection:
+    from critiquebrainz.db import review as db_review, vote as db_vote
+    with db.begin(connection) as connection:
+        db_vote.discount_user_votes(connection, user_id)
+        entity_ids = db_review.discount_user_reviews(connection, user_id)
         connection.execute(sqlalchemy.text("""
             DELETE
               FROM "user"
@@ -632,9 +898,12 @@ def delete(user_id):
         """), {
             "user_id": user_id
         })
+    for entity_id in entity_ids:
+        db_review.invalidate_ws_entity_cache(entity_id)
+    db_review.invalidate_popular_reviews_cache()
 
 
-def clients(user_id):
+def clients(user_id, *, connection=None):
     """Get list of oauth clients registered by user.
 
     Args:
@@ -652,7 +921,7 @@ def clients(user_id):
             "website": (unicode)
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT client_id,
                    client_secret,
@@ -671,7 +940,7 @@ def clients(user_id):
         return [dict(row) for row in rows]
 
 
-def tokens(user_id):
+def tokens(user_id, *, connection=None):
     """Get the oauth_tokens from a user_id.
 
     Args:
@@ -690,7 +959,7 @@ def tokens(user_id):
             "client_website": (str),
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT oauth_token.id,
                    oauth_token.client_id,
@@ -712,7 +981,7 @@ def tokens(user_id):
         return [dict(row) for row in rows]
 
 
-def get_by_mb_row_id(musicbrainz_row_id, musicbrainz_id=None):
+def get_by_mb_row_id(musicbrainz_row_id, musicbrainz_id=None, *, connection=None):
     """ Get user with specified MusicBrainz row ID.
 
     Note: this function optionally takes a MusicBrainz username to fall back on
@@ -732,7 +1001,7 @@ def get_by_mb_row_id(musicbrainz_row_id, musicbrainz_id=None):
         filter_data["musicbrainz_id"] = musicbrainz_id
 
     filter_data["musicbrainz_row_id"] = musicbrainz_row_id
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT {columns}
               FROM "user"
@@ -745,13 +1014,13 @@ def get_by_mb_row_id(musicbrainz_row_id, musicbrainz_id=None):
         return None
 
 
-def update_last_login(user_id):
+def update_last_login(user_id, *, connection=None):
     """ Update the value of last_login field for user with specified MusicBrainz ID
 
     Args:
         user_id: CritiqueBrainz user ID
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
         connection.execute(sqlalchemy.text("""
             UPDATE "user"
                SET last_login = NOW()
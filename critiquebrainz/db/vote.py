@@ -1,12 +1,15 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 import sqlalchemy
 
 from critiquebrainz import db
-from critiquebrainz.db import exceptions as db_exceptions
+from critiquebrainz.db import exceptions as db_exceptions, users as db_users
 
+# Votes cast during this period count towards popularity of reviews
+POPULAR_REVIEWS_WINDOW = timedelta(weeks=4)
 
-def get(user_id, revision_id):
+
+def get(user_id, revision_id, *, connection=None):
     """Get vote cast by a user on a revision.
 
     Args:
@@ -22,7 +25,7 @@ def get(user_id, revision_id):
             "rated_at": (datetime)
         }
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT user_id, revision_id, vote, rated_at
               FROM vote
@@ -37,17 +40,37 @@ def get(user_id, revision_id):
         return dict(row)
 
 
-def submit(user_id, revision_id, vote):
+def submit(user_id, revision_id, vote, *, connection=None):
     """Set user's vote for a revision.
 
     If user already voted on this revision, existing vote value is updated.
+    Vote counters of the revision and its review are updated in the same
+    transaction.
 
     Args:
         user_id (uuid): ID of a user.
         revision_id (id): ID of a review revision that the vote is associated with.
         vote (bool): `False` if it's a negative vote, `True` if positive.
     """
-    with db.engine.begin() as connection:
+    with db.begin(connection) as connection:
+        # Lock the revision so that concurrent votes on it are counted correctly
+        connection.execute(sqlalchemy.text("""
+            SELECT id
+              FROM revision
+             WHERE id = :revision_id
+               FOR UPDATE
+        """), {
+            "revision_id": revision_id,
+        })
+        result = connection.execute(sqlalchemy.text("""
+            SELECT vote, rated_at
+              FROM vote
+             WHERE user_id = :user_id AND revision_id = :revision_id
+        """), {
+            "user_id": user_id,
+            "revision_id": revision_id,
+        })
+        previous = result.fetchone()
         connection.execute(sqlalchemy.text("""
             INSERT INTO vote (user_id, revision_id, vote, rated_at)
                  VALUES (:user_id, :revision_id, :vote, :rated_at)
@@ -58,29 +81,188 @@ def submit(user_id, revision_id, vote):
             "vote": vote,
             "rated_at": datetime.now(timezone.utc),
         })
+        if previous is None:
+            _update_counters(connection, revision_id, vote, 1)
+        elif previous.vote != vote:
+            # The vote keeps its original time, so it stays outside of the window if it was
+            _update_counters(connection, revision_id, previous.vote, -1, rated_at=previous.rated_at)
+            _update_counters(connection, revision_id, vote, 1, rated_at=previous.rated_at)
+    if previous is None:
+        db_users.increment_daily_activity(user_id, "votes")
 
 
-def delete(user_id, revision_id):
+def delete(user_id, revision_id, *, connection=None):
     """Delete vote cast by a user on a revision.
 
     Args:
         user_id (uuid): ID of a user.
         revision_id (id): ID of a review revision that the vote is associated with.
     """
-    with db.engine.begin() as connection:
-        connection.execute(sqlalchemy.text("""
+    with db.begin(connection) as connection:
+        result = connection.execute(sqlalchemy.text("""
             DELETE FROM vote
                   WHERE user_id = :user_id AND revision_id = :revision_id
+              RETURNING vote, rated_at
         """), {
             "user_id": user_id,
             "revision_id": revision_id,
         })
+        deleted = result.fetchone()
+        if deleted is not None:
+            _update_counters(connection, revision_id, deleted.vote, -1, rated_at=deleted.rated_at)
+    if deleted is not None:
+        db_users.invalidate_daily_activity([user_id], "votes")
+
+
+def _update_counters(connection, revision_id, vote, delta, rated_at=None):
+    """Adjust vote counters of a revision and of the review it belongs to,
+    karma of the author of the review and popularity of the review during
+    the last month.
+
+    Args:
+        connection: connection to database to update the counters
+        revision_id (id): ID of a review revision that the vote is associated with.
+        vote (bool): `False` if a negative vote counter is changed, `True` if positive.
+        delta (int): Value to add to the counter.
+        rated_at (datetime): Time when the vote was cast, if it was cast before.
+            Popularity is only changed for votes cast during POPULAR_REVIEWS_WINDOW,
+            the same ones that are counted by `db_review.update_popular_reviews`.
+    """
+    in_window = rated_at is None or rated_at > datetime.now() - POPULAR_REVIEWS_WINDOW
+    column = "votes_positive" if vote else "votes_negative"
+    connection.execute(sqlalchemy.text("""
+        WITH updated_revision AS (
+            UPDATE revision
+               SET {column} = {column} + :delta
+             WHERE id = :revision_id
+         RETURNING review_id
+        ), updated_popularity AS (
+            INSERT INTO popular_reviews_window (review_id, popularity)
+                 SELECT review_id, :karma_delta
+                   FROM updated_revision
+                  WHERE :in_window
+            ON CONFLICT (review_id)
+              DO UPDATE
+                    SET popularity = popular_reviews_window.popularity + EXCLUDED.popularity
+        ), updated_review AS (
+            UPDATE review
+               SET {column} = {column} + :delta
+              FROM updated_revision
+             WHERE review.id = updated_revision.review_id
+         RETURNING review.user_id
+        )
+        UPDATE "user"
+           SET karma = karma + :karma_delta
+          FROM updated_review
+         WHERE "user".id = updated_review.user_id
+    """.format(column=column)), {
+        "revision_id": revision_id,
+        "delta": delta,
+        "karma_delta": delta if vote else -delta,
+        "in_window": in_window,
+    })
+
+
+def discount_user_votes(connection, user_id):
+    """Subtract all votes cast by a user from vote counters and karma of review authors.
+
+    This needs to be done before a user is deleted, since their votes are
+    removed together with them.
+
+    Args:
+        connection: connection to database to update the counters
+        user_id (uuid): ID of a user.
+    """
+    connection.execute(sqlalchemy.text("""
+        WITH user_votes AS (
+            SELECT revision_id,
+                   COUNT(*) FILTER (WHERE vote = 't') AS votes_positive,
+                   COUNT(*) FILTER (WHERE vote = 'f') AS votes_negative
+              FROM vote
+             WHERE user_id = :user_id
+          GROUP BY revision_id
+        ), updated_revisions AS (
+            UPDATE revision
+               SET votes_positive = revision.votes_positive - user_votes.votes_positive,
+                   votes_negative = revision.votes_negative - user_votes.votes_negative
+              FROM user_votes
+             WHERE revision.id = user_votes.revision_id
+         RETURNING revision.review_id, user_votes.votes_positive, user_votes.votes_negative
+        ), updated_reviews AS (
+            UPDATE review
+               SET votes_positive = review.votes_positive - counts.votes_positive,
+                   votes_negative = review.votes_negative - counts.votes_negative
+              FROM (
+                    SELECT review_id,
+                           SUM(votes_positive) AS votes_positive,
+                           SUM(votes_negative) AS votes_negative
+                      FROM updated_revisions
+                  GROUP BY review_id
+                   ) AS counts
+             WHERE review.id = counts.review_id
+         RETURNING review.user_id, counts.votes_positive - counts.votes_negative AS karma
+        )
+        UPDATE "user"
+           SET karma = "user".karma - user_karma.karma
+          FROM (
+                SELECT user_id, SUM(karma) AS karma
+                  FROM updated_reviews
+              GROUP BY user_id
+               ) AS user_karma
+         WHERE "user".id = user_karma.user_id
+    """), {
+        "user_id": user_id,
+    })
+
+
+def update_counters(connection):
+    """Recompute vote counters of all revisions and reviews from the vote table.
+
+    Counters are normally maintained by `submit` and `delete`. This function
+    rebuilds them, which is needed after importing a data dump or to repair
+    the values.
+
+    Args:
+        connection: connection to database to update the counters
+    """
+    connection.execute(sqlalchemy.text("""
+        UPDATE revision
+           SET votes_positive = COALESCE(counts.votes_positive, 0),
+               votes_negative = COALESCE(counts.votes_negative, 0)
+          FROM revision AS r
+     LEFT JOIN (
+                SELECT revision_id,
+                       COUNT(*) FILTER (WHERE vote = 't') AS votes_positive,
+                       COUNT(*) FILTER (WHERE vote = 'f') AS votes_negative
+                  FROM vote
+              GROUP BY revision_id
+               ) AS counts
+            ON counts.revision_id = r.id
+         WHERE revision.id = r.id
+           AND (revision.votes_positive, revision.votes_negative)
+               IS DISTINCT FROM (COALESCE(counts.votes_positive, 0), COALESCE(counts.votes_negative, 0))
+    """))
+    connection.execute(sqlalchemy.text("""
+        UPDATE review
+           SET votes_positive = counts.votes_positive,
+               votes_negative = counts.votes_negative
+          FROM (
+                SELECT review_id,
+                       SUM(votes_positive) AS votes_positive,
+                       SUM(votes_negative) AS votes_negative
+                  FROM revision
+              GROUP BY review_id
+               ) AS counts
+         WHERE review.id = counts.review_id
+           AND (review.votes_positive, review.votes_negative)
+               IS DISTINCT FROM (counts.votes_positive, counts.votes_negative)
+    """))
 
 
-def get_count():
+def get_count(*, connection=None):
     """Get the total number of votes in CritiqueBrainz.
     """
-    with db.engine.connect() as connection:
+    with db.connect(connection) as connection:
         result = connection.execute(sqlalchemy.text("""
             SELECT count(*)
               FROM vote
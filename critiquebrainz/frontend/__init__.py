@@ -76,17 +76,31 @@ def create_app(debug=None, config_path=None):
 
     # CritiqueBrainz Database
     from critiquebrainz import db as critiquebrainz_db
-    critiquebrainz_db.init_db_engine(app.config.get("SQLALCHEMY_DATABASE_URI"))
+    critiquebrainz_db.init_db_engine(
+        app.config.get("SQLALCHEMY_DATABASE_URI"),
+        **critiquebrainz_db.pool.get_engine_options(app.config, "SQLALCHEMY"),
+    )
+    critiquebrainz_db.init_replica_engines(
+        app.config.get("SQLALCHEMY_REPLICA_URIS"),
+        **critiquebrainz_db.pool.get_engine_options(app.config, "SQLALCHEMY"),
+    )
+    critiquebrainz_db.init_request_scope(app, get_user_id=_get_current_user_id)
 
     add_robots(app)
 
     # BookBrainz Database
     import critiquebrainz.frontend.external.bookbrainz_db as bookbrainz_db
-    bookbrainz_db.init_db_engine(app.config.get("BB_DATABASE_URI"))
+    bookbrainz_db.init_db_engine(
+        app.config.get("BB_DATABASE_URI"),
+        **critiquebrainz_db.pool.get_engine_options(app.config, "BB_DATABASE"),
+    )
 
     # MusicBrainz Database
     from brainzutils import musicbrainz_db
     musicbrainz_db.init_db_engine(app.config.get("MB_DATABASE_URI"))
+    if musicbrainz_db.engine is not None:
+        critiquebrainz_db.query_stats.instrument_engine("musicbrainz", musicbrainz_db.engine)
+    critiquebrainz_db.query_stats.init_app(app)
 
     # Redis (cache)
     from brainzutils import cache
@@ -101,6 +115,16 @@ def create_app(debug=None, config_path=None):
     else:
         logging.warning("Redis is not defined in config file. Skipping initialization.")
 
+    # In-process cache of entities
+    from critiquebrainz.frontend.external import local_cache
+    local_cache.init(
+        max_entries=app.config.get("LOCAL_ENTITY_CACHE_MAX_ENTRIES", local_cache.DEFAULT_MAX_ENTRIES),
+        max_bytes=app.config.get("LOCAL_ENTITY_CACHE_MAX_BYTES", local_cache.DEFAULT_MAX_BYTES),
+        ttl=app.config.get("LOCAL_ENTITY_CACHE_TTL", local_cache.DEFAULT_TTL),
+        missing_timeout=app.config.get("MISSING_ENTITY_CACHE_TIMEOUT", local_cache.DEFAULT_MISSING_TIMEOUT),
+    )
+    critiquebrainz_db.query_stats.register_metrics("entity_cache", local_cache.get_stats)
+
     from critiquebrainz.frontend import babel
     babel.init_app(app)
 
@@ -203,3 +227,8 @@ def add_robots(app):
     @app.route('/robots.txt')
     def robots_txt():  # pylint: disable=unused-variable
         return send_from_directory(app.static_folder, 'robots.txt')
+
+
+def _get_current_user_id():
+    from flask_login import current_user
+    return current_user.id if current_user.is_authenticated else None
@@ -1,13 +1,12 @@
-from sqlalchemy import create_engine
-from sqlalchemy.pool import NullPool
+from critiquebrainz.db import pool
 
 DEFAULT_CACHE_EXPIRATION = 12 * 60 * 60  # seconds (12 hours)
 bb_engine = None
 
 
-def init_db_engine(connect_str):
+def init_db_engine(connect_str, **engine_options):
     global bb_engine
-    bb_engine = create_engine(connect_str, poolclass=NullPool)
+    bb_engine = pool.create_engine("bookbrainz", connect_str, **engine_options)
 
 
 def run_sql_script(sql_file_path):
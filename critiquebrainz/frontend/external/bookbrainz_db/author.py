@@ -3,9 +3,10 @@ from brainzutils import cache
 from typing import List
 import sqlalchemy
 import critiquebrainz.frontend.external.bookbrainz_db as db 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.bookbrainz_db import DEFAULT_CACHE_EXPIRATION
-from critiquebrainz.frontend.external.bookbrainz_db.identifiers import fetch_bb_external_identifiers
-from critiquebrainz.frontend.external.bookbrainz_db.relationships import fetch_relationships, AUTHOR_WORK_AUTHOR_REL_ID
+from critiquebrainz.frontend.external.bookbrainz_db.identifiers import fetch_multiple_bb_external_identifiers
+from critiquebrainz.frontend.external.bookbrainz_db.relationships import fetch_multiple_relationships, AUTHOR_WORK_AUTHOR_REL_ID
 
 def get_author_by_bbid(bbid: str) -> dict:
 	"""
@@ -45,74 +46,80 @@ def fetch_multiple_authors(bbids: List[str]) -> dict:
 
 	bbids = [str(uuid.UUID(bbid)) for bbid in bbids]
 
-	bb_author_key = cache.gen_key('authors', bbids)
-	results = cache.get(bb_author_key)
-	if not results:
-		with db.bb_engine.connect() as connection:
-			result = connection.execute(sqlalchemy.text("""
-				SELECT 
-					bbid::text,
-					author.name,
-					sort_name,
-					author_type,
-					disambiguation,
-					identifier_set_id,
-					relationship_set_id,
-					area_id,
-					begin_year,
-					begin_month,
-					begin_day,
-					begin_area_id,
-					end_year,
-					end_month,
-					end_day,
-					end_area_id,
-					author.ended,
-					gender.name as gender,
-					COALESCE (json_agg(area)
+	return local_cache.get_many_or_fetch(
+		bbids,
+		lambda bbid: cache.gen_key('bb_author', bbid),
+		_fetch_authors,
+		DEFAULT_CACHE_EXPIRATION,
+		namespace='authors',
+	)
+
+
+def _fetch_authors(bbids: List[str]) -> dict:
+	"""Get info of authors from BookBrainz, keyed by their BBID."""
+	with db.bb_engine.connect() as connection:
+		result = connection.execute(sqlalchemy.text("""
+			SELECT 
+				bbid::text,
+				author.name,
+				sort_name,
+				author_type,
+				disambiguation,
+				identifier_set_id,
+				relationship_set_id,
+				area_id,
+				begin_year,
+				begin_month,
+				begin_day,
+				begin_area_id,
+				end_year,
+				end_month,
+				end_day,
+				end_area_id,
+				author.ended,
+				gender.name as gender,
+				COALESCE (json_agg(area)
                              FILTER (WHERE area IS NOT NULL),
                              '[]'
                              ) as area_info
-			   FROM author
-		  LEFT JOIN musicbrainz.area area 
-				 ON begin_area_id = area.id
-				 OR end_area_id = area.id
-				 OR area_id = area.id
+		   FROM author
+	  LEFT JOIN musicbrainz.area area 
+			 ON begin_area_id = area.id
+			 OR end_area_id = area.id
+			 OR area_id = area.id
           LEFT JOIN musicbrainz.gender
                  ON gender_id = gender.id
-			  WHERE bbid IN :bbids
-				AND master = 't'
-			GROUP BY bbid,
-					 author.name,
-					 sort_name,
-					 author_type,
-					 disambiguation,
-					 identifier_set_id,
-					 relationship_set_id,
-					 area_id,
-					 begin_year,
-					 begin_month,
-					 begin_day,
-					 begin_area_id,
-					 end_year,
-					 end_month,
-					 end_day,
-					 end_area_id,
-					 author.ended,
-					 gender.name
-			"""), {'bbids': tuple(bbids)})
+		  WHERE bbid IN :bbids
+			AND master = 't'
+		GROUP BY bbid,
+				 author.name,
+				 sort_name,
+				 author_type,
+				 disambiguation,
+				 identifier_set_id,
+				 relationship_set_id,
+				 area_id,
+				 begin_year,
+				 begin_month,
+				 begin_day,
+				 begin_area_id,
+				 end_year,
+				 end_month,
+				 end_day,
+				 end_area_id,
+				 author.ended,
+				 gender.name
+		"""), {'bbids': tuple(bbids)})
 
-			authors = result.mappings()
-			results = {}
-			for author in authors:
-				author = dict(author)
-				author['bbid'] = str(author['bbid'])
-				author['identifiers'] = fetch_bb_external_identifiers(author['identifier_set_id'])
-				author['rels'] = fetch_relationships( author['relationship_set_id'], [AUTHOR_WORK_AUTHOR_REL_ID])
-				results[author['bbid']] = author
+		authors = [dict(author) for author in result.mappings()]
 
-			cache.set(bb_author_key, results, DEFAULT_CACHE_EXPIRATION)
+	identifiers = fetch_multiple_bb_external_identifiers([author['identifier_set_id'] for author in authors])
+	rels = fetch_multiple_relationships([author['relationship_set_id'] for author in authors], [AUTHOR_WORK_AUTHOR_REL_ID])
+	results = {}
+	for author in authors:
+		author['bbid'] = str(author['bbid'])
+		author['identifiers'] = identifiers.get(author['identifier_set_id'], [])
+		author['rels'] = rels.get(author['relationship_set_id'], [])
+		results[author['bbid']] = author
 
-	if not results:
-		return {}
 	return results
@@ -3,6 +3,7 @@ from brainzutils import cache
 from typing import List
 import sqlalchemy
 import critiquebrainz.frontend.external.bookbrainz_db as db
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.bookbrainz_db import DEFAULT_CACHE_EXPIRATION
 
 
@@ -43,7 +44,7 @@ def fetch_multiple_editions(bbids: List[str]) -> dict:
     bbids = [str(uuid.UUID(bbid)) for bbid in bbids]
 
     bb_edition_key = cache.gen_key('edition', bbids)
-    results = cache.get(bb_edition_key)
+    results = local_cache.get(bb_edition_key, namespace='edition')
     if not results:
         with db.bb_engine.connect() as connection:
             result = connection.execute(sqlalchemy.text("""
@@ -85,7 +86,7 @@ def fetch_multiple_editions(bbids: List[str]) -> dict:
                 edition = dict(edition)
                 results[edition['bbid']] = edition
 
-            cache.set(bb_edition_key, results, DEFAULT_CACHE_EXPIRATION)
+            local_cache.set(bb_edition_key, results, DEFAULT_CACHE_EXPIRATION, namespace='edition')
 
     if not results:
         return {}
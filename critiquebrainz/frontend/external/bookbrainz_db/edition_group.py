@@ -3,9 +3,10 @@ from brainzutils import cache
 from typing import List
 import sqlalchemy
 import critiquebrainz.frontend.external.bookbrainz_db as db 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.bookbrainz_db import DEFAULT_CACHE_EXPIRATION
-from critiquebrainz.frontend.external.bookbrainz_db.identifiers import fetch_bb_external_identifiers
-from critiquebrainz.frontend.external.bookbrainz_db.relationships import fetch_relationships, EDITION_EDITION_GROUP_EDITION_REL_ID, EDITION_WORK_CONTAINS_REL_ID
+from critiquebrainz.frontend.external.bookbrainz_db.identifiers import fetch_multiple_bb_external_identifiers
+from critiquebrainz.frontend.external.bookbrainz_db.relationships import fetch_multiple_relationships, EDITION_EDITION_GROUP_EDITION_REL_ID, EDITION_WORK_CONTAINS_REL_ID
 
 
 def get_edition_group_by_bbid(bbid: str) -> dict:
@@ -47,50 +48,56 @@ def fetch_multiple_edition_groups(bbids: List[str]) -> dict:
 
     bbids = [str(uuid.UUID(bbid)) for bbid in bbids]
 
-    bb_edition_group_key = cache.gen_key('edition-groups', bbids)
-    results = cache.get(bb_edition_group_key)
-    if not results:
-        with db.bb_engine.connect() as connection:
-            result = connection.execute(sqlalchemy.text("""
-                SELECT 
-                    bbid::text,
-                    edition_group.name,
-                    sort_name,
-                    edition_group_type,
-                    disambiguation,
-                    identifier_set_id,
-                    relationship_set_id,
-                    COALESCE( json_agg( acn ORDER BY "position" ASC )
-                              FILTER (WHERE acn IS NOT NULL),
-                              '[]'
-                            ) as author_credits
-               FROM edition_group 
-          LEFT JOIN author_credit_name acn ON acn.author_credit_id = edition_group.author_credit_id 
-              WHERE bbid in :bbids
-                AND master = 't'
-                AND data_id IS NOT NULL
-           GROUP BY bbid,
-                    edition_group.name,
-                    sort_name,
-                    edition_group_type,
-                    disambiguation,
-                    identifier_set_id,
-                    relationship_set_id
-                """), {'bbids': tuple(bbids)})
-            
-            edition_groups = result.mappings()
-            results = {}
-            for edition_group in edition_groups:
-                edition_group = dict(edition_group)
-                edition_group['identifiers'] = fetch_bb_external_identifiers(edition_group['identifier_set_id'])
-                edition_group['rels'] = fetch_relationships( edition_group['relationship_set_id'], [EDITION_EDITION_GROUP_EDITION_REL_ID])
-                results[edition_group['bbid']] = edition_group
-            
-            edition_groups = results
-            cache.set(bb_edition_group_key, results, DEFAULT_CACHE_EXPIRATION)
-    
-    if not results:
-        return {}
+    return local_cache.get_many_or_fetch(
+        bbids,
+        lambda bbid: cache.gen_key('bb_edition_group', bbid),
+        _fetch_edition_groups,
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='edition-groups',
+    )
+
+
+def _fetch_edition_groups(bbids: List[str]) -> dict:
+    """Get info of edition groups from BookBrainz, keyed by their BBID."""
+    with db.bb_engine.connect() as connection:
+        result = connection.execute(sqlalchemy.text("""
+            SELECT 
+                bbid::text,
+                edition_group.name,
+                sort_name,
+                edition_group_type,
+                disambiguation,
+                identifier_set_id,
+                relationship_set_id,
+                COALESCE( json_agg( acn ORDER BY "position" ASC )
+                          FILTER (WHERE acn IS NOT NULL),
+                          '[]'
+                        ) as author_credits
+           FROM edition_group 
+      LEFT JOIN author_credit_name acn ON acn.author_credit_id = edition_group.author_credit_id 
+          WHERE bbid in :bbids
+            AND master = 't'
+            AND data_id IS NOT NULL
+       GROUP BY bbid,
+                edition_group.name,
+                sort_name,
+                edition_group_type,
+                disambiguation,
+                identifier_set_id,
+                relationship_set_id
+            """), {'bbids': tuple(bbids)})
+
+        edition_groups = [dict(edition_group) for edition_group in result.mappings()]
+
+    identifiers = fetch_multiple_bb_external_identifiers([edition_group['identifier_set_id'] for edition_group in edition_groups])
+    rels = fetch_multiple_relationships([edition_group['relationship_set_id'] for edition_group in edition_groups],
+                                        [EDITION_EDITION_GROUP_EDITION_REL_ID])
+    results = {}
+    for edition_group in edition_groups:
+        edition_group['identifiers'] = identifiers.get(edition_group['identifier_set_id'], [])
+        edition_group['rels'] = rels.get(edition_group['relationship_set_id'], [])
+        results[edition_group['bbid']] = edition_group
+
     return results
 
 
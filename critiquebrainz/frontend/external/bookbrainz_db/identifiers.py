@@ -18,29 +18,55 @@ def fetch_bb_external_identifiers(identifier_set_id: int) -> List:
     """
     if not identifier_set_id:
         return []
-    
-    bb_identifiers_key = cache.gen_key('identifier', identifier_set_id)
-    identifiers = cache.get(bb_identifiers_key)
-    if not identifiers:
+    return fetch_multiple_bb_external_identifiers([identifier_set_id]).get(identifier_set_id, [])
+
+
+def fetch_multiple_bb_external_identifiers(identifier_set_ids: List[int]) -> dict:
+    """
+    Fetch identifiers of multiple identifier sets from the database.
+    Args:
+        identifier_set_ids (list): Identifier set IDs.
+    Returns:
+        A dictionary containing lists of identifiers keyed by their identifier set ID.
+        Identifiers contain the same fields as the ones returned by `fetch_bb_external_identifiers`.
+    """
+    identifier_set_ids = list(dict.fromkeys(set_id for set_id in identifier_set_ids if set_id))
+    if not identifier_set_ids:
+        return {}
+
+    keys = {set_id: cache.gen_key('identifier', set_id) for set_id in identifier_set_ids}
+    cached = cache.get_many(list(keys.values()))
+    results = {}
+    for set_id, key in keys.items():
+        identifiers = cached.get(key)
+        if identifiers is not None:
+            results[set_id] = identifiers
+
+    missing_set_ids = [set_id for set_id in identifier_set_ids if set_id not in results]
+    if missing_set_ids:
         with db.bb_engine.connect() as connection:
             result = connection.execute(sqlalchemy.text("""
-                SELECT iden.type_id as type_id,
+                SELECT idens.set_id as identifier_set_id,
+                       iden.type_id as type_id,
                        idtype.label as label,
                        idtype.display_template as url_template,
                        iden.value as value
                   FROM identifier_set__identifier idens
              LEFT JOIN identifier iden on idens.identifier_id = iden.id
              LEFT JOIN identifier_type idtype on iden.type_id = idtype.id
-                 WHERE idens.set_id = :identifier_set_id
-                """), {'identifier_set_id': identifier_set_id})
-            identifiers = result.mappings()
-            identifiers = [dict(identifier) for identifier in identifiers]
-            identifiers = process_bb_identifiers(identifiers)
-            cache.set(bb_identifiers_key, identifiers, DEFAULT_CACHE_EXPIRATION)
+                 WHERE idens.set_id IN :identifier_set_ids
+                """), {'identifier_set_ids': tuple(missing_set_ids)})
+            identifiers_by_set = {set_id: [] for set_id in missing_set_ids}
+            for identifier in result.mappings():
+                identifier = dict(identifier)
+                identifiers_by_set[identifier.pop('identifier_set_id')].append(identifier)
 
-    if not identifiers:
-        return []
-    return identifiers
+        fetched = {set_id: process_bb_identifiers(identifiers) for set_id, identifiers in identifiers_by_set.items()}
+        cache.set_many({keys[set_id]: identifiers for set_id, identifiers in fetched.items()},
+                       expirein=DEFAULT_CACHE_EXPIRATION)
+        results.update(fetched)
+
+    return results
 
 
 def process_bb_identifiers(identifiers: List) -> List:
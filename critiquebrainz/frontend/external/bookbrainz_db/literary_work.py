@@ -3,9 +3,10 @@ from brainzutils import cache
 from typing import List
 import sqlalchemy
 import critiquebrainz.frontend.external.bookbrainz_db as db
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.bookbrainz_db import DEFAULT_CACHE_EXPIRATION
-from critiquebrainz.frontend.external.bookbrainz_db.identifiers import fetch_bb_external_identifiers
-from critiquebrainz.frontend.external.bookbrainz_db.relationships import fetch_relationships, WORK_WORK_TRANSLATION_REL_ID, EDITION_WORK_CONTAINS_REL_ID
+from critiquebrainz.frontend.external.bookbrainz_db.identifiers import fetch_multiple_bb_external_identifiers
+from critiquebrainz.frontend.external.bookbrainz_db.relationships import fetch_multiple_relationships, WORK_WORK_TRANSLATION_REL_ID, EDITION_WORK_CONTAINS_REL_ID
 
 WORK_TYPE_FILTER_OPTIONS = ('Novel', 'Short Story', 'Poem')
 
@@ -54,6 +55,22 @@ def fetch_multiple_literary_works(bbids: List[str], work_type=None, limit=None,
 
     bbids = [str(uuid.UUID(bbid)) for bbid in bbids]
 
+    if work_type is not None or limit is not None or offset:
+        bbids = _filter_literary_works(bbids, work_type, limit, offset)
+        if not bbids:
+            return {}
+
+    return local_cache.get_many_or_fetch(
+        bbids,
+        lambda bbid: cache.gen_key('bb_literary_work', bbid),
+        _fetch_literary_works,
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='literary-works',
+    )
+
+
+def _filter_literary_works(bbids: List[str], work_type=None, limit=None, offset=0) -> list:
+    """Get BBIDs of literary works which match the work type filter, within the limit and offset."""
     query_params = {
         'bbids': tuple(bbids),
         'limit': limit,
@@ -68,53 +85,69 @@ def fetch_multiple_literary_works(bbids: List[str], work_type=None, limit=None,
         query_params['ommitted_work_types'] = WORK_TYPE_FILTER_OPTIONS
 
     bb_literary_work_key = cache.gen_key('literary-works', bbids, limit, offset, work_type)
-    results = cache.get(bb_literary_work_key)
-    if not results:
+    results = local_cache.get(bb_literary_work_key, namespace='literary-works')
+    if results is None:
         with db.bb_engine.connect() as connection:
             result = connection.execute(sqlalchemy.text("""
-                SELECT
-                    bbid::text,
+                SELECT bbid::text
+                  FROM work
+                 WHERE bbid IN :bbids
+                   AND master = 't'
+                   AND data_id IS NOT NULL
+                   {work_type_filter_string}
+                 LIMIT :limit
+                OFFSET :offset
+            """.format(work_type_filter_string=work_type_filter_string)
+            ), query_params)
+
+            results = [row.bbid for row in result]
+            local_cache.set(bb_literary_work_key, results, DEFAULT_CACHE_EXPIRATION, namespace='literary-works')
+
+    return results
+
+
+def _fetch_literary_works(bbids: List[str]) -> dict:
+    """Get info of literary works from BookBrainz, keyed by their BBID."""
+    with db.bb_engine.connect() as connection:
+        result = connection.execute(sqlalchemy.text("""
+            SELECT
+                bbid::text,
+                work.name,
+                sort_name,
+                work_type,
+                disambiguation,
+                identifier_set_id,
+                relationship_set_id,
+                COALESCE (json_agg(mbl.name)
+                         FILTER (WHERE mbl IS NOT NULL),
+                         '[]'
+                         ) as languages
+            FROM work
+       LEFT JOIN bookbrainz.language_set__language lsl ON lsl.set_id = work.language_set_id
+       LEFT JOIN musicbrainz.language mbl on mbl.id = lsl.language_id
+            WHERE bbid IN :bbids
+                AND master = 't'
+                AND data_id IS NOT NULL
+           GROUP BY bbid,
                     work.name,
                     sort_name,
                     work_type,
                     disambiguation,
                     identifier_set_id,
-                    relationship_set_id,
-                    COALESCE (json_agg(mbl.name)
-                             FILTER (WHERE mbl IS NOT NULL),
-                             '[]'
-                             ) as languages
-                FROM work
-           LEFT JOIN bookbrainz.language_set__language lsl ON lsl.set_id = work.language_set_id
-           LEFT JOIN musicbrainz.language mbl on mbl.id = lsl.language_id
-                WHERE bbid IN :bbids
-                    AND master = 't'
-                    AND data_id IS NOT NULL
-                    {work_type_filter_string}
-               GROUP BY bbid,
-                        work.name,
-                        sort_name,
-                        work_type,
-                        disambiguation,
-                        identifier_set_id,
-                        relationship_set_id
-                LIMIT :limit
-               OFFSET :offset
-            """.format(work_type_filter_string=work_type_filter_string)
-            ), query_params)
+                    relationship_set_id
+        """), {'bbids': tuple(bbids)})
 
-            literary_works = result.mappings()
-            results = {}
-            for literary_work in literary_works:
-                literary_work = dict(literary_work)
-                literary_work['identifiers'] = fetch_bb_external_identifiers(literary_work['identifier_set_id'])
-                literary_work['rels'] = fetch_relationships(literary_work['relationship_set_id'], [WORK_WORK_TRANSLATION_REL_ID])
-                results[literary_work['bbid']] = literary_work
+        literary_works = [dict(literary_work) for literary_work in result.mappings()]
 
-            cache.set(bb_literary_work_key, results, DEFAULT_CACHE_EXPIRATION)
+    identifiers = fetch_multiple_bb_external_identifiers([literary_work['identifier_set_id'] for literary_work in literary_works])
+    rels = fetch_multiple_relationships([literary_work['relationship_set_id'] for literary_work in literary_works],
+                                        [WORK_WORK_TRANSLATION_REL_ID])
+    results = {}
+    for literary_work in literary_works:
+        literary_work['identifiers'] = identifiers.get(literary_work['identifier_set_id'], [])
+        literary_work['rels'] = rels.get(literary_work['relationship_set_id'], [])
+        results[literary_work['bbid']] = literary_work
 
-    if not results:
-        return {}
     return results
 
 
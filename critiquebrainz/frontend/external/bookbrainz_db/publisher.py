@@ -3,6 +3,7 @@ from brainzutils import cache
 from typing import List
 import sqlalchemy
 import critiquebrainz.frontend.external.bookbrainz_db as db
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.bookbrainz_db import DEFAULT_CACHE_EXPIRATION
 
 
@@ -42,7 +43,7 @@ def fetch_multiple_publishers(bbids: List[str]) -> dict:
     bbids = [str(uuid.UUID(bbid)) for bbid in bbids]
 
     bb_publisher_key = cache.gen_key('publishers', bbids)
-    results = cache.get(bb_publisher_key)
+    results = local_cache.get(bb_publisher_key, namespace='publishers')
     if not results:
         with db.bb_engine.connect() as connection:
             result = connection.execute(sqlalchemy.text("""
@@ -76,7 +77,7 @@ def fetch_multiple_publishers(bbids: List[str]) -> dict:
                 publisher = dict(publisher)
                 results[publisher['bbid']] = publisher
 
-            cache.set(bb_publisher_key, results, DEFAULT_CACHE_EXPIRATION)
+            local_cache.set(bb_publisher_key, results, DEFAULT_CACHE_EXPIRATION, namespace='publishers')
 
     if not results:
         return {}
@@ -23,13 +23,36 @@ def fetch_relationships(relationship_set_id: int, relation_types_id: List) -> Li
     """
     if not relationship_set_id:
         return []
+    return fetch_multiple_relationships([relationship_set_id], relation_types_id).get(relationship_set_id, [])
 
-    key = cache.gen_key('bb_relationship', relationship_set_id, relation_types_id)
-    relationships = cache.get(key)
-    if not relationships:
+
+def fetch_multiple_relationships(relationship_set_ids: List[int], relation_types_id: List) -> dict:
+    """
+    Fetch relationships of multiple relationship sets from the database.
+    Args:
+        relationship_set_ids (list): Relationship set IDs.
+        relation_types_id (list): IDs of the relationship types to include.
+    Returns:
+        A dictionary containing lists of relationships keyed by their relationship set ID.
+    """
+    relationship_set_ids = list(dict.fromkeys(set_id for set_id in relationship_set_ids if set_id))
+    if not relationship_set_ids:
+        return {}
+
+    keys = {set_id: cache.gen_key('bb_relationship', set_id, relation_types_id) for set_id in relationship_set_ids}
+    cached = cache.get_many(list(keys.values()))
+    results = {}
+    for set_id, key in keys.items():
+        relationships = cached.get(key)
+        if relationships is not None:
+            results[set_id] = relationships
+
+    missing_set_ids = [set_id for set_id in relationship_set_ids if set_id not in results]
+    if missing_set_ids:
         with db.bb_engine.connect() as connection:
             result = connection.execute(sqlalchemy.text("""
-                SELECT rel.id as id,
+                SELECT rels.set_id as relationship_set_id,
+                       rel.id as id,
                        reltype.id as relation_type_id,
                        reltype.label as label,
                        rel.source_bbid::text as source_bbid,
@@ -39,13 +62,16 @@ def fetch_relationships(relationship_set_id: int, relation_types_id: List) -> Li
                   FROM relationship_set__relationship rels
              LEFT JOIN relationship rel on rels.relationship_id = rel.id
              LEFT JOIN relationship_type reltype on rel.type_id = reltype.id
-                 WHERE rels.set_id = :relationship_set_id
+                 WHERE rels.set_id IN :relationship_set_ids
                    AND reltype.id in :relation_types_id
-            """), {'relationship_set_id': relationship_set_id, 'relation_types_id': tuple(relation_types_id)})
-            relationships = result.mappings()
-            relationships = [dict(relationship) for relationship in relationships]
-            cache.set(key, relationships, DEFAULT_CACHE_EXPIRATION)
+            """), {'relationship_set_ids': tuple(missing_set_ids), 'relation_types_id': tuple(relation_types_id)})
+            fetched = {set_id: [] for set_id in missing_set_ids}
+            for relationship in result.mappings():
+                relationship = dict(relationship)
+                fetched[relationship.pop('relationship_set_id')].append(relationship)
 
-    if not relationships:
-        return []
-    return relationships
+        cache.set_many({keys[set_id]: relationships for set_id, relationships in fetched.items()},
+                       expirein=DEFAULT_CACHE_EXPIRATION)
+        results.update(fetched)
+
+    return results
@@ -3,9 +3,10 @@ from brainzutils import cache
 from typing import List
 import sqlalchemy
 import critiquebrainz.frontend.external.bookbrainz_db as db
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.bookbrainz_db import DEFAULT_CACHE_EXPIRATION
-from critiquebrainz.frontend.external.bookbrainz_db.identifiers import fetch_bb_external_identifiers
-from critiquebrainz.frontend.external.bookbrainz_db.relationships import fetch_relationships, SERIES_REL_MAP
+from critiquebrainz.frontend.external.bookbrainz_db.identifiers import fetch_multiple_bb_external_identifiers
+from critiquebrainz.frontend.external.bookbrainz_db.relationships import fetch_multiple_relationships, SERIES_REL_MAP
 from critiquebrainz.frontend.external.bookbrainz_db.author import fetch_multiple_authors
 from critiquebrainz.frontend.external.bookbrainz_db.edition import fetch_multiple_editions
 from critiquebrainz.frontend.external.bookbrainz_db.edition_group import fetch_multiple_edition_groups
@@ -52,41 +53,53 @@ def fetch_multiple_series(bbids: List[str]) -> dict:
 
     bbids = [str(uuid.UUID(bbid)) for bbid in bbids]
 
-    bb_series_key = cache.gen_key('series', bbids)
-    results = cache.get(bb_series_key)
-    if not results:
-        with db.bb_engine.connect() as connection:
-            result = connection.execute(sqlalchemy.text("""
-                SELECT 
-                    bbid::text,
-                    series.name,
-                    sort_name,
-                    entity_type as series_type,
-                    disambiguation,
-                    identifier_set_id,
-                    relationship_set_id,
-                    series_ordering_type.label as series_ordering_type
-               FROM series
-          LEFT JOIN series_ordering_type
-                 ON series.ordering_type_id = series_ordering_type.id
-              WHERE bbid IN :bbids
-                AND master = 't'
-                AND entity_type IS NOT NULL
-            """), {'bbids': tuple(bbids)})
-
-            data = result.mappings()
-            results = {}
-            for series in data:
-                series = dict(series)
-                series['bbid'] = str(series['bbid'])
-                series['identifiers'] = fetch_bb_external_identifiers(series['identifier_set_id'])
-                series['rels'] = fetch_relationships(series['relationship_set_id'], [SERIES_REL_MAP[series['series_type']]])
-                results[series['bbid']] = series
-
-            cache.set(bb_series_key, results, DEFAULT_CACHE_EXPIRATION)
+    return local_cache.get_many_or_fetch(
+        bbids,
+        lambda bbid: cache.gen_key('bb_series', bbid),
+        _fetch_series,
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='series',
+    )
+
+
+def _fetch_series(bbids: List[str]) -> dict:
+    """Get info of series from BookBrainz, keyed by their BBID."""
+    with db.bb_engine.connect() as connection:
+        result = connection.execute(sqlalchemy.text("""
+            SELECT 
+                bbid::text,
+                series.name,
+                sort_name,
+                entity_type as series_type,
+                disambiguation,
+                identifier_set_id,
+                relationship_set_id,
+                series_ordering_type.label as series_ordering_type
+           FROM series
+      LEFT JOIN series_ordering_type
+             ON series.ordering_type_id = series_ordering_type.id
+          WHERE bbid IN :bbids
+            AND master = 't'
+            AND entity_type IS NOT NULL
+        """), {'bbids': tuple(bbids)})
+
+        data = [dict(series) for series in result.mappings()]
+
+    identifiers = fetch_multiple_bb_external_identifiers([series['identifier_set_id'] for series in data])
+    # Relationships of each series type are of a different type, so they are fetched per series type
+    rels = {}
+    for series_type in {series['series_type'] for series in data}:
+        rels.update(fetch_multiple_relationships(
+            [series['relationship_set_id'] for series in data if series['series_type'] == series_type],
+            [SERIES_REL_MAP[series_type]],
+        ))
+    results = {}
+    for series in data:
+        series['bbid'] = str(series['bbid'])
+        series['identifiers'] = identifiers.get(series['identifier_set_id'], [])
+        series['rels'] = rels.get(series['relationship_set_id'], [])
+        results[series['bbid']] = series
 
-    if not results:
-        return {}
     return results
 
 
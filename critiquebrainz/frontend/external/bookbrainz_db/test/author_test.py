@@ -1,3 +1,5 @@
+from unittest import mock
+
 from critiquebrainz.frontend.external.bookbrainz_db import author
 from critiquebrainz.data.testing import DataTestCase
 
@@ -26,3 +28,16 @@ class AuthorTestCase(DataTestCase):
         self.assertEqual(authors[self.bbid3]["bbid"], self.bbid3)
         self.assertEqual(authors[self.bbid3]["name"], "J. K. Rowling")
         self.assertEqual(authors[self.bbid3]["author_type"], "Person")
+
+    def test_fetch_multiple_authors_cache(self):
+        author.fetch_multiple_authors([self.bbid2])
+        with mock.patch.object(author, "_fetch_authors", wraps=author._fetch_authors) as fetch_authors:
+            authors = author.fetch_multiple_authors([self.bbid3, self.bbid2])
+            # Only the author which isn't cached is fetched
+            fetch_authors.assert_called_once_with([self.bbid3])
+            self.assertEqual(list(authors), [self.bbid3, self.bbid2])
+            self.assertEqual(authors[self.bbid2]["name"], "Charles Dickens")
+
+            fetch_authors.reset_mock()
+            self.assertEqual(author.get_author_by_bbid(self.bbid3)["name"], "J. K. Rowling")
+            fetch_authors.assert_not_called()
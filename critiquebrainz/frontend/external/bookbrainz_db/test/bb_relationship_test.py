@@ -13,3 +13,12 @@ class BBRelationshipTestCase(DataTestCase):
 
         relationship = relationships.fetch_relationships(99999999, [relationships.EDITION_EDITION_GROUP_EDITION_REL_ID])
         self.assertEqual(relationship, [])
+
+    def test_multiple_relationships(self):
+        rels = relationships.fetch_multiple_relationships([99999999, -1, None], [relationships.AUTHOR_WORK_AUTHOR_REL_ID])
+        self.assertEqual(set(rels), {99999999, -1})
+        self.assertEqual(rels[99999999][0]["label"], "Writer")
+        self.assertEqual(rels[-1], [])
+
+        # Relationship sets are cached, including the empty ones
+        self.assertEqual(relationships.fetch_multiple_relationships([-1, 99999999], [relationships.AUTHOR_WORK_AUTHOR_REL_ID]), rels)
@@ -1,3 +1,4 @@
+from brainzutils import cache
 from brainzutils.musicbrainz_db.artist import fetch_multiple_artists
 from brainzutils.musicbrainz_db.event import fetch_multiple_events
 from brainzutils.musicbrainz_db.label import fetch_multiple_labels
@@ -6,6 +7,7 @@ from brainzutils.musicbrainz_db.release_group import fetch_multiple_release_grou
 from brainzutils.musicbrainz_db.work import fetch_multiple_works
 from brainzutils.musicbrainz_db.recording import fetch_multiple_recordings
 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import artist
 from critiquebrainz.frontend.external.musicbrainz_db import event
 from critiquebrainz.frontend.external.musicbrainz_db import label
@@ -18,6 +20,21 @@ from critiquebrainz.frontend.external.bookbrainz_db import literary_work
 from critiquebrainz.frontend.external.bookbrainz_db import author
 from critiquebrainz.frontend.external.bookbrainz_db import series
 
+# Prefixes of cache keys of entities, the same as used by the get_*_by_mbid functions
+ENTITY_CACHE_KEY_PREFIXES = {
+    'release_group': 'release-group',
+    'artist': 'artist',
+    'label': 'label',
+    'place': 'place',
+    'event': 'event',
+    'work': 'work',
+    'recording': 'recording',
+}
+
+
+def _entity_cache_key(entity_id, entity_type):
+    return cache.gen_key(ENTITY_CACHE_KEY_PREFIXES.get(entity_type, entity_type), str(entity_id))
+
 
 def get_multiple_entities(entities):
     """Fetch multiple entities using their MBIDs.
@@ -36,8 +53,13 @@ def get_multiple_entities(entities):
         }
         Information related to the artists of release groups and the
         coordinates of the places is also included.
+
+        Entities which don't exist are not included, and are cached as missing
+        so that they are not looked up again for some time.
     """
     entities_info = {}
+    known_missing = local_cache.get_missing([_entity_cache_key(*entity) for entity in entities])
+    entities = [entity for entity in entities if _entity_cache_key(*entity) not in known_missing]
     release_group_mbids = [entity[0] for entity in entities if entity[1] == 'release_group']
     artist_mbids = [entity[0] for entity in entities if entity[1] == 'artist']
     label_mbids = [entity[0] for entity in entities if entity[1] == 'label']
@@ -96,7 +118,8 @@ def get_multiple_entities(entities):
         series_bbids,
     )
     entities_info.update(series_data)
-    
+
+    local_cache.set_missing([_entity_cache_key(*entity) for entity in entities if str(entity[0]) not in entities_info])
     return entities_info
 
 
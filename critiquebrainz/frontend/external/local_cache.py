@@ -0,0 +1,487 @@
+"""In-process cache of MusicBrainz and BookBrainz entities.
+
+Entities are cached in Redis, which means a round trip and deserialization of
+the entity every time it's needed, even when the same entity is shown again a
+moment later. This module keeps recently used entities in the memory of the
+process, in front of Redis, in an LRU cache which is bounded by the number of
+entries and by their approximate size in bytes. Entries expire after a short
+time, so that changes in Redis are picked up.
+
+Values are shared between all users of the cache in the process, so they must
+not be modified. Dictionaries, and dictionaries in them like entities keyed by
+their IDs, are copied when they're stored and returned, so that callers can
+add keys to them.
+
+Hits and misses are counted per namespace, which usually is the type of the
+entity. Namespaces only group the entries and counters of this cache, keys in
+Redis are not changed.
+
+`get_or_fetch` also protects the database from many processes fetching the
+same entity at once when it's missing from Redis. Only the process holding a
+short lock in Redis fetches the entity, others wait for it to be cached.
+Entities stay in Redis for STALE_TIMEOUT after they expire, and an expired
+entity is still returned while it's refreshed in the background. Expiration
+times are randomized, so that entities cached together don't expire together.
+Entities which don't exist are cached as missing for a shorter time, and can
+be forgotten with the `clear_missing_entities` command of manage.py.
+
+`get_many_or_fetch` caches each entity of a batch under its own key, so that
+batches with different entities share their cached entities, and only the
+entities which aren't cached are fetched.
+"""
+import collections
+import collections.abc
+import copy
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+
+from brainzutils import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 5 * 60  # seconds
+
+# Redis namespace of entities cached by `get_or_fetch`
+REDIS_NAMESPACE = "entity"
+# Seconds for which expired entities are kept to be returned while they are refreshed
+STALE_TIMEOUT = 60 * 60
+# Fraction of the expiration time by which it's randomly shortened
+EXPIRATION_JITTER = 0.1
+# Seconds after which a lock of a process fetching an entity is released if the process doesn't release it
+LOCK_TIMEOUT = 30
+# Seconds for which a process waits for another one to fetch an entity before fetching it itself
+LOCK_WAIT = 5
+LOCK_POLL_INTERVAL = 0.05
+# Deletes a lock only if it has the token of the process releasing it
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+# Default number of seconds for which entities which don't exist are cached as missing
+DEFAULT_MISSING_TIMEOUT = 10 * 60
+# Generation of entities cached as missing, entities cached in other generations are ignored
+MISSING_GENERATION_KEY = "missing_generation"
+
+
+def _sizeof(value):
+    """Get approximate size of `value` in memory, including values it contains."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(key) + _sizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, collections.abc.Set)):
+        size += sum(_sizeof(item) for item in value)
+    return size
+
+
+class LocalCache:
+    """Thread-safe LRU cache with expiring entries, bounded by entry count and size."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # (namespace, key) -> (expires_at, size, value)
+        self._size = 0
+        self._counters = collections.defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def get(self, namespace, key):
+        """Get a value, or None if it's not in the cache or expired."""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove((namespace, key))
+                entry = None
+            if entry is None:
+                self._counters[namespace]["misses"] += 1
+                return None
+            self._entries.move_to_end((namespace, key))
+            self._counters[namespace]["hits"] += 1
+            return entry[2]
+
+    def set(self, namespace, key, value, expirein=None):
+        """Store a value for `expirein` seconds, but no longer than the TTL of the cache."""
+        if not self.max_entries or not self.ttl:
+            return
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        ttl = min(expirein, self.ttl) if expirein else self.ttl
+        with self._lock:
+            if (namespace, key) in self._entries:
+                self._remove((namespace, key))
+            self._entries[(namespace, key)] = (time.monotonic() + ttl, size, value)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._counters.clear()
+
+    def _remove(self, entry_key):
+        _, size, _ = self._entries.pop(entry_key)
+        self._size -= size
+
+    def get_stats(self):
+        """Get the number of entries, their size and hit and miss counters by namespace."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "namespaces": {namespace: dict(counters) for namespace, counters in self._counters.items()},
+            }
+
+
+_cache = LocalCache()
+_missing_timeout = DEFAULT_MISSING_TIMEOUT
+
+
+def init(max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL,
+         missing_timeout=DEFAULT_MISSING_TIMEOUT):
+    """Configure limits of the cache and remove all entries from it.
+
+    Args:
+        max_entries (int): Maximum number of entries, 0 disables the cache.
+        max_bytes (int): Maximum approximate size of all entries in bytes.
+        ttl (int): Maximum number of seconds an entry is kept for, 0 disables the cache.
+        missing_timeout (int): Number of seconds for which entities that don't exist are
+            cached in Redis, 0 disables caching of missing entities.
+    """
+    global _missing_timeout
+    _missing_timeout = missing_timeout
+    _cache.clear()
+    _cache.max_entries = max_entries
+    _cache.max_bytes = max_bytes
+    _cache.ttl = ttl
+
+
+def get(key, *, namespace):
+    """Get a value from the local cache, or from Redis if it's not there.
+
+    Args:
+        key (str): Key of the value in Redis.
+        namespace (str): Namespace of the value in the local cache.
+
+    Returns:
+        The value, or None if it's in neither cache.
+    """
+    value = _cache.get(namespace, key)
+    if value is None:
+        value = cache.get(key)
+        if value:
+            _cache.set(namespace, key, value)
+    return _copy(value)
+
+
+def set(key, value, expirein, *, namespace):  # pylint: disable=redefined-builtin
+    """Store a value in Redis and in the local cache.
+
+    Args:
+        key (str): Key of the value in Redis.
+        value: Value to store.
+        expirein (int): Number of seconds after which the value expires in Redis.
+        namespace (str): Namespace of the value in the local cache.
+    """
+    cache.set(key, value, expirein)
+    _cache.set(namespace, key, _copy(value), expirein)
+
+
+def _copy(value):
+    """Copy a value, and dictionaries which it contains."""
+    if isinstance(value, dict):
+        return {key: copy.copy(item) if isinstance(item, dict) else item for key, item in value.items()}
+    return copy.copy(value)
+
+
+def get_or_fetch(key, fetch, expirein, *, namespace, is_missing=None):
+    """Get a value from the local cache or Redis, or fetch it and cache it.
+
+    Values which are missing from Redis are fetched by one process at a time,
+    and expired values are refreshed in the background while they are still
+    returned. Results for entities that don't exist are cached in Redis only,
+    for the shorter missing entity timeout.
+
+    Args:
+        key (str): Key of the value in Redis.
+        fetch (callable): Function without arguments which returns the value.
+        expirein (int): Number of seconds after which the value is refreshed.
+        namespace (str): Namespace of the value in the local cache.
+        is_missing (callable): Function which tells if a fetched value means that the
+            entity doesn't exist. By default false values mean that.
+
+    Returns:
+        The value, or whatever `fetch` returned for a missing entity.
+    """
+    value = _cache.get(namespace, key)
+    if value is not None:
+        return _copy(value)
+
+    is_missing = is_missing or (lambda value: not value)
+    entry = _drop_forgotten({key: cache.get(key, namespace=REDIS_NAMESPACE)}).get(key)
+    if entry is None:
+        entry = _fill(key, fetch, expirein, is_missing)
+    elif entry["fresh_until"] < time.time():
+        token = _acquire_lock(key)
+        if token:
+            threading.Thread(target=_refresh, args=(key, token, fetch, expirein, is_missing), daemon=True).start()
+    if not entry.get("missing"):
+        _cache.set(namespace, key, entry["value"])
+    return _copy(entry["value"])
+
+
+def get_many_or_fetch(ids, key, fetch, expirein, *, namespace):
+    """Get values of multiple entities from the local cache or Redis, and fetch the other ones.
+
+    Values are cached separately for each entity, so that they are reused by
+    any combination of entities. Values which aren't cached are fetched at
+    once, by one process at a time for each entity, and expired values are
+    refreshed in the background while they are still returned.
+
+    Args:
+        ids (list): IDs of the entities.
+        key (callable): Function which returns the key in Redis of an entity with the given ID.
+        fetch (callable): Function which takes a list of IDs and returns a dictionary
+            of values of the entities keyed by their IDs, without entities that don't exist.
+        expirein (int): Number of seconds after which the values are refreshed.
+        namespace (str): Namespace of the values in the local cache.
+
+    Returns:
+        Dictionary of values keyed by IDs of the entities, in the order of `ids`,
+        without entities that don't exist.
+    """
+    keys = {id_: key(id_) for id_ in ids}
+    results = {}
+    for id_, id_key in keys.items():
+        value = _cache.get(namespace, id_key)
+        if value is not None:
+            results[id_] = value
+
+    remaining = [id_ for id_ in keys if id_ not in results]
+    if remaining:
+        entries = _drop_forgotten(cache.get_many([keys[id_] for id_ in remaining], namespace=REDIS_NAMESPACE))
+        now = time.time()
+        stale = [id_ for id_ in remaining if keys[id_] in entries and entries[keys[id_]]["fresh_until"] < now]
+        tokens = _acquire_locks(keys, stale)
+        if tokens:
+            threading.Thread(target=_refresh_many, args=(keys, tokens, fetch, expirein), daemon=True).start()
+
+        uncached = [id_ for id_ in remaining if keys[id_] not in entries]
+        if uncached:
+            entries.update(_fill_many(keys, uncached, fetch, expirein))
+
+        for id_ in remaining:
+            entry = entries.get(keys[id_])
+            if entry is not None and not entry.get("missing"):
+                results[id_] = entry["value"]
+                _cache.set(namespace, keys[id_], entry["value"])
+
+    return {id_: _copy(results[id_]) for id_ in keys if id_ in results}
+
+
+def _store_many(keys, ids, fetched, expirein):
+    """Cache values fetched for `ids`, and return their entries keyed by keys in Redis."""
+    entries = {keys[id_]: _make_entry(value, expirein) for id_, value in fetched.items()}
+    if entries:
+        cache.set_many(entries, expirein=expirein + STALE_TIMEOUT, namespace=REDIS_NAMESPACE)
+    missing_keys = [keys[id_] for id_ in ids if id_ not in fetched]
+    set_missing(missing_keys)
+    entries.update({missing_key: _make_entry(None, _missing_timeout, missing=True) for missing_key in missing_keys})
+    return entries
+
+
+def _fill_many(keys, ids, fetch, expirein):
+    """Fetch values of entities which are missing from Redis, or wait for other processes fetching them."""
+    tokens = _acquire_locks(keys, ids)
+    locked = list(tokens)
+    entries = {}
+    if locked:
+        try:
+            entries.update(_store_many(keys, locked, fetch(locked), expirein))
+        finally:
+            for id_, token in tokens.items():
+                _release_lock(keys[id_], token)
+
+    waiting = [keys[id_] for id_ in ids if id_ not in locked]
+    deadline = time.monotonic() + LOCK_WAIT
+    while waiting and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entries.update(_drop_forgotten(cache.get_many(waiting, namespace=REDIS_NAMESPACE)))
+        locks = cache.get_many([_lock_key(entry_key) for entry_key in waiting],
+                               namespace=REDIS_NAMESPACE, decode=False)
+        # Values of entities which are no longer locked and not cached can't be cached by other processes
+        waiting = [entry_key for entry_key in waiting
+                   if entry_key not in entries and locks.get(_lock_key(entry_key)) is not None]
+
+    unfilled = [id_ for id_ in ids if keys[id_] not in entries]
+    if unfilled:
+        entries.update(_store_many(keys, unfilled, fetch(unfilled), expirein))
+    return entries
+
+
+def _refresh_many(keys, tokens, fetch, expirein):
+    ids = list(tokens)
+    try:
+        _store_many(keys, ids, fetch(ids), expirein)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Can't refresh cached values of %s", ", ".join(keys[id_] for id_ in ids))
+    finally:
+        for id_, token in tokens.items():
+            _release_lock(keys[id_], token)
+
+
+def _lock_key(key):
+    return cache.gen_key('lock', key)
+
+
+def _acquire_lock(key):
+    """Lock `key` for fetching its value, and return a token to release the lock with, or None if it's locked."""
+    token = uuid.uuid4().hex
+    # brainzutils doesn't expose SET NX, which is needed to set the lock and its expiration at once
+    if cache._r.set(  # pylint: disable=protected-access
+        cache._prep_key(_lock_key(key), namespace=REDIS_NAMESPACE),  # pylint: disable=protected-access
+        token, nx=True, ex=LOCK_TIMEOUT,
+    ):
+        return token
+    return None
+
+
+def _acquire_locks(keys, ids):
+    """Lock keys of `ids` which aren't locked, and return tokens of the locks keyed by the IDs."""
+    tokens = {id_: _acquire_lock(keys[id_]) for id_ in ids}
+    return {id_: token for id_, token in tokens.items() if token}
+
+
+def _release_lock(key, token):
+    """Release the lock of `key` if it's still held with `token`.
+
+    The lock expires after LOCK_TIMEOUT seconds, after which it can be held by
+    another process, so it's only deleted if it has the same token.
+    """
+    # brainzutils doesn't expose scripts, which are needed to compare and delete the lock at once
+    cache._r.eval(  # pylint: disable=protected-access
+        _RELEASE_LOCK_SCRIPT, 1,
+        cache._prep_key(_lock_key(key), namespace=REDIS_NAMESPACE),  # pylint: disable=protected-access
+        token,
+    )
+
+
+def _make_entry(value, timeout, missing=False):
+    return {
+        "value": value,
+        "fresh_until": time.time() + timeout * (1 - EXPIRATION_JITTER * random.random()),
+        "missing": missing,
+    }
+
+
+def _store(key, value, expirein, is_missing):
+    if is_missing(value):
+        entry = _make_entry(value, _missing_timeout, missing=True)
+        set_missing([key], value)
+    else:
+        entry = _make_entry(value, expirein)
+        cache.set(key, entry, expirein + STALE_TIMEOUT, namespace=REDIS_NAMESPACE)
+    return entry
+
+
+def _fill(key, fetch, expirein, is_missing):
+    """Fetch a value which is missing from Redis, or wait for another process to do it."""
+    token = _acquire_lock(key)
+    if not token:
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = _drop_forgotten({key: cache.get(key, namespace=REDIS_NAMESPACE)}).get(key)
+            if entry is not None:
+                return entry
+            if cache.get(_lock_key(key), namespace=REDIS_NAMESPACE, decode=False) is None:
+                # Another process didn't cache the value, so it can't be cached
+                break
+        return _store(key, fetch(), expirein, is_missing)
+    try:
+        return _store(key, fetch(), expirein, is_missing)
+    finally:
+        _release_lock(key, token)
+
+
+def _refresh(key, token, fetch, expirein, is_missing):
+    try:
+        _store(key, fetch(), expirein, is_missing)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Can't refresh cached value of %s", key)
+    finally:
+        _release_lock(key, token)
+
+
+def get_missing(keys):
+    """Get keys of entities which are cached as missing.
+
+    Args:
+        keys (list): Keys of the entities in Redis, as used by `get_or_fetch`.
+
+    Returns:
+        Set of the keys of missing entities.
+    """
+    if not keys:
+        return set()
+    entries = _drop_forgotten(cache.get_many(keys, namespace=REDIS_NAMESPACE))
+    return {key for key, entry in entries.items() if entry.get("missing")}
+
+
+def set_missing(keys, value=None):
+    """Cache entities as missing for the missing entity timeout.
+
+    Args:
+        keys (list): Keys of the entities in Redis, as used by `get_or_fetch`.
+        value: Value which is returned by `get_or_fetch` for the entities.
+    """
+    if not keys or not _missing_timeout:
+        return
+    entry = dict(_make_entry(value, _missing_timeout, missing=True), generation=_get_missing_generation())
+    cache.set_many({key: entry for key in keys}, expirein=_missing_timeout, namespace=REDIS_NAMESPACE)
+
+
+def clear_missing():
+    """Forget all entities cached as missing, so that they are fetched again.
+
+    A new missing entity generation is started, and entities cached as missing
+    in other generations are ignored until they expire. The generation expires
+    after the missing entity timeout, when all entities cached in the previous
+    one have expired too.
+    """
+    cache.set(MISSING_GENERATION_KEY, uuid.uuid4().hex, expirein=_missing_timeout or DEFAULT_MISSING_TIMEOUT,
+              namespace=REDIS_NAMESPACE)
+
+
+def _get_missing_generation():
+    return cache.get(MISSING_GENERATION_KEY, namespace=REDIS_NAMESPACE)
+
+
+def _drop_forgotten(entries):
+    """Remove entries which are empty or were cached as missing before `clear_missing` was called."""
+    entries = {key: entry for key, entry in entries.items() if entry is not None}
+    if any(entry.get("missing") for entry in entries.values()):
+        generation = _get_missing_generation()
+        entries = {key: entry for key, entry in entries.items()
+                   if not entry.get("missing") or entry.get("generation") == generation}
+    return entries
+
+
+def clear():
+    """Remove all entries from the local cache and reset its counters."""
+    _cache.clear()
+
+
+def get_stats():
+    """Get statistics of the local cache, see `LocalCache.get_stats`."""
+    return _cache.get_stats()
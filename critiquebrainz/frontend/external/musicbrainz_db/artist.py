@@ -1,6 +1,9 @@
+import functools
+
 from brainzutils import cache
 from brainzutils.musicbrainz_db import artist as db
 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 from critiquebrainz.frontend.external.relationships import artist as artist_rel
 
@@ -14,13 +17,16 @@ def get_artist_by_mbid(mbid):
         Dictionary containing the artist information
     """
     key = cache.gen_key('artist', mbid)
-    artist = cache.get(key)
-    if not artist:
-        artist = db.get_artist_by_mbid(
+    artist = local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_artist_by_mbid,
             mbid,
             includes=['artist-rels', 'url-rels'],
-        )
-        if not artist:
-            return None
-        cache.set(key, artist, DEFAULT_CACHE_EXPIRATION)
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='artist',
+    )
+    if not artist:
+        return None
     return artist_rel.process(artist)
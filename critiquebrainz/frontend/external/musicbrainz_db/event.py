@@ -1,6 +1,9 @@
+import functools
+
 from brainzutils import cache
 from brainzutils.musicbrainz_db import event as db
 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 
 
@@ -13,15 +16,18 @@ def get_event_by_mbid(mbid):
         Dictionary containing the event information.
     """
     key = cache.gen_key('event', mbid)
-    event = cache.get(key)
-    if not event:
-        event = db.get_event_by_mbid(
+    event = local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_event_by_mbid,
             mbid,
             includes=['artist-rels', 'place-rels', 'series-rels', 'url-rels', 'release-group-rels'],
-        )
-        if not event:
-            return None
-        cache.set(key, event, DEFAULT_CACHE_EXPIRATION)
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='event',
+    )
+    if not event:
+        return None
     return event
 
 
@@ -39,17 +45,19 @@ def get_events_for_place(place_id, event_types=None, limit=None, offset=None, in
         Tuple containing the list of dictionaries of events ordered by begin year
         and the total count of the events.
     """
-    key = cache.gen_key(place_id, limit, offset, include_null_type, *event_types)
-    events = cache.get(key)
-    if not events:
-        events = db.get_events_for_place(
+    key = cache.gen_key('place-events', place_id, limit, offset, include_null_type, *event_types)
+    return local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_events_for_place,
             place_id,
             event_types=event_types,
             limit=limit,
             offset=offset,
             include_null_type=include_null_type,
-        )
-        if not events:
-            return None
-        cache.set(key, events, DEFAULT_CACHE_EXPIRATION)
-    return events
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='place-events',
+        # Places without events are cached for as long as missing entities
+        is_missing=lambda events: not events or not events[1],
+    )
@@ -1,6 +1,9 @@
+import functools
+
 from brainzutils import cache
 from brainzutils.musicbrainz_db import label as db
 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 from critiquebrainz.frontend.external.relationships import label as label_rel
 
@@ -14,13 +17,16 @@ def get_label_by_mbid(mbid):
         Dictionary containing the label information
     """
     key = cache.gen_key('label', mbid)
-    label = cache.get(key)
-    if not label:
-        label = db.get_label_by_mbid(
+    label = local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_label_by_mbid,
             mbid,
             includes=['artist-rels', 'url-rels'],
-        )
-        if not label:
-            return None
-        cache.set(key, label, DEFAULT_CACHE_EXPIRATION)
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='label',
+    )
+    if not label:
+        return None
     return label_rel.process(label)
@@ -1,6 +1,9 @@
+import functools
+
 from brainzutils import cache
 from brainzutils.musicbrainz_db import place as db
 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 from critiquebrainz.frontend.external.relationships import place as place_rel
 
@@ -14,13 +17,16 @@ def get_place_by_mbid(mbid):
         Dictionary containing the place information.
     """
     key = cache.gen_key('place', mbid)
-    place = cache.get(key)
-    if not place:
-        place = db.get_place_by_mbid(
+    place = local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_place_by_mbid,
             mbid,
             includes=['artist-rels', 'place-rels', 'release-group-rels', 'url-rels'],
-        )
-        if not place:
-            return None
-        cache.set(key, place, DEFAULT_CACHE_EXPIRATION)
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='place',
+    )
+    if not place:
+        return None
     return place_rel.process(place)
@@ -1,6 +1,9 @@
+import functools
+
 from brainzutils import cache
 from brainzutils.musicbrainz_db import recording as db
 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 
 
@@ -13,13 +16,16 @@ def get_recording_by_mbid(mbid):
         Dictionary containing the recording information
     """
     key = cache.gen_key('recording', mbid)
-    recording = cache.get(key)
-    if not recording:
-        recording = db.get_recording_by_mbid(
+    recording = local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_recording_by_mbid,
             mbid,
             includes=['artists', 'work-rels', 'url-rels'],
-        )
-        if not recording:
-            return None
-        cache.set(key, recording, DEFAULT_CACHE_EXPIRATION)
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='recording',
+    )
+    if not recording:
+        return None
     return recording
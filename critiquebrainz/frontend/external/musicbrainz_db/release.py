@@ -1,6 +1,9 @@
+import functools
+
 from brainzutils import cache
 from brainzutils.musicbrainz_db import release as db
 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 
 
@@ -13,13 +16,16 @@ def get_release_by_mbid(mbid):
         Dictionary containing the release information
     """
     key = cache.gen_key('release', mbid)
-    release = cache.get(key)
-    if not release:
-        release = db.get_release_by_mbid(
+    release = local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_release_by_mbid,
             mbid,
             includes=['media', 'release-groups'],
-        )
-        if not release:
-            return None
-        cache.set(key, release, DEFAULT_CACHE_EXPIRATION)
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='release',
+    )
+    if not release:
+        return None
     return release
@@ -1,22 +1,28 @@
+import functools
+
 from brainzutils import cache
 from brainzutils.musicbrainz_db import release_group as db
 
 import critiquebrainz.frontend.external.relationships.release_group as release_group_rel
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 
 
 def get_release_group_by_mbid(mbid):
     """Get release group using the MusicBrainz ID."""
     key = cache.gen_key('release-group', mbid)
-    release_group = cache.get(key)
-    if not release_group:
-        release_group = db.get_release_group_by_mbid(
+    release_group = local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_release_group_by_mbid,
             mbid,
             includes=['artists', 'releases', 'release-group-rels', 'url-rels', 'tags'],
-        )
-        if not release_group:
-            return None
-        cache.set(key, release_group, DEFAULT_CACHE_EXPIRATION)
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='release-group',
+    )
+    if not release_group:
+        return None
     return release_group_rel.process(release_group)
 
 
@@ -1,6 +1,12 @@
 # pylint: disable=no-self-use
+import time
+import unittest
 from unittest import mock
 
+from brainzutils import cache
+
+from critiquebrainz.frontend.external import local_cache
+from critiquebrainz.frontend.external.entities import get_multiple_entities
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 from critiquebrainz.frontend.external.musicbrainz_db.artist import get_artist_by_mbid
 from critiquebrainz.frontend.external.musicbrainz_db.event import get_event_by_mbid
@@ -15,6 +21,14 @@ from critiquebrainz.data.testing import DataTestCase
 
 class CacheTestCase(DataTestCase):
 
+    def assertCached(self, cache_set, key, value):
+        cache_set.assert_called_once()
+        args, kwargs = cache_set.call_args
+        self.assertEqual(args[0], key)
+        self.assertEqual(args[1]['value'], value)
+        self.assertEqual(args[2], DEFAULT_CACHE_EXPIRATION + local_cache.STALE_TIMEOUT)
+        self.assertEqual(kwargs, {'namespace': local_cache.REDIS_NAMESPACE})
+
     @mock.patch('brainzutils.cache.get')
     @mock.patch('brainzutils.cache.set')
     @mock.patch('brainzutils.musicbrainz_db.artist.get_artist_by_mbid')
@@ -33,17 +47,18 @@ class CacheTestCase(DataTestCase):
         get_artist_by_mbid(mbid)
 
         # Test that first time data is fetched database is queried
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         artist_fetch.assert_called_with(mbid, includes=['artist-rels', 'url-rels'])
-        cache_set.assert_called_with(expected_key, artist, DEFAULT_CACHE_EXPIRATION)
+        self.assertCached(cache_set, expected_key, artist)
 
-        cache_get.return_value = artist
+        cache_get.return_value = {'value': artist, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
         cache_set.reset_mock()
+        local_cache.clear()
         artist_fetch.reset_mock()
         get_artist_by_mbid(mbid)
 
         # Test that second time data is fetched from cache
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         artist_fetch.assert_not_called()
         cache_set.assert_not_called()
 
@@ -63,18 +78,19 @@ class CacheTestCase(DataTestCase):
         get_event_by_mbid(mbid)
 
         # Test that first time data is fetched database is queried
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         event_fetch.assert_called_with(mbid, includes=['artist-rels', 'place-rels',
                                                        'series-rels', 'url-rels', 'release-group-rels'])
-        cache_set.assert_called_with(expected_key, event, DEFAULT_CACHE_EXPIRATION)
+        self.assertCached(cache_set, expected_key, event)
 
-        cache_get.return_value = event
+        cache_get.return_value = {'value': event, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
         cache_set.reset_mock()
+        local_cache.clear()
         event_fetch.reset_mock()
         get_event_by_mbid(mbid)
 
         # Test that second time data is fetched from cache
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         event_fetch.assert_not_called()
         cache_set.assert_not_called()
 
@@ -96,17 +112,18 @@ class CacheTestCase(DataTestCase):
         get_label_by_mbid(mbid)
 
         # Test that first time data is fetched database is queried
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         label_fetch.assert_called_with(mbid, includes=['artist-rels', 'url-rels'])
-        cache_set.assert_called_with(expected_key, label, DEFAULT_CACHE_EXPIRATION)
+        self.assertCached(cache_set, expected_key, label)
 
-        cache_get.return_value = label
+        cache_get.return_value = {'value': label, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
         cache_set.reset_mock()
+        local_cache.clear()
         label_fetch.reset_mock()
         get_label_by_mbid(mbid)
 
         # Test that second time data is fetched from cache
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         label_fetch.assert_not_called()
         cache_set.assert_not_called()
 
@@ -134,18 +151,19 @@ class CacheTestCase(DataTestCase):
         get_place_by_mbid(mbid)
 
         # Test that first time data is fetched database is queried
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         place_fetch.assert_called_with(mbid, includes=['artist-rels', 'place-rels',
                                                        'release-group-rels', 'url-rels'])
-        cache_set.assert_called_with(expected_key, place, DEFAULT_CACHE_EXPIRATION)
+        self.assertCached(cache_set, expected_key, place)
 
-        cache_get.return_value = place
+        cache_get.return_value = {'value': place, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
         cache_set.reset_mock()
+        local_cache.clear()
         place_fetch.reset_mock()
         get_place_by_mbid(mbid)
 
         # Test that second time data is fetched from cache
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         place_fetch.assert_not_called()
         cache_set.assert_not_called()
 
@@ -178,17 +196,18 @@ class CacheTestCase(DataTestCase):
         get_recording_by_mbid(mbid)
 
         # Test that first time data is fetched database is queried
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         recording_fetch.assert_called_with(mbid, includes=['artists', 'work-rels', 'url-rels'])
-        cache_set.assert_called_with(expected_key, recording, DEFAULT_CACHE_EXPIRATION)
+        self.assertCached(cache_set, expected_key, recording)
 
-        cache_get.return_value = recording
+        cache_get.return_value = {'value': recording, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
         cache_set.reset_mock()
+        local_cache.clear()
         recording_fetch.reset_mock()
         get_recording_by_mbid(mbid)
 
         # Test that second time data is fetched from cache
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         recording_fetch.assert_not_called()
         cache_set.assert_not_called()
 
@@ -219,17 +238,18 @@ class CacheTestCase(DataTestCase):
         get_release_by_mbid(mbid)
 
         # Test that first time data is fetched database is queried
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         release_fetch.assert_called_with(mbid, includes=['media', 'release-groups'])
-        cache_set.assert_called_with(expected_key, release, DEFAULT_CACHE_EXPIRATION)
+        self.assertCached(cache_set, expected_key, release)
 
-        cache_get.return_value = release
+        cache_get.return_value = {'value': release, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
         cache_set.reset_mock()
+        local_cache.clear()
         release_fetch.reset_mock()
         get_release_by_mbid(mbid)
 
         # Test that second time data is fetched from cache
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         release_fetch.assert_not_called()
         cache_set.assert_not_called()
 
@@ -259,18 +279,19 @@ class CacheTestCase(DataTestCase):
         get_release_group_by_mbid(mbid)
 
         # Test that first time data is fetched database is queried
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         release_group_fetch.assert_called_with(mbid,
                                                includes=['artists', 'releases', 'release-group-rels', 'url-rels', 'tags'])
-        cache_set.assert_called_with(expected_key, release_group, DEFAULT_CACHE_EXPIRATION)
+        self.assertCached(cache_set, expected_key, release_group)
 
-        cache_get.return_value = release_group
+        cache_get.return_value = {'value': release_group, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
         cache_set.reset_mock()
+        local_cache.clear()
         release_group_fetch.reset_mock()
         get_release_group_by_mbid(mbid)
 
         # Test that second time data is fetched from cache
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         release_group_fetch.assert_not_called()
         cache_set.assert_not_called()
 
@@ -291,16 +312,196 @@ class CacheTestCase(DataTestCase):
         get_work_by_mbid(mbid)
 
         # Test that first time data is fetched database is queried
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         work_fetch.assert_called_with(mbid, includes=['artist-rels', 'recording-rels'])
-        cache_set.assert_called_with(expected_key, work, DEFAULT_CACHE_EXPIRATION)
+        self.assertCached(cache_set, expected_key, work)
 
-        cache_get.return_value = work
+        cache_get.return_value = {'value': work, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
         cache_set.reset_mock()
+        local_cache.clear()
         work_fetch.reset_mock()
         get_work_by_mbid(mbid)
 
         # Test that second time data is fetched from cache
-        cache_get.assert_called_with(expected_key)
+        cache_get.assert_called_with(expected_key, namespace=local_cache.REDIS_NAMESPACE)
         work_fetch.assert_not_called()
         cache_set.assert_not_called()
+
+    @mock.patch('brainzutils.cache.get')
+    @mock.patch('brainzutils.cache.set')
+    @mock.patch('brainzutils.musicbrainz_db.work.get_work_by_mbid')
+    def test_local_cache(self, work_fetch, cache_set, cache_get):
+        mbid = "54ce5e07-2aca-4578-83d8-5a41a7b2f434"
+        work = {
+            "mbid": "54ce5e07-2aca-4578-83d8-5a41a7b2f434",
+            "name": "a lot",
+            "type": "Song",
+        }
+        cache_get.return_value = {'value': work, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
+        self.assertEqual(get_work_by_mbid(mbid), work)
+        cache_get.assert_called_once()
+
+        # Second time data is fetched from the cache of the process
+        cache_get.reset_mock()
+        self.assertEqual(get_work_by_mbid(mbid), work)
+        cache_get.assert_not_called()
+        work_fetch.assert_not_called()
+        self.assertEqual(local_cache.get_stats()["namespaces"]["work"], {"hits": 1, "misses": 1})
+
+    @mock.patch('critiquebrainz.frontend.external.local_cache.threading.Thread')
+    @mock.patch('brainzutils.cache.get')
+    @mock.patch('brainzutils.musicbrainz_db.work.get_work_by_mbid')
+    def test_stale_value(self, work_fetch, cache_get, thread):
+        mbid = "54ce5e07-2aca-4578-83d8-5a41a7b2f434"
+        work = {"mbid": mbid, "name": "a lot"}
+        cache_get.return_value = {'value': work, 'fresh_until': time.time() - 1}
+
+        # Expired value is returned and refreshed in the background once
+        self.assertEqual(get_work_by_mbid(mbid), work)
+        work_fetch.assert_not_called()
+        thread.assert_called_once()
+        local_cache.clear()
+        self.assertEqual(get_work_by_mbid(mbid), work)
+        thread.assert_called_once()
+
+    @mock.patch('time.sleep')
+    @mock.patch('brainzutils.cache.get')
+    @mock.patch('brainzutils.musicbrainz_db.work.get_work_by_mbid')
+    def test_single_flight(self, work_fetch, cache_get, sleep):
+        mbid = "54ce5e07-2aca-4578-83d8-5a41a7b2f434"
+        work = {"mbid": mbid, "name": "a lot"}
+        key = "work_" + mbid
+        entry = {'value': work, 'fresh_until': time.time() + DEFAULT_CACHE_EXPIRATION}
+
+        # Another process is fetching the work, it's cached while waiting
+        token = local_cache._acquire_lock(key)
+        self.assertIsNotNone(token)
+        cache_get.side_effect = [None, None, token.encode(), entry]
+        self.assertEqual(get_work_by_mbid(mbid), work)
+        work_fetch.assert_not_called()
+        self.assertEqual(sleep.call_count, 2)
+        local_cache._release_lock(key, token)
+
+    @mock.patch('brainzutils.musicbrainz_db.work.get_work_by_mbid')
+    def test_missing_entity(self, work_fetch):
+        mbid = "54ce5e07-2aca-4578-83d8-5a41a7b2f434"
+        work_fetch.return_value = None
+        self.assertIsNone(get_work_by_mbid(mbid))
+        self.assertIsNone(get_work_by_mbid(mbid))
+        work_fetch.assert_called_once()
+        self.assertEqual(local_cache.get_missing(["work_" + mbid]), {"work_" + mbid})
+
+        # Missing entities are fetched again after they are forgotten
+        local_cache.clear_missing()
+        self.assertEqual(local_cache.get_missing(["work_" + mbid]), set())
+        work_fetch.return_value = {"mbid": mbid, "name": "a lot"}
+        self.assertEqual(get_work_by_mbid(mbid), {"mbid": mbid, "name": "a lot"})
+        self.assertEqual(work_fetch.call_count, 2)
+
+    @mock.patch('critiquebrainz.frontend.external.entities.fetch_multiple_works')
+    def test_multiple_entities_missing(self, fetch_works):
+        mbid = "54ce5e07-2aca-4578-83d8-5a41a7b2f434"
+        missing_mbid = "a8c1a3f6-7e1b-4e6c-8c1f-0e8ce5c1b9a0"
+        fetch_works.return_value = {mbid: {"mbid": mbid, "name": "a lot"}}
+        entities = get_multiple_entities([(mbid, 'work'), (missing_mbid, 'work')])
+        self.assertEqual(list(entities), [mbid])
+        fetch_works.assert_called_with([mbid, missing_mbid])
+
+        # Entities which weren't found aren't fetched again
+        get_multiple_entities([(mbid, 'work'), (missing_mbid, 'work')])
+        fetch_works.assert_called_with([mbid])
+        self.assertIsNone(get_work_by_mbid(missing_mbid))
+
+
+    @mock.patch('threading.Thread')
+    def test_many_stale_values(self, thread):
+        entry = {'value': {"id": "a"}, 'fresh_until': time.time() - 1}
+        cache.set("test_a", entry, 60, namespace=local_cache.REDIS_NAMESPACE)
+        fetch = mock.Mock(return_value={"b": {"id": "b"}})
+
+        # Expired values are returned and refreshed in the background, only missing ones are fetched
+        values = local_cache.get_many_or_fetch(["a", "b"], lambda id_: "test_" + id_, fetch, 60, namespace="test")
+        self.assertEqual(values, {"a": {"id": "a"}, "b": {"id": "b"}})
+        fetch.assert_called_once_with(["b"])
+        thread.assert_called_once()
+        tokens = thread.call_args[1]["args"][1]
+        self.assertEqual(list(tokens), ["a"])
+
+        # The value is refreshed by one process at a time
+        local_cache.clear()
+        local_cache.get_many_or_fetch(["a"], lambda id_: "test_" + id_, fetch, 60, namespace="test")
+        thread.assert_called_once()
+        local_cache._release_lock("test_a", tokens["a"])
+
+    @mock.patch('time.sleep')
+    def test_many_single_flight(self, sleep):
+        entry = {'value': {"id": "a"}, 'fresh_until': time.time() + 60}
+        fetch = mock.Mock(return_value={"b": {"id": "b"}})
+
+        # Another process is fetching "a", it's cached while waiting
+        token = local_cache._acquire_lock("test_a")
+        self.assertIsNotNone(token)
+        self.assertIsNone(local_cache._acquire_lock("test_a"))
+        sleep.side_effect = lambda seconds: cache.set("test_a", entry, 60, namespace=local_cache.REDIS_NAMESPACE)
+        values = local_cache.get_many_or_fetch(["a", "b"], lambda id_: "test_" + id_, fetch, 60, namespace="test")
+        self.assertEqual(values, {"a": {"id": "a"}, "b": {"id": "b"}})
+        fetch.assert_called_once_with(["b"])
+        self.assertEqual(sleep.call_count, 1)
+        local_cache._release_lock("test_a", token)
+
+    def test_release_lock(self):
+        token = local_cache._acquire_lock("test_a")
+
+        # A lock which expired and was acquired by another process isn't released
+        local_cache._release_lock("test_a", "expired")
+        self.assertIsNone(local_cache._acquire_lock("test_a"))
+
+        local_cache._release_lock("test_a", token)
+        token = local_cache._acquire_lock("test_a")
+        self.assertIsNotNone(token)
+        local_cache._release_lock("test_a", token)
+
+
+class LocalCacheTestCase(unittest.TestCase):
+
+    def test_limits(self):
+        cache = local_cache.LocalCache(max_entries=2, max_bytes=10000, ttl=60)
+        cache.set("test", "a", {"value": 1})
+        cache.set("test", "b", {"value": 2})
+        self.assertEqual(cache.get("test", "a"), {"value": 1})
+        cache.set("test", "c", {"value": 3})
+
+        # Least recently used entry is removed
+        self.assertIsNone(cache.get("test", "b"))
+        self.assertEqual(cache.get("test", "c"), {"value": 3})
+        self.assertEqual(cache.get_stats()["entries"], 2)
+
+        # Entries which don't fit are not stored
+        cache.set("test", "d", {"value": "x" * 20000})
+        self.assertIsNone(cache.get("test", "d"))
+        self.assertEqual(cache.get_stats()["namespaces"]["test"], {"hits": 2, "misses": 2})
+
+    def test_expiry(self):
+        cache = local_cache.LocalCache(max_entries=2, max_bytes=10000, ttl=60)
+        with mock.patch("time.monotonic", return_value=100):
+            cache.set("test", "a", {"value": 1}, expirein=10)
+        with mock.patch("time.monotonic", return_value=109):
+            self.assertEqual(cache.get("test", "a"), {"value": 1})
+        with mock.patch("time.monotonic", return_value=110):
+            self.assertIsNone(cache.get("test", "a"))
+        self.assertEqual(cache.get_stats()["bytes"], 0)
+
+    @mock.patch('brainzutils.cache.set')
+    def test_entities_copied(self, cache_set):
+        entities = {"a": {"name": "A"}}
+        local_cache.set("test_key", entities, 60, namespace="test")
+        try:
+            # Entities added by the caller or returned from the cache can be modified
+            entities["a"]["reviews"] = []
+            cached = local_cache.get("test_key", namespace="test")
+            self.assertEqual(cached, {"a": {"name": "A"}})
+            cached["a"]["reviews"] = []
+            self.assertEqual(local_cache.get("test_key", namespace="test"), {"a": {"name": "A"}})
+            cache_set.assert_called_once()
+        finally:
+            local_cache.clear()
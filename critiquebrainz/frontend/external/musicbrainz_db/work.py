@@ -1,6 +1,9 @@
+import functools
+
 from brainzutils import cache
 from brainzutils.musicbrainz_db import work as db
 
+from critiquebrainz.frontend.external import local_cache
 from critiquebrainz.frontend.external.musicbrainz_db import DEFAULT_CACHE_EXPIRATION
 
 
@@ -13,13 +16,16 @@ def get_work_by_mbid(mbid):
         Dictionary containing the work information
     """
     key = cache.gen_key('work', mbid)
-    work = cache.get(key)
-    if not work:
-        work = db.get_work_by_mbid(
+    work = local_cache.get_or_fetch(
+        key,
+        functools.partial(
+            db.get_work_by_mbid,
             mbid,
             includes=['artist-rels', 'recording-rels'],
-        )
-        if not work:
-            return None
-        cache.set(key, work, DEFAULT_CACHE_EXPIRATION)
+        ),
+        DEFAULT_CACHE_EXPIRATION,
+        namespace='work',
+    )
+    if not work:
+        return None
     return work
@@ -82,6 +82,7 @@ def entity(id):
             entity_id=author['bbid'],
             entity_type='bb_author',
             user_id=current_user.id,
+            with_count=False,
         )
         my_review = my_reviews[0] if my_reviews else None
     else:
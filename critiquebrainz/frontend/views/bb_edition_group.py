@@ -40,6 +40,7 @@ def entity(id):
             entity_id=edition_group['bbid'],
             entity_type='bb_edition_group',
             user_id=current_user.id,
+            with_count=False,
         )
         my_review = my_reviews[0] if my_reviews else None
     else:
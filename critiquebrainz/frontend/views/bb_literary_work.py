@@ -62,6 +62,7 @@ def entity(id):
             entity_id=literary_work['bbid'],
             entity_type='bb_literary_work',
             user_id=current_user.id,
+            with_count=False,
         )
         my_review = my_reviews[0] if my_reviews else None
     else:
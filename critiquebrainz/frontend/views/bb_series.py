@@ -38,6 +38,7 @@ def entity(id):
             entity_id=series['bbid'],
             entity_type='bb_series',
             user_id=current_user.id,
+            with_count=False,
         )
         my_review = my_reviews[0] if my_reviews else None
     else:
@@ -56,7 +56,8 @@ def entity(id):
         my_reviews, _ = db_review.list_reviews(
             entity_id=event['mbid'],
             entity_type='event',
-            user_id=current_user.id
+            user_id=current_user.id,
+            with_count=False,
         )
         my_review = my_reviews[0] if my_reviews else None
     else:
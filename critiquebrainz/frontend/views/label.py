@@ -28,6 +28,7 @@ def entity(id):
             entity_id=label['mbid'],
             entity_type='label',
             user_id=current_user.id,
+            with_count=False,
         )
         my_review = my_reviews[0] if my_reviews else None
     else:
@@ -37,12 +37,13 @@ def rate():
             flash.error(gettext("You are not allowed to rate any entity because your "
                                 "account has been blocked by a moderator."))
             return redirect(url_for('{}.entity'.format(form.entity_type.data), id=form.entity_id.data))
-        reviews, review_count = db_review.list_reviews(
+        reviews, _ = db_review.list_reviews(
             entity_id=form.entity_id.data,
             entity_type=form.entity_type.data,
             user_id=current_user.id,
+            with_count=False,
         )
-        review = reviews[0] if review_count else None
+        review = reviews[0] if reviews else None
 
         if not review and form.rating.data is None:
             raise BadRequest("Cannot create a review with no rating and no text!")
@@ -65,6 +65,7 @@ def entity(id):
             entity_id=release_group['mbid'],
             entity_type='release_group',
             user_id=current_user.id,
+            with_count=False,
         )
         my_review = my_reviews[0] if my_reviews else None
     else:
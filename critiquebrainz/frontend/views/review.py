@@ -75,7 +75,8 @@ def browse():
         return redirect(url_for('.browse'))
     limit = 3 * 9  # 9 rows
     offset = (page - 1) * limit
-    reviews, count = db_review.list_reviews(sort=sort, sort_order=sort_order, limit=limit, offset=offset, entity_type=entity_type)
+    reviews, count = db_review.list_reviews(sort=sort, sort_order=sort_order, limit=limit, offset=offset,
+                                            entity_type=entity_type, estimate_count=True)
     if not reviews:
         if page - 1 > count / limit:
             return redirect(url_for('review.browse', page=int(ceil(count / limit))))
@@ -162,6 +163,7 @@ def entity(id, rev=None):
         user_id=review["user_id"],
         sort="random",
         exclude=[review["id"]],
+        with_count=False,
     )
     other_reviews = user_all_reviews[:3]
     avg_rating = get_avg_rating(review["entity_id"], review["entity_type"])
@@ -302,8 +304,9 @@ def create(entity_type=None, entity_id=None):
         return redirect(url_for('user.reviews', user_ref=current_user.user_ref))
 
     # Checking if the user already wrote a review for this entity
-    reviews, count = db_review.list_reviews(user_id=current_user.id, entity_id=entity_id, inc_drafts=True, inc_hidden=True)
-    review = reviews[0] if count != 0 else None
+    reviews, _ = db_review.list_reviews(user_id=current_user.id, entity_id=entity_id, inc_drafts=True, inc_hidden=True,
+                                        with_count=False)
+    review = reviews[0] if reviews else None
 
     if review:
         if review['is_draft']:
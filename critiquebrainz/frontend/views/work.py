@@ -46,6 +46,7 @@ def entity(id):
             entity_id=work['mbid'],
             entity_type='work',
             user_id=current_user.id,
+            with_count=False,
         )
         my_review = my_reviews[0] if my_reviews else None
     else:
@@ -1,9 +1,11 @@
 import unittest
 from urllib import parse
 
+from brainzutils import cache
 from flask import template_rendered, message_flashed, g
 
 from critiquebrainz.data.utils import create_all, drop_tables, drop_types, clear_tables
+from critiquebrainz.frontend.external import local_cache
 
 
 class ServerTestCase(unittest.TestCase):
@@ -21,6 +23,8 @@ class ServerTestCase(unittest.TestCase):
 
     def reset_db(self):
         clear_tables()
+        cache.flush_all()
+        local_cache.clear()
 
     def temporary_login(self, user):
         # flask-login stores the logged in user in the global g which lasts for the entire duration of a test
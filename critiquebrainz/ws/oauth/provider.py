@@ -4,6 +4,7 @@ from functools import wraps
 import requests
 from flask import request, current_app
 
+import critiquebrainz.db as critiquebrainz_db
 import critiquebrainz.db.exceptions as db_exceptions
 import critiquebrainz.db.oauth_client as db_oauth_client
 import critiquebrainz.db.oauth_grant as db_oauth_grant
@@ -239,6 +240,7 @@ class CritiqueBrainzAuthorizationProvider:
             @wraps(f)
             def decorated(*args, **kwargs):
                 user = self.get_authorized_user(scopes)
+                critiquebrainz_db.set_request_user(user.id)
                 kwargs.update(dict(user=user))
                 return f(*args, **kwargs)
 
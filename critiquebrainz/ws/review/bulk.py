@@ -1,14 +1,24 @@
 import uuid
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
+from critiquebrainz.db import (
+    exceptions as db_exceptions,
+    REVIEW_RATING_MIN,
+    REVIEW_RATING_MAX,
+    REVIEW_TEXT_MIN_LENGTH,
+    REVIEW_TEXT_MAX_LENGTH
+)
 from critiquebrainz.decorators import crossdomain
-from critiquebrainz.ws.exceptions import InvalidRequest
+from critiquebrainz.ws.exceptions import AccessDenied, InvalidRequest
+from critiquebrainz.ws.oauth import oauth
+import critiquebrainz.db.license as db_license
 import critiquebrainz.db.review as db_review
 
 bulk_review_bp = Blueprint('ws_review_bulk', __name__)
 
 MAX_ITEMS_PER_BULK_REQUEST = 25
+MAX_REVIEWS_PER_BULK_CREATE = 5000
 
 
 def remove_duplicates(arr):
@@ -138,7 +148,7 @@ def bulk_review_entity_handler():
     # review_id_mapping should only include the reviews that we are returning
     # (don't return an ID that doesn't match a review, or which is for a hidden review)
     review_ret = {
-        str(review["id"]): db_review.to_dict(review) for review in reviews if not review["is_hidden"]
+        review["id"]: review for review in db_review.to_dicts([r for r in reviews if not r["is_hidden"]])
     }
     review_id_mapping = {k: v for k, v in review_id_mapping.items() if v in review_ret}
 
@@ -147,3 +157,105 @@ def bulk_review_entity_handler():
         "review_id_mapping": review_id_mapping
     }
     return jsonify(**response)
+
+
+def _parse_bulk_review(item, position, license_ids):
+    """Validate a review submitted for bulk creation.
+
+    Args:
+        item: Review from the request.
+        position (int): Position of the review in the request.
+        license_ids (set): IDs of the licenses reviews can be published under.
+
+    Raises:
+        critiquebrainz.ws.exceptions.InvalidRequest: if the review isn't valid.
+    """
+    def invalid(desc):
+        return InvalidRequest(desc=f"Review {position}: {desc}")
+
+    if not isinstance(item, dict):
+        raise invalid("must be an object")
+    try:
+        entity_id = str(uuid.UUID(str(item.get("entity_id"))))
+    except ValueError:
+        raise invalid("`entity_id` is not a valid UUID")
+    entity_type = item.get("entity_type")
+    if entity_type not in db_review.ENTITY_TYPES:
+        raise invalid("`entity_type` is not valid")
+    text = item.get("text")
+    if text is not None and (not isinstance(text, str) or
+                             not REVIEW_TEXT_MIN_LENGTH <= len(text) <= REVIEW_TEXT_MAX_LENGTH):
+        raise invalid(f"`text` must be between {REVIEW_TEXT_MIN_LENGTH} and {REVIEW_TEXT_MAX_LENGTH} characters")
+    rating = item.get("rating")
+    if rating is not None and (not isinstance(rating, int) or isinstance(rating, bool) or
+                               not REVIEW_RATING_MIN <= rating <= REVIEW_RATING_MAX):
+        raise invalid(f"`rating` must be between {REVIEW_RATING_MIN} and {REVIEW_RATING_MAX}")
+    if text is None and rating is None:
+        raise invalid("must have either text or rating")
+    language = item.get("language") or db_review.DEFAULT_LANG
+    if language not in db_review.supported_languages:
+        raise invalid("unsupported language")
+    license_id = item.get("license_choice") or db_review.DEFAULT_LICENSE_ID
+    if license_id not in license_ids:
+        raise invalid("`license_choice` is not a known license")
+    for field in ("source", "source_url"):
+        if item.get(field) is not None and not isinstance(item[field], str):
+            raise invalid(f"`{field}` must be a string")
+    return {
+        "entity_id": entity_id,
+        "entity_type": entity_type,
+        "text": text,
+        "rating": rating,
+        "language": language,
+        "license_id": license_id,
+        "source": item.get("source"),
+        "source_url": item.get("source_url"),
+    }
+
+
+@bulk_review_bp.route('/bulk', methods=['POST'])
+@oauth.require_auth('review')
+@crossdomain(headers="Authorization, Content-Type")
+def bulk_review_create_handler(user):
+    """Publish multiple reviews at once.
+
+    This endpoint is meant for importing reviews from partners. It is only
+    available to administrators and to users listed in the ``REVIEW_IMPORTERS``
+    configuration option. All reviews are published by the authenticated user.
+    Reviews of entities which the user has already reviewed are skipped.
+
+    **OAuth scope:** review
+
+    :reqheader Content-Type: *application/json*
+
+    :json array reviews: list of reviews, each of which is an object with the following keys:
+        ``entity_id``, ``entity_type``, ``text`` **(optional)**, ``rating`` **(optional)**,
+        ``license_choice`` **(optional)**, ``language`` **(optional)**, ``source`` **(optional)**
+        and ``source_url`` **(optional)**. You must provide some text or rating for each review.
+
+    :statuscode 200: no error
+    :statuscode 400: a review is not valid or too many reviews were submitted
+    :statuscode 403: the user is not allowed to import reviews
+
+    :resheader Content-Type: *application/json*
+    """
+    if not user.is_admin() and user.musicbrainz_username not in current_app.config['REVIEW_IMPORTERS']:
+        raise AccessDenied
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("reviews"), list):
+        raise InvalidRequest(desc="`reviews` must be a list")
+    if len(data["reviews"]) > MAX_REVIEWS_PER_BULK_CREATE:
+        raise InvalidRequest(desc=f"More than {MAX_REVIEWS_PER_BULK_CREATE} reviews not allowed per request")
+
+    license_ids = {row["id"] for row in db_license.list_licenses()}
+    reviews = []
+    for position, item in enumerate(data["reviews"]):
+        review = _parse_bulk_review(item, position, license_ids)
+        review["user_id"] = user.id
+        reviews.append(review)
+    try:
+        review_ids = db_review.create_many(reviews)
+    except db_exceptions.BadDataException as e:
+        raise InvalidRequest(desc=str(e))
+    return jsonify(message='Request processed successfully', ids=[str(review_id) for review_id in review_ids],
+                   skipped=len(reviews) - len(review_ids))
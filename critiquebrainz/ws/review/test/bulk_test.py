@@ -1,3 +1,4 @@
+import json
 from unittest import mock
 import uuid
 
@@ -105,3 +106,69 @@ class BulkReviewTestCase(WebServiceTestCase):
         response = self.client.get('/reviews/', query_string={'review_ids': ','.join(uuids)})
         self.assertEqual(list(response.json['reviews'].keys()), [r1_id])
         self.assertEqual(list(response.json['review_id_mapping'].keys()), [r1_id])
+
+    def test_bulk_review_create(self):
+        user = User(db_users.get_or_create(1, "Tester", new_user_data={
+            "display_name": "test user",
+        }))
+        db_license.create(
+            id="CC BY-SA 3.0",
+            full_name="Created so we can fill the form correctly.",
+        )
+        header = {
+            'Content-Type': 'application/json',
+            'Authorization': "Bearer " + self.create_dummy_token(user),
+        }
+        data = {"reviews": [
+            {
+                "entity_id": "e7aad618-fa86-3983-9e77-405e21796eca",
+                "entity_type": "release_group",
+                "text": "Testing! This text should be on the page.",
+                "rating": 5,
+            },
+            {
+                "entity_id": "3cfb11bb-135f-4841-a800-c056eb7465e0",
+                "entity_type": "release_group",
+                "rating": 3,
+            },
+        ]}
+
+        # Only importers are allowed to create reviews in bulk
+        response = self.client.post('/reviews/bulk', headers=header, data=json.dumps(data))
+        self.assert403(response)
+
+        self.app.config['REVIEW_IMPORTERS'] = ["Tester"]
+        response = self.client.post('/reviews/bulk', headers=header, data=json.dumps(data))
+        self.assert200(response)
+        self.assertEqual(len(response.json['ids']), 2)
+        self.assertEqual(response.json['skipped'], 0)
+        review = db_review.get_by_id(response.json['ids'][0])
+        self.assertEqual(review['user_id'], user.id)
+
+        # Reviews of already reviewed entities are skipped
+        response = self.client.post('/reviews/bulk', headers=header, data=json.dumps(data))
+        self.assert200(response)
+        self.assertEqual(response.json['ids'], [])
+        self.assertEqual(response.json['skipped'], 2)
+
+        data["reviews"].append({"entity_id": "3cfb11bb-135f-4841-a800-c056eb7465e0", "entity_type": "release_group"})
+        response = self.client.post('/reviews/bulk', headers=header, data=json.dumps(data))
+        self.assert400(response)
+        self.assertEqual(response.json['description'], "Review 2: must have either text or rating")
+
+        data["reviews"][2]["rating"] = True
+        response = self.client.post('/reviews/bulk', headers=header, data=json.dumps(data))
+        self.assert400(response)
+        self.assertEqual(response.json['description'], "Review 2: `rating` must be between 1 and 5")
+
+        data["reviews"][2]["rating"] = 3
+        data["reviews"][2]["source"] = {"name": "Partner"}
+        response = self.client.post('/reviews/bulk', headers=header, data=json.dumps(data))
+        self.assert400(response)
+        self.assertEqual(response.json['description'], "Review 2: `source` must be a string")
+
+        data["reviews"][2]["source"] = "Partner"
+        data["reviews"][2]["license_choice"] = "Unknown"
+        response = self.client.post('/reviews/bulk', headers=header, data=json.dumps(data))
+        self.assert400(response)
+        self.assertEqual(response.json['description'], "Review 2: `license_choice` is not a known license")
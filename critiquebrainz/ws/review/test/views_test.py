@@ -187,6 +187,38 @@ class ReviewViewsTestCase(WebServiceTestCase):
         self.assertEqual(resp['reviews'][0]['id'], str(review['id']))
         # TODO(roman): Completely verify output (I encountered unicode issues when tried to do that).
 
+    def test_review_list_cursor(self):
+        review_ids = set()
+        for _ in range(3):
+            review = db_review.create(
+                entity_id=uuid.uuid4(),
+                entity_type='release_group',
+                user_id=self.user.id,
+                text="Testing! This text should be on the page.",
+                is_draft=False,
+                license_id=self.license["id"],
+            )
+            review_ids.add(str(review["id"]))
+
+        for sort in ['published_on', 'popularity']:
+            resp = self.client.get('/review/', query_string={'sort': sort, 'limit': 2})
+            self.assert200(resp)
+            self.assertEqual(len(resp.json['reviews']), 2)
+            self.assertIsNotNone(resp.json['next_cursor'])
+            first_page = {review['id'] for review in resp.json['reviews']}
+
+            resp = self.client.get('/review/', query_string={'sort': sort, 'limit': 2,
+                                                             'cursor': resp.json['next_cursor']})
+            self.assert200(resp)
+            self.assertEqual(resp.json['count'], 3)
+            self.assertEqual(len(resp.json['reviews']), 1)
+            self.assertIsNone(resp.json['next_cursor'])
+            second_page = {review['id'] for review in resp.json['reviews']}
+            self.assertEqual(first_page | second_page, review_ids)
+
+        resp = self.client.get('/review/', query_string={'sort': 'published_on', 'cursor': 'invalid'})
+        self.assert400(resp)
+
     def test_review_post(self):
         review = dict(
             entity_id=self.review['entity_id'],
@@ -306,35 +338,50 @@ class ReviewViewsTestCase(WebServiceTestCase):
         resp = self.client.get('/review/%s/revisions/2' % review["id"])
         self.assert200(resp)
 
-    def test_cache_tracking(self):
+    def test_cache_generations(self):
         entity_id = self.review["entity_id"]
-        track_key = cache.gen_key("ws_cache", entity_id)
-
-        # Test no cache if entity id is not provided
-        self.client.get('/review/', query_string={'sort': 'rating'})
-        cache_keys = cache.smembers(track_key, namespace="Review")
-        self.assertEqual(set(), cache_keys)
-
-        expected_cache_keys = {'list_entity_id=90878b63-f639-3c8b-aefb-190bdf3d1790_user_id=None_sort=popularity_sort_order=desc_entity_type=None_limit=50_offset=0_language=None_review_type=None_include_metadata=None',
-                               'list_entity_id=90878b63-f639-3c8b-aefb-190bdf3d1790_user_id=None_sort=published_on_sort_order=desc_entity_type=None_limit=5_offset=0_language=None_review_type=None_include_metadata=None'}
-
-        # Test cache keys are recorded
-        self.client.get('/review/', query_string={'sort': 'rating', 'entity_id': entity_id})
-        self.client.get('/review/', query_string={'limit': 5, 'entity_id': entity_id})
-        cache_keys = cache.smembers(track_key, namespace="Review")
-        self.assertEqual(expected_cache_keys, cache_keys)
-
-        # Test no cache changes if entity_id is not available
-        self.client.get('/review/', query_string={'limit': 5})
-        cache_keys = cache.smembers(track_key, namespace="Review")
-        self.assertEqual(expected_cache_keys, cache_keys)
-        no_entity_id_key = cache.gen_key("ws_cache", None)
-        self.assertEqual(set(), cache.smembers(no_entity_id_key, namespace="Review"))
-
-        # Test cache invalidation upon review creation
+        other_entity_id = "f59c5520-5f46-4d2c-b2c4-822eabf53419"
+        db_review.create(**dict(self.review, entity_id=other_entity_id, user_id=self.another_user.id))
+
+        # Lists are served from the cache until a review of the entity is modified
+        resp = self.client.get('/review/', query_string={'entity_id': entity_id})
+        self.assertEqual(resp.json["count"], 0)
+        generation = db_review.get_ws_cache_generation(entity_id)
         db_review.create(**self.review)
-        cache_keys = cache.smembers(track_key, namespace="Review")
-        self.assertEqual(set(), cache_keys)
+        self.assertEqual(db_review.get_ws_cache_generation(entity_id), generation + 1)
+        resp = self.client.get('/review/', query_string={'entity_id': entity_id})
+        self.assertEqual(resp.json["count"], 1)
+
+        # Modifying reviews of other entities doesn't change the generation of the entity
+        other_generation = db_review.get_ws_cache_generation(other_entity_id)
+        global_generation = db_review.get_ws_cache_generation()
+        db_review.invalidate_ws_entity_cache(other_entity_id)
+        self.assertEqual(db_review.get_ws_cache_generation(entity_id), generation + 1)
+        self.assertEqual(db_review.get_ws_cache_generation(other_entity_id), other_generation + 1)
+        self.assertEqual(db_review.get_ws_cache_generation(), global_generation + 1)
+
+    def test_feed_staleness(self):
+        self.app.config["WS_REVIEW_FEED_STALENESS"] = 60
+        try:
+            resp = self.client.get('/review/')
+            self.assertEqual(resp.json["count"], 0)
+            db_review.create(**self.review)
+
+            # Unfiltered lists can be stale
+            resp = self.client.get('/review/')
+            self.assertEqual(resp.json["count"], 0)
+
+            # Lists of a user or an entity are up to date
+            resp = self.client.get('/review/', query_string={'user_id': self.user.id})
+            self.assertEqual(resp.json["count"], 1)
+            resp = self.client.get('/review/', query_string={'entity_id': self.review["entity_id"]})
+            self.assertEqual(resp.json["count"], 1)
+
+            cache.delete(cache.gen_key('ws_cache_feed_generation'), namespace="Review")
+            resp = self.client.get('/review/')
+            self.assertEqual(resp.json["count"], 1)
+        finally:
+            self.app.config["WS_REVIEW_FEED_STALENESS"] = 0
 
     def test_entity_metadata(self):
         entity_id = "f59c5520-5f46-4d2c-b2c4-822eabf53419"
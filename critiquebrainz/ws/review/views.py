@@ -1,7 +1,7 @@
 import logging
 
 from brainzutils import cache
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify
 from critiquebrainz.frontend.external import mbstore
 from critiquebrainz.frontend.views import get_avg_rating
 import critiquebrainz.db.review as db_review
@@ -346,12 +346,17 @@ def review_list_handler():
     :query sort_order: ``asc`` or ``desc`` **(optional)**. Defaults to ``desc``
     :query limit: results limit, min is 0, max is 50, default is 50 **(optional)**
     :query offset: result offset, default is 0 **(optional)**
+    :query cursor: ``next_cursor`` value from the previous page of results. Walking through pages with cursors
+        is faster than using offset and doesn't return duplicates when reviews are added in the meantime.
+        If specified, ``offset`` is ignored **(optional)**
     :query language: language code (ISO 639-1) **(optional)**
     :query review_type: ``review`` or ``rating``. If set, only return reviews which have a text review, or a rating **(optional)**
     :query include_metadata: ``true`` or ``false``. Include metadata of the entity **(optional)**
 
     **NOTE:** If entity_id is provided, then additional top-level item "average_rating" which includes the average of all ratings for this entity and the total count of these ratings is also included.
 
+    **NOTE:** Top-level item "next_cursor" can be passed as the ``cursor`` parameter to get the next page of results. It is ``null`` on the last page.
+
     :resheader Content-Type: *application/json*
     """
     # TODO: This checking is added to keep old clients working and needs to be removed.
@@ -388,6 +393,7 @@ def review_list_handler():
 
     limit = Parser.int('uri', 'limit', min=1, max=50, optional=True) or 50
     offset = Parser.int('uri', 'offset', optional=True) or 0
+    cursor = Parser.string('uri', 'cursor', optional=True)
     language = Parser.string('uri', 'language', min=2, max=3, optional=True)
     if language and language not in supported_languages:
         raise InvalidRequest(desc='Unsupported language')
@@ -395,29 +401,42 @@ def review_list_handler():
     # TODO(roman): Ideally caching logic should live inside the model. Otherwise it
     # becomes hard to track all this stuff.
 
+    # Cache keys include the generation of the entity's reviews, which changes when they are modified.
+    # Lists that aren't filtered by entity or user can be stale for WS_REVIEW_FEED_STALENESS seconds.
+    if entity_id or user_id:
+        generation = db_review.get_ws_cache_generation(entity_id)
+    else:
+        generation = db_review.get_ws_feed_generation(current_app.config.get("WS_REVIEW_FEED_STALENESS"))
     cache_key = cache.gen_key('list', f'entity_id={entity_id}', f'user_id={user_id}', f'sort={sort}',
                               f'sort_order={sort_order}', f'entity_type={entity_type}', f'limit={limit}',
-                              f'offset={offset}', f'language={language}', f'review_type={review_type}', f'include_metadata={include_metadata}')
+                              f'offset={offset}', f'language={language}', f'review_type={review_type}', f'include_metadata={include_metadata}',
+                              f'cursor={cursor}', f'generation={generation}')
     cached_result = cache.get(cache_key, REVIEW_CACHE_NAMESPACE)
 
     if cached_result:
         reviews = cached_result['reviews']
         count = cached_result['count']
+        next_cursor = cached_result['next_cursor']
         avg_rating_data = cached_result['avg_rating_data']
     else:
-        reviews, count = db_review.list_reviews(
-            entity_id=entity_id,
-            entity_type=entity_type,
-            user_id=user_id,
-            sort=sort,
-            sort_order=sort_order,
-            limit=limit,
-            offset=offset,
-            language=language,
-            review_type=review_type
-        )
-
-        reviews = [db_review.to_dict(p) for p in reviews]
+        try:
+            reviews, count = db_review.list_reviews(
+                entity_id=entity_id,
+                entity_type=entity_type,
+                user_id=user_id,
+                sort=sort,
+                sort_order=sort_order,
+                limit=limit,
+                offset=offset,
+                language=language,
+                review_type=review_type,
+                cursor=cursor,
+            )
+        except db_exceptions.BadDataException as e:
+            raise InvalidRequest(desc=str(e))
+        next_cursor = db_review.get_next_cursor(reviews, sort=sort, limit=limit)
+
+        reviews = db_review.to_dicts(reviews)
 
         if include_metadata == 'true':
             entities = [(str(review["entity_id"]), review["entity_type"]) for review in reviews]
@@ -454,21 +473,11 @@ def review_list_handler():
         cache.set(cache_key, {
             'reviews': reviews,
             'count': count,
+            'next_cursor': next_cursor,
             'avg_rating_data': avg_rating_data
         }, expirein=REVIEW_CACHE_TIMEOUT, namespace=REVIEW_CACHE_NAMESPACE)
 
-        # When we cache the results of a request, we include (entity_id, user_id, sort, limit, offset, language, review_type)
-        # in the cache key. When entity_id is edited or deleted, we need to expire all cache items for this entity.
-        # To do this, we track all of the cache keys for the entity in a separate cache item, ws_cache_{entity_id}.
-        # These keys are retrieved and all keys are expired in invalidate_ws_entity_cache.
-        # For keys without an entity_id, we add them to a separate cache item ws_cache_entity_id_absent. The keys in
-        # this set invalidated when any review is modified or updated.
-        cache_keys_for_entity_id_key = cache.gen_key('ws_cache', entity_id if entity_id else 'entity_id_absent')
-        cache.sadd(cache_keys_for_entity_id_key, cache_key,
-                   expirein=REVIEW_CACHE_TIMEOUT,
-                   namespace=REVIEW_CACHE_NAMESPACE)
-
-    result = {"limit": limit, "offset": offset, "count": count, "reviews": reviews}
+    result = {"limit": limit, "offset": offset, "count": count, "next_cursor": next_cursor, "reviews": reviews}
     if include_avg_rating:
         result["average_rating"] = avg_rating_data
     return jsonify(**result)
@@ -512,7 +521,8 @@ def review_post_handler(user):
             raise InvalidRequest(desc='Review must have either text or rating')
         if language and language not in supported_languages:
             raise InvalidRequest(desc='Unsupported language')
-        if db_review.list_reviews(inc_drafts=True, inc_hidden=True, entity_id=entity_id, user_id=user.id)[1]:
+        if db_review.list_reviews(inc_drafts=True, inc_hidden=True, entity_id=entity_id, user_id=user.id,
+                                  with_count=False)[0]:
             raise InvalidRequest(desc='You have already published a review for this {entity_name}'.format(
                 entity_name=db_review.ENTITY_TYPES_MAPPING[entity_type]))
         return entity_id, entity_type, text, rating, license_choice, language, is_draft
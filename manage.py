@@ -1,13 +1,19 @@
-﻿import os
+﻿import json
+import os
 import subprocess
 from werkzeug.serving import run_simple
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from brainzutils import cache
 import click
-from critiquebrainz import frontend, ws
+from critiquebrainz import db, frontend, ws
 from critiquebrainz.data import dump_manager
 import critiquebrainz.data.utils as data_utils
 import critiquebrainz.data.fixtures as _fixtures
+import critiquebrainz.db.avg_rating as db_avg_rating
+import critiquebrainz.db.review as db_review
+import critiquebrainz.db.users as db_users
+import critiquebrainz.db.vote as db_vote
+from critiquebrainz.frontend.external import local_cache
 
 
 cli = click.Group()
@@ -84,6 +90,18 @@ def clear_memcached():
     click.echo("Flushed everything from memcached.")
 
 
+@cli.command("clear_missing_entities")
+def clear_missing_entities():
+    """Forget MusicBrainz and BookBrainz entities cached as missing.
+
+    Entities which aren't found are cached as missing for MISSING_ENTITY_CACHE_TIMEOUT
+    seconds. Run this command after they have been added to make them visible earlier.
+    """
+    with frontend.create_app().app_context():
+        local_cache.clear_missing()
+    click.echo("Done! Forgot missing entities.")
+
+
 @click.option("--force", "-f", is_flag=True,
               help="Drop existing tables and types.")
 @cli.command("init_db")
@@ -116,6 +134,132 @@ def init_db(force=False):
     click.echo("Initialization has been completed!")
 
 
+@cli.command("update_review_revision_pointers")
+def update_review_revision_pointers():
+    """Recompute the latest revision pointer and creation time of all reviews.
+
+    This command should be run after the schema change which adds these columns
+    and can be used to repair them if they ever get out of sync with revisions.
+    """
+    click.echo("Updating latest revision pointers of reviews...")
+    with frontend.create_app().app_context():
+        with db.engine.begin() as connection:
+            count = db_review.update_revision_pointers(connection)
+    click.echo("Done! Updated %d reviews." % count)
+
+
+@cli.command("update_vote_counters")
+def update_vote_counters():
+    """Recompute positive and negative vote counters of all revisions and reviews.
+
+    Counters are maintained when votes are submitted or deleted. This command
+    rebuilds them from the vote table in case they get out of sync.
+    """
+    click.echo("Updating vote counters...")
+    with frontend.create_app().app_context():
+        with db.engine.begin() as connection:
+            db_vote.update_counters(connection)
+    click.echo("Done!")
+
+
+@cli.command("update_popular_reviews")
+def update_popular_reviews():
+    """Recompute popularity of reviews shown on the home page.
+
+    Votes are added to popularity when they are submitted. This command
+    removes votes older than a month from it and needs to be run periodically.
+    """
+    click.echo("Updating popular reviews...")
+    with frontend.create_app().app_context():
+        with db.engine.begin() as connection:
+            count = db_review.update_popular_reviews(connection)
+        db_review.invalidate_popular_reviews_cache()
+    click.echo("Done! %d reviews have votes from the last month." % count)
+
+
+@cli.command("update_avg_ratings")
+def update_avg_ratings():
+    """Recompute average ratings of all entities.
+
+    Average ratings are maintained when reviews are created, updated, hidden
+    or deleted. This command rebuilds them from the latest revisions of all
+    reviews in case they get out of sync.
+    """
+    click.echo("Updating average ratings...")
+    with frontend.create_app().app_context():
+        with db.engine.begin() as connection:
+            db_avg_rating.update_all(connection)
+    click.echo("Done!")
+
+
+@cli.command("update_user_karma")
+def update_user_karma():
+    """Recompute karma of all users.
+
+    Karma is maintained when votes are submitted or deleted and when reviews
+    are deleted. This command rebuilds it from the vote table in case it gets
+    out of sync.
+    """
+    click.echo("Updating user karma...")
+    with frontend.create_app().app_context():
+        with db.engine.begin() as connection:
+            count = db_users.update_karma(connection)
+    click.echo("Done! Updated %d users." % count)
+
+
+@cli.command("update_published_review_count")
+def update_published_review_count():
+    """Recompute the counter of published reviews used for approximate totals.
+
+    The counter is maintained when reviews are published, hidden or deleted.
+    This command rebuilds it from the review table in case it gets out of sync.
+    """
+    click.echo("Updating published review count...")
+    with frontend.create_app().app_context():
+        with db.engine.begin() as connection:
+            db_review.update_published_count(connection)
+    click.echo("Done!")
+
+
+@cli.command("import_reviews")
+@click.argument("file", type=click.File("r"))
+@click.option("--user", "-u", "user_ref", help="ID or MusicBrainz username of the user who publishes reviews "
+                                                "which don't specify their author.")
+@click.option("--batch-size", "-b", default=1000, show_default=True, help="Number of reviews inserted at once.")
+def import_reviews(file, user_ref=None, batch_size=1000):
+    """Import published reviews from a JSON Lines file.
+
+    Each line is an object with the keys accepted by `db_review.create_many`.
+    "user_id" can be omitted if the default author is specified with --user.
+    Reviews of entities which their author has already reviewed are skipped.
+    """
+    with frontend.create_app().app_context():
+        default_user_id = None
+        if user_ref:
+            user = db_users.get_user_by_ref(user_ref)
+            if not user:
+                raise click.BadParameter("User %s doesn't exist." % user_ref, param_hint="--user")
+            default_user_id = user["id"]
+
+        total, created = 0, 0
+        batch = []
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            review = json.loads(line)
+            review.setdefault("user_id", default_user_id)
+            if review["user_id"] is None:
+                raise click.UsageError("Review on line %d has no author, use --user to set the default one." % line_number)
+            batch.append(review)
+            if len(batch) >= batch_size:
+                total, created = total + len(batch), created + len(db_review.create_many(batch))
+                click.echo("Imported %d of %d reviews..." % (created, total))
+                batch = []
+        if batch:
+            total, created = total + len(batch), created + len(db_review.create_many(batch))
+    click.echo("Done! Imported %d reviews, skipped %d." % (created, total - created))
+
+
 def _run_command(command):
     return subprocess.check_call(command, shell=True)
 
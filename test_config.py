@@ -9,4 +9,6 @@ TESTING = True
 MB_DATABASE_URI = "postgresql://musicbrainz@musicbrainz_db:5432/musicbrainz_db"
 
 # BookBrainz Database
-BB_DATABASE_URI = "postgresql://bookbrainz:bookbrainz@db:5432/bookbrainz"
\ No newline at end of file
+BB_DATABASE_URI = "postgresql://bookbrainz:bookbrainz@db:5432/bookbrainz"
+# Review lists of the web service reflect changes immediately
+WS_REVIEW_FEED_STALENESS = 0